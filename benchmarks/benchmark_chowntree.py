@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+from fotahubclient.system_helper import chowntree
+
+FILES_PER_DIR = 100
+DIRS_PER_DIR = 10
+
+# Previous os.walk-based implementation of chowntree() kept for reference
+def chowntree_os_walk(path, uid, gid):
+    os.chown(path, uid, gid)
+    for dir_path, dir_names, file_names in os.walk(path):
+        for dir_name in dir_names:
+            os.lchown(os.path.join(dir_path, dir_name), uid, gid)
+        for file_name in file_names:
+            os.lchown(os.path.join(dir_path, file_name), uid, gid)
+
+def create_tree(root, file_count):
+    pending_dirs = [root]
+    created_files = 0
+    while created_files < file_count:
+        dir_path = pending_dirs.pop(0)
+        os.makedirs(dir_path, exist_ok=True)
+        for i in range(min(FILES_PER_DIR, file_count - created_files)):
+            open(os.path.join(dir_path, 'file-{}'.format(i)), 'w').close()
+            created_files += 1
+        pending_dirs.extend(os.path.join(dir_path, 'dir-{}'.format(i)) for i in range(DIRS_PER_DIR))
+
+def measure(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare chowntree() against its previous os.walk-based implementation')
+    parser.add_argument('-f', '--files', type=int, nargs='+', default=[1000, 10000, 100000], help='numbers of files in tree to change ownership of')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of runs per measurement (best run is reported)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='number of workers to be used by chowntree()')
+    args = parser.parse_args()
+
+    # Changing ownership to another user requires root privileges, re-assigning current user/group works in any case
+    uid = os.getuid()
+    gid = os.getgid()
+
+    print('{:>10} {:>14} {:>14} {:>10}'.format('files', 'os.walk [s]', 'chowntree [s]', 'speedup'))
+    for file_count in args.files:
+        root = tempfile.mkdtemp(prefix='chowntree-benchmark-')
+        try:
+            create_tree(root, file_count)
+            reference_duration = measure(lambda: chowntree_os_walk(root, uid, gid), args.repeat)
+            duration = measure(lambda: chowntree(root, uid, gid, max_workers=args.workers), args.repeat)
+            print('{:>10} {:>14.4f} {:>14.4f} {:>9.2f}x'.format(file_count, reference_duration, duration, reference_duration / duration))
+        finally:
+            shutil.rmtree(root)
+
+if __name__ == '__main__':
+    sys.exit(main())
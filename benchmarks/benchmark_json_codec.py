@@ -0,0 +1,104 @@
+import sys
+import json
+import time
+import argparse
+from enum import Enum
+from json import JSONEncoder, JSONDecoder
+
+import stringcase
+
+from fotahubclient.json_document_models import ArtifactKind, LifecycleState, UpdateCompletionState, DeployedArtifacts, DeployedArtifact, DeployedArtifactsJSONDecoder, UpdateStatuses, UpdateStatus, UpdateStatusesJSONDecoder
+from fotahubclient.json_encode_decode import PascalCaseJSONEncoder
+
+# Previous implementation of the PascalCase JSON codec kept for reference
+
+def reference_to_pascalcase_keyed_dict(dict):
+    return { stringcase.pascalcase(k): v for k, v in dict.items() }
+
+def reference_from_pascalcase_keyed_dict(dict, enum_types=[]):
+    return { stringcase.snakecase(k): reference_to_enum_literal(k, v, enum_types) for k, v in dict.items() }
+
+def reference_to_enum_literal(name, value, enum_types):
+    if isinstance(value, str):
+        for enum_type in enum_types:
+            if enum_type.__name__.endswith(name):
+                if value == '':
+                    return None
+                else:
+                    for _, member in enum_type.__members__.items():
+                        if member.value == value:
+                            return member
+    return value
+
+class ReferencePascalCaseJSONEncoder(JSONEncoder):
+
+    def default(self, obj):
+        if isinstance(obj, Enum):
+            return str(obj)
+        else:
+            # Models are slotted meanwhile, their slots are declared in the same order as their attributes used to be assigned
+            optional_fields = getattr(type(obj), 'optional_fields', ())
+            return reference_to_pascalcase_keyed_dict({ k: '' if getattr(obj, k) is None else getattr(obj, k) for k in type(obj).__slots__ if getattr(obj, k) is not None or k not in optional_fields })
+
+class ReferencePascalCasedObjectArrayJSONDecoder(JSONDecoder):
+
+    def __init__(self, array_type, object_type, enum_types=None):
+        super().__init__(object_hook=self.object_hook)
+        self.array_type = array_type
+        self.object_type = object_type
+        self.enum_types = enum_types if enum_types is not None else []
+
+    def object_hook(self, data):
+        if len(data) == 1 and isinstance(list(data.values())[0], list):
+            return self.array_type(**reference_from_pascalcase_keyed_dict(data))
+        else:
+            return self.object_type(**reference_from_pascalcase_keyed_dict(data, self.enum_types))
+
+class ReferenceDeployedArtifactsJSONDecoder(ReferencePascalCasedObjectArrayJSONDecoder):
+    def __init__(self):
+        super().__init__(DeployedArtifacts, DeployedArtifact, [ArtifactKind, LifecycleState])
+
+class ReferenceUpdateStatusesJSONDecoder(ReferencePascalCasedObjectArrayJSONDecoder):
+    def __init__(self):
+        super().__init__(UpdateStatuses, UpdateStatus, [ArtifactKind, UpdateCompletionState])
+
+def create_deployed_artifacts(record_count):
+    return DeployedArtifacts([DeployedArtifact('app-{}'.format(i), ArtifactKind.application, '{:064x}'.format(i), None, LifecycleState.running, True, 'Message {}'.format(i)) for i in range(record_count)])
+
+def create_update_statuses(record_count):
+    return UpdateStatuses([UpdateStatus('app-{}'.format(i), ArtifactKind.application, '{:064x}'.format(i), 1634477563 + i, UpdateCompletionState.confirmed) for i in range(record_count)])
+
+def measure(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return [min(durations), result]
+
+def compare(title, document, decoder_cls, reference_decoder_cls, repeat):
+    [reference_save_duration, reference_text] = measure(lambda: json.dumps(document, ensure_ascii=False, indent=4, cls=ReferencePascalCaseJSONEncoder), repeat)
+    [save_duration, text] = measure(lambda: json.dumps(document, ensure_ascii=False, indent=4, cls=PascalCaseJSONEncoder), repeat)
+    if text != reference_text:
+        raise AssertionError('{}: serialized documents differ from those produced by reference implementation'.format(title))
+
+    [reference_load_duration, reference_document] = measure(lambda: json.loads(text, cls=reference_decoder_cls), repeat)
+    [load_duration, loaded_document] = measure(lambda: json.loads(text, cls=decoder_cls), repeat)
+    if json.dumps(loaded_document, ensure_ascii=False, indent=4, cls=PascalCaseJSONEncoder) != json.dumps(reference_document, ensure_ascii=False, indent=4, cls=PascalCaseJSONEncoder):
+        raise AssertionError('{}: loaded documents differ from those produced by reference implementation'.format(title))
+
+    print('{:<24} {:>10} {:>14.4f} {:>14.4f} {:>14.4f} {:>14.4f}'.format(title, len(text), reference_save_duration, save_duration, reference_load_duration, load_duration))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the PascalCase JSON codec against its previous implementation')
+    parser.add_argument('-n', '--records', type=int, nargs='+', default=[1000, 10000], help='numbers of records per document')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='number of runs per measurement (best run is reported)')
+    args = parser.parse_args()
+
+    print('{:<24} {:>10} {:>14} {:>14} {:>14} {:>14}'.format('document', 'bytes', 'ref. save [s]', 'save [s]', 'ref. load [s]', 'load [s]'))
+    for record_count in args.records:
+        compare('DeployedArtifacts/{}'.format(record_count), create_deployed_artifacts(record_count), DeployedArtifactsJSONDecoder, ReferenceDeployedArtifactsJSONDecoder, args.repeat)
+        compare('UpdateStatuses/{}'.format(record_count), create_update_statuses(record_count), UpdateStatusesJSONDecoder, ReferenceUpdateStatusesJSONDecoder, args.repeat)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from fotahubclient.json_document_models import ArtifactKind, LifecycleState, UpdateCompletionState, DeployedArtifacts, DeployedArtifact, UpdateStatuses, UpdateStatus
+
+def create_deployed_artifacts(record_count):
+    return DeployedArtifacts([DeployedArtifact('app-{}'.format(i), ArtifactKind.application, '{:064x}'.format(i), None, LifecycleState.running, True, 'Message {}'.format(i)) for i in range(record_count)])
+
+def create_update_statuses(record_count):
+    return UpdateStatuses([UpdateStatus('app-{}'.format(i), ArtifactKind.application, '{:064x}'.format(i), 1634477563 + i, UpdateCompletionState.confirmed) for i in range(record_count)])
+
+def measure_load(load, path):
+    start = time.perf_counter()
+    load(path)
+    duration = time.perf_counter() - start
+
+    # Measure memory in a separate run so that tracing overhead does not distort load time
+    tracemalloc.start()
+    try:
+        document = load(path)
+        [retained, peak] = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del document
+    return [duration, retained, peak]
+
+def report(title, record_count, path, load):
+    [duration, retained, peak] = measure_load(load, path)
+    print('{:<20} {:>10} {:>12} {:>12.4f} {:>14.1f} {:>14.1f}'.format(title, record_count, os.path.getsize(path), duration, retained / 1024, peak / 1024))
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure time and memory needed to load large deployed artifacts and update status documents')
+    parser.add_argument('-n', '--records', type=int, nargs='+', default=[1000, 10000, 100000], help='numbers of records per document')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='json-documents-benchmark-') as temp_dir:
+        deployed_artifacts_path = os.path.join(temp_dir, 'deployed-artifacts.json')
+        update_status_path = os.path.join(temp_dir, 'update-status.json')
+
+        print('{:<20} {:>10} {:>12} {:>12} {:>14} {:>14}'.format('document', 'records', 'bytes', 'load [s]', 'retained [KiB]', 'peak [KiB]'))
+        for record_count in args.records:
+            DeployedArtifacts.save_deployed_artifacts(create_deployed_artifacts(record_count), deployed_artifacts_path)
+            report('DeployedArtifacts', record_count, deployed_artifacts_path, DeployedArtifacts.load_deployed_artifacts)
+
+            UpdateStatuses.save_update_statuses(create_update_statuses(record_count), update_status_path)
+            report('UpdateStatuses', record_count, update_status_path, UpdateStatuses.load_update_statuses)
+
+if __name__ == '__main__':
+    sys.exit(main())
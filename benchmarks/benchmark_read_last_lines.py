@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from fotahubclient.system_helper import read_last_lines
+
+# Previous byte-wise implementation of read_last_lines() kept for reference
+def read_last_lines_byte_wise(path, max_lines):
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return ''
+    
+    with open(path, "rb") as file:
+        file.seek(-1, os.SEEK_END) 
+        while file.read(1).isspace():
+            if file.tell() >= 2:
+                file.seek(-2, os.SEEK_CUR)
+            else:
+                break
+
+        for _ in range(max_lines):
+            file.seek(-1, os.SEEK_CUR)
+            while file.read(1) != b'\n':
+                if file.tell() >= 2:
+                    file.seek(-2, os.SEEK_CUR)
+                else:
+                    break
+            file.seek(-1, os.SEEK_CUR)
+            
+            if file.tell() == 0:
+                break
+
+        return file.read().decode().strip()
+
+def measure(function, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return [min(durations), result]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare read_last_lines() against its previous byte-wise implementation')
+    parser.add_argument('-l', '--lines', type=int, nargs='+', default=[10, 100, 1000, 10000], help='numbers of log lines to read')
+    parser.add_argument('-w', '--line-width', type=int, default=120, help='number of characters per log line')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of runs per measurement (best run is reported)')
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile(prefix='read-last-lines-benchmark-', suffix='.log') as file:
+        for i in range(max(args.lines) * 2):
+            file.write('{:08d} {}\n'.format(i, 'x' * (args.line_width - 9)).encode())
+        file.flush()
+
+        print('{:>10} {:>16} {:>20} {:>10}'.format('lines', 'byte-wise [s]', 'read_last_lines [s]', 'speedup'))
+        for max_lines in args.lines:
+            [reference_duration, reference_logs] = measure(lambda: read_last_lines_byte_wise(file.name, max_lines), args.repeat)
+            [duration, logs] = measure(lambda: read_last_lines(file.name, max_lines), args.repeat)
+            if logs != reference_logs:
+                raise AssertionError('Log lines read differ from those read by reference implementation')
+            print('{:>10} {:>16.4f} {:>20.4f} {:>9.1f}x'.format(max_lines, reference_duration, duration, reference_duration / duration))
+
+if __name__ == '__main__':
+    sys.exit(main())
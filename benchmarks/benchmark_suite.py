@@ -0,0 +1,420 @@
+import os
+import sys
+import json
+import stat
+import time
+import types
+import shutil
+import argparse
+import tempfile
+
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.json_document_models import ArtifactKind, LifecycleState, UpdateCompletionState, DeployedArtifacts, DeployedArtifact, UpdateStatuses, UpdateStatus
+from fotahubclient.deployed_artifacts_tracker import DeployedArtifactsTracker
+from fotahubclient.deployed_artifacts_describer import DeployedArtifactsDescriber
+from fotahubclient.update_status_tracker import UpdateStatusTracker
+from fotahubclient.update_status_describer import UpdateStatusDescriber
+from fotahubclient.uboot_operator import UBootOperator
+from fotahubclient.system_helper import read_last_lines
+import fotahubclient.common_constants as constants
+
+SIZES_DEFAULT = [1, 10, 100, 1000]
+BASELINE_PATH_DEFAULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_suite_baseline.json')
+
+# Durations exceeding their baseline by more than given fraction and more than given number of seconds are regressions
+# (the absolute threshold keeps timer and scheduling noise of very short benchmarks from being reported)
+TOLERANCE_DEFAULT = 0.5
+MIN_REGRESSION_DEFAULT = 0.002
+
+LOG_LINE_WIDTH = 120
+LOG_LINE_COUNT = 20000
+
+# Keeps the state of each container in a file named after the same and reports it the way runc does
+FAKE_RUNC_SCRIPT = r'''#!/bin/bash
+state_dir="$FAKE_RUNC_STATE_DIR"
+case "$1" in
+    state)
+        if [ ! -f "$state_dir/$2" ]; then
+            echo "container does not exist" >&2
+            exit 1
+        fi
+        read -r status < "$state_dir/$2"
+        echo '{"id": "'"$2"'", "status": "'"$status"'", "pid": 0}'
+        ;;
+    list)
+        separator=''
+        printf '['
+        for path in "$state_dir"/*; do
+            [ -f "$path" ] || continue
+            read -r status < "$path"
+            printf '%s{"id": "%s", "status": "%s"}' "$separator" "${path##*/}" "$status"
+            separator=', '
+        done
+        printf ']\n'
+        ;;
+    create)
+        echo created > "$state_dir/${@: -1}"
+        ;;
+    run)
+        echo running > "$state_dir/${@: -1}"
+        echo "Container ${@: -1} up and running"
+        ;;
+    start)
+        echo running > "$state_dir/$2"
+        ;;
+    kill)
+        [ -f "$state_dir/$2" ] && echo stopped > "$state_dir/$2"
+        ;;
+    delete)
+        rm -f "$state_dir/$2"
+        ;;
+esac
+'''
+
+# Keep the U-Boot environment as NAME=VALUE lines in a plain file
+FAKE_FW_PRINTENV_SCRIPT = r'''#!/bin/bash
+cat "$FAKE_FW_ENV_PATH"
+'''
+
+FAKE_FW_SETENV_SCRIPT = r'''#!/bin/bash
+grep -v "^$1=" "$FAKE_FW_ENV_PATH" > "$FAKE_FW_ENV_PATH.new"
+if [ $# -gt 1 ]; then
+    echo "$1=$2" >> "$FAKE_FW_ENV_PATH.new"
+fi
+mv "$FAKE_FW_ENV_PATH.new" "$FAKE_FW_ENV_PATH"
+'''
+
+def install_fake_tool(bin_dir, name, script):
+    tool_path = os.path.join(bin_dir, name)
+    with open(tool_path, 'w') as file:
+        file.write(script)
+    os.chmod(tool_path, os.stat(tool_path).st_mode | stat.S_IEXEC)
+
+def install_fake_tools(bin_dir):
+    os.makedirs(bin_dir)
+    install_fake_tool(bin_dir, 'runc', FAKE_RUNC_SCRIPT)
+    install_fake_tool(bin_dir, 'fw_printenv', FAKE_FW_PRINTENV_SCRIPT)
+    install_fake_tool(bin_dir, 'fw_setenv', FAKE_FW_SETENV_SCRIPT)
+    os.environ['PATH'] = bin_dir + os.pathsep + os.environ['PATH']
+
+class FakeOSTreeRepo(object):
+
+    # Stands in for OSTreeRepo which requires the OSTree typelib and real OSTree repos; revisions being pulled
+    # are merely remembered, and checking out a revision creates a small runc bundle-like tree whose files
+    # partly depend on the revision (so that delta checkouts have something to apply)
+    def __init__(self, remote_name, revisions):
+        self.refs = { remote_name + ':' + name: revision for name, revision in revisions.items() }
+        self.revisions = set(revisions.values())
+
+    def __to_ref(self, remote_name, ref):
+        return remote_name + ':' + ref if remote_name else ref
+
+    def list_ostree_refs(self):
+        return dict(self.refs)
+
+    def resolve_ostree_revision(self, remote_name, ref):
+        return self.refs.get(self.__to_ref(remote_name, ref))
+
+    def has_ostree_revision(self, revision):
+        return revision in self.revisions
+
+    def set_ostree_ref(self, remote_name, ref, revision):
+        if revision is not None:
+            self.refs[self.__to_ref(remote_name, ref)] = revision
+        else:
+            self.refs.pop(self.__to_ref(remote_name, ref), None)
+
+    def pull_ostree_revision(self, remote_name, branch_name, revision, depth, pull_progress=None, update_ref=True, source=None):
+        return self.pull_ostree_revisions(remote_name, { branch_name: revision }, depth, pull_progress, update_ref, source)
+
+    def pull_ostree_revisions(self, remote_name, revisions, depth, pull_progress=None, update_ref=True, source=None):
+        if pull_progress is not None:
+            pull_progress.start()
+        for branch_name, revision in revisions.items():
+            self.revisions.add(revision)
+            if update_ref:
+                self.set_ostree_ref(remote_name, branch_name, revision)
+        if pull_progress is not None:
+            pull_progress.finish()
+        return pull_progress
+
+    def verify_ostree_revision(self, remote_name, revision, max_workers=1):
+        if revision not in self.revisions:
+            raise ValueError("Revision '{}' not found".format(revision))
+
+    def __get_tree(self, revision):
+        return {
+            '/config.json': json.dumps({ 'ociVersion': '1.0.2', 'annotations': { 'revision': revision } }),
+            '/rootfs/bin/app': '#!/bin/sh\necho {}\n'.format(revision),
+            '/' + constants.APP_AUTORUN_MARKER_FILE_NAME: ''
+        }
+
+    def checkout_at(self, revision, checkout_path):
+        for path in self.__get_tree(revision).keys():
+            self.checkout_path_at(revision, path, checkout_path + path)
+
+    def checkout_path_at(self, revision, path, checkout_path):
+        os.makedirs(os.path.dirname(checkout_path), exist_ok=True)
+        with open(checkout_path, 'w') as file:
+            file.write(self.__get_tree(revision)[path])
+
+    def diff_ostree_revisions(self, from_revision, to_revision):
+        from_tree = self.__get_tree(from_revision)
+        to_tree = self.__get_tree(to_revision)
+        modified = [path for path, content in to_tree.items() if path in from_tree and from_tree[path] != content]
+        removed = [path for path in from_tree.keys() if path not in to_tree]
+        added = [path for path in to_tree.keys() if path not in from_tree]
+        return [modified, removed, added]
+
+class GObjectIntrospectionStub(object):
+
+    # Stands in for any OSTree or Gio type, function or constant that gets used before the faked OSTree repo
+    # is put in place
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+def import_app_manager():
+    # Application management imports GObject introspection and the OSTree typelib even though OSTree repos are faked;
+    # stub them so that the application benchmarks run and yield comparable durations on any machine
+    gi = types.ModuleType('gi')
+    gi.require_version = lambda namespace, version: None
+    gi.repository = types.ModuleType('gi.repository')
+    gi.repository.OSTree = GObjectIntrospectionStub()
+    gi.repository.Gio = GObjectIntrospectionStub()
+    gi.repository.GLib = types.SimpleNamespace(Error=type('Error', (Exception,), {}))
+    sys.modules['gi'] = gi
+    sys.modules['gi.repository'] = gi.repository
+
+    from fotahubclient.app_manager import AppManager
+    return AppManager
+
+def to_app_name(index):
+    return 'app-{}'.format(index)
+
+def to_revision(index, generation=0):
+    return '{:032x}{:032x}'.format(generation, index)
+
+def create_config(work_dir):
+    config = ConfigLoader()
+    config.deployed_artifacts_path = os.path.join(work_dir, 'deployed-artifacts.json')
+    config.update_status_path = os.path.join(work_dir, 'update-status.json')
+    config.os_status_snapshot_path = os.path.join(work_dir, 'os-status.json')
+    config.app_ostree_repo_path = os.path.join(work_dir, 'apps-repo-not-used')
+    config.app_deploy_root = os.path.join(work_dir, 'apps')
+    os.makedirs(config.app_deploy_root)
+
+    # Each environment gets its own (empty) set of containers and U-Boot environment
+    os.environ['FAKE_RUNC_STATE_DIR'] = os.path.join(work_dir, 'runc')
+    os.makedirs(os.environ['FAKE_RUNC_STATE_DIR'])
+    os.environ['FAKE_FW_ENV_PATH'] = os.path.join(work_dir, 'fw_env')
+    open(os.environ['FAKE_FW_ENV_PATH'], 'w').close()
+    return config
+
+def create_app_manager(AppManager, config, ostree_repo):
+    app_manager = AppManager(config)
+    app_manager.updater.ostree_repo = ostree_repo
+    app_manager.updater.remote_name = constants.FOTAHUB_OSTREE_REMOTE_NAME_DEFAULT
+    return app_manager
+
+def create_app_ostree_repo(app_count):
+    return FakeOSTreeRepo(constants.FOTAHUB_OSTREE_REMOTE_NAME_DEFAULT, { to_app_name(i): to_revision(i) for i in range(app_count) })
+
+def reset_containers():
+    # Containers are gone after a reboot
+    shutil.rmtree(os.environ['FAKE_RUNC_STATE_DIR'])
+    os.makedirs(os.environ['FAKE_RUNC_STATE_DIR'])
+
+def time_call(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def measure_deploy_and_run_apps(work_dir, app_count, repeat, AppManager):
+    durations = []
+    for run in range(repeat):
+        config = create_config(os.path.join(work_dir, str(run)))
+        app_manager = create_app_manager(AppManager, config, create_app_ostree_repo(app_count))
+        durations.append(time_call(app_manager.deploy_and_run_apps))
+    return min(durations)
+
+def measure_redeploy_and_run_apps(work_dir, app_count, repeat, AppManager):
+    config = create_config(work_dir)
+    ostree_repo = create_app_ostree_repo(app_count)
+    create_app_manager(AppManager, config, ostree_repo).deploy_and_run_apps()
+
+    # Boot with all applications already checked out
+    durations = []
+    for _ in range(repeat):
+        reset_containers()
+        app_manager = create_app_manager(AppManager, config, ostree_repo)
+        durations.append(time_call(app_manager.deploy_and_run_apps))
+    return min(durations)
+
+def measure_update_app(work_dir, app_count, repeat, AppManager):
+    config = create_config(work_dir)
+    app_manager = create_app_manager(AppManager, config, create_app_ostree_repo(app_count))
+    app_manager.deploy_and_run_apps()
+
+    durations = []
+    for generation in range(1, repeat + 1):
+        durations.append(time_call(lambda: app_manager.update_app(to_app_name(0), to_revision(0, generation))))
+    return min(durations)
+
+def measure_describe_deployed_artifacts(work_dir, app_count, repeat, AppManager):
+    config = create_config(work_dir)
+    ostree_repo = create_app_ostree_repo(app_count)
+    create_app_manager(AppManager, config, ostree_repo).deploy_and_run_apps()
+
+    # Leave the OS out as describing the same requires a real OSTree sysroot
+    names = [to_app_name(i) for i in range(app_count)]
+    durations = []
+    for _ in range(repeat):
+        describer = DeployedArtifactsDescriber(config, create_app_manager(AppManager, config, ostree_repo))
+        durations.append(time_call(lambda: describer.describe_deployed_artifacts(names)))
+    return min(durations)
+
+def save_update_statuses(config, app_count):
+    UpdateStatuses.save_update_statuses(
+        UpdateStatuses([UpdateStatus(to_app_name(i), ArtifactKind.application, to_revision(i), None, UpdateCompletionState.confirmed) for i in range(app_count)]),
+        config.update_status_path
+    )
+
+def measure_describe_update_status(work_dir, app_count, repeat, AppManager):
+    config = create_config(work_dir)
+    save_update_statuses(config, app_count)
+
+    # Leave some changes in the journal that need to be replayed
+    config.update_status_journal_compact_on_exit = False
+    with UpdateStatusTracker(config) as tracker:
+        for i in range(min(app_count, 10)):
+            tracker.record_app_update_status(to_app_name(i), revision=to_revision(i, 1), completion_state=UpdateCompletionState.initiated)
+
+    return min(time_call(lambda: UpdateStatusDescriber(config).describe_update_status()) for _ in range(repeat))
+
+def measure_deployed_artifacts_tracker(work_dir, app_count, repeat, AppManager):
+    config = create_config(work_dir)
+    DeployedArtifacts.save_deployed_artifacts(
+        DeployedArtifacts([DeployedArtifact(to_app_name(i), ArtifactKind.application, to_revision(i), None, LifecycleState.ready) for i in range(app_count)]),
+        config.deployed_artifacts_path
+    )
+
+    def load_record_save():
+        with DeployedArtifactsTracker(config) as tracker:
+            tracker.record_app_lifecycle_status_change(to_app_name(0), lifecycle_state=LifecycleState.running)
+    return min(time_call(load_record_save) for _ in range(repeat))
+
+def measure_update_status_tracker(work_dir, app_count, repeat, AppManager):
+    config = create_config(work_dir)
+    save_update_statuses(config, app_count)
+
+    def load_record_save():
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status(to_app_name(0), revision=to_revision(0, 1), completion_state=UpdateCompletionState.initiated)
+    return min(time_call(load_record_save) for _ in range(repeat))
+
+def measure_read_last_lines(work_dir, app_count, repeat, AppManager):
+    # Read as many log lines as there are applications
+    log_path = os.path.join(work_dir, 'stdout.log')
+    os.makedirs(work_dir)
+    with open(log_path, 'w') as file:
+        for i in range(max(LOG_LINE_COUNT, app_count)):
+            file.write('{:08d} {}\n'.format(i, 'x' * (LOG_LINE_WIDTH - 9)))
+
+    return min(time_call(lambda: read_last_lines(log_path, app_count)) for _ in range(repeat))
+
+def measure_uboot_env(work_dir, app_count, repeat, AppManager):
+    # Look up a variable in a U-Boot environment with as many other variables as there are applications
+    create_config(work_dir)
+    with open(os.environ['FAKE_FW_ENV_PATH'], 'w') as file:
+        for i in range(app_count):
+            file.write('var_{}={}\n'.format(i, to_revision(i)))
+
+    uboot = UBootOperator()
+    def set_and_check():
+        uboot.set_uboot_env_var('benchmark_flag', '1')
+        if not uboot.isset_uboot_env_var('benchmark_flag'):
+            raise AssertionError('U-Boot environment variable not set')
+    return min(time_call(set_and_check) for _ in range(repeat))
+
+BENCHMARKS = {
+    'deploy_and_run_apps': measure_deploy_and_run_apps,
+    'redeploy_and_run_apps': measure_redeploy_and_run_apps,
+    'update_app': measure_update_app,
+    'describe_deployed_artifacts': measure_describe_deployed_artifacts,
+    'describe_update_status': measure_describe_update_status,
+    'deployed_artifacts_tracker': measure_deployed_artifacts_tracker,
+    'update_status_tracker': measure_update_status_tracker,
+    'read_last_lines': measure_read_last_lines,
+    'uboot_env': measure_uboot_env
+}
+
+def load_baseline(path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+def save_baseline(path, baseline):
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=4, sort_keys=True)
+        file.write('\n')
+
+def is_regression(duration, baseline_duration, tolerance, min_regression):
+    return duration > baseline_duration * (1 + tolerance) and duration - baseline_duration > min_regression
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure application deployment/update, describe and tracker operations as well as log and U-Boot environment access at several numbers of applications and check the outcome against a stored baseline')
+    parser.add_argument('-b', '--benchmarks', nargs='+', choices=BENCHMARKS.keys(), default=list(BENCHMARKS.keys()), help='benchmarks to run')
+    parser.add_argument('-a', '--apps', type=int, nargs='+', default=SIZES_DEFAULT, help='numbers of applications')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of runs per measurement (best run is reported)')
+    parser.add_argument('--baseline', default=BASELINE_PATH_DEFAULT, help='path to baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='store measured durations as new baseline rather than checking them against the existing one (baselines are machine-specific and should be recorded on the machine that runs the check)')
+    parser.add_argument('-t', '--tolerance', type=float, default=TOLERANCE_DEFAULT, help='fraction by which durations may exceed their baseline')
+    parser.add_argument('-m', '--min-regression', type=float, default=MIN_REGRESSION_DEFAULT, help='number of seconds by which durations must exceed their baseline to count as regression')
+    args = parser.parse_args()
+
+    AppManager = import_app_manager()
+
+    baseline = load_baseline(args.baseline)
+    regressions = []
+    missing = []
+    with tempfile.TemporaryDirectory(prefix='fotahub-benchmark-') as temp_dir:
+        install_fake_tools(os.path.join(temp_dir, 'bin'))
+
+        print('{:<28} {:>6} {:>14} {:>14} {:>9}'.format('benchmark', 'apps', 'duration [ms]', 'baseline [ms]', 'change'))
+        for name in args.benchmarks:
+            measure = BENCHMARKS[name]
+            for app_count in args.apps:
+                duration = measure(os.path.join(temp_dir, '{}-{}'.format(name, app_count)), app_count, args.repeat, AppManager)
+
+                baseline_duration = baseline.get(name, {}).get(str(app_count))
+                if args.save_baseline:
+                    baseline.setdefault(name, {})[str(app_count)] = round(duration, 6)
+                if baseline_duration is None:
+                    print('{:<28} {:>6} {:>14.3f} {:>14} {:>9}{}'.format(name, app_count, duration * 1e3, '-', '-', '' if args.save_baseline else ' MISSING'))
+                    if not args.save_baseline:
+                        missing.append('{} at {} application(s)'.format(name, app_count))
+                    continue
+
+                regression = is_regression(duration, baseline_duration, args.tolerance, args.min_regression)
+                print('{:<28} {:>6} {:>14.3f} {:>14.3f} {:>+8.0f}%{}'.format(name, app_count, duration * 1e3, baseline_duration * 1e3, (duration / baseline_duration - 1) * 100 if baseline_duration > 0 else 0, ' REGRESSION' if regression else ''))
+                if regression and not args.save_baseline:
+                    regressions.append('{} at {} application(s)'.format(name, app_count))
+
+    if args.save_baseline:
+        save_baseline(args.baseline, baseline)
+        print('\nBaseline saved to {}'.format(args.baseline))
+        return 0
+
+    # Measurements without baseline cannot be checked and must not pass unnoticed
+    if missing:
+        print('\n{} measurement(s) missing in baseline {} (run with --save-baseline to record them):\n{}'.format(len(missing), args.baseline, '\n'.join(missing)))
+    if regressions:
+        print('\n{} regression(s) against baseline {}:\n{}'.format(len(regressions), args.baseline, '\n'.join(regressions)))
+    return 1 if missing or regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.json_document_models import ArtifactKind, LifecycleState, UpdateCompletionState, DeployedArtifacts, DeployedArtifact, UpdateStatuses, UpdateStatus
+from fotahubclient.deployed_artifacts_tracker import DeployedArtifactsTracker
+from fotahubclient.update_status_tracker import UpdateStatusTracker
+
+def to_app_name(index):
+    return 'app-{}'.format(index)
+
+def measure_deployed_artifacts_tracker(config, artifact_count, call_count):
+    DeployedArtifacts.save_deployed_artifacts(
+        DeployedArtifacts([DeployedArtifact(to_app_name(i), ArtifactKind.application, 'revision-{}'.format(i), None, LifecycleState.ready) for i in range(artifact_count)]),
+        config.deployed_artifacts_path
+    )
+
+    names = [to_app_name(random.randrange(artifact_count)) for _ in range(call_count)]
+    with DeployedArtifactsTracker(config) as tracker:
+        start = time.perf_counter()
+        for name in names:
+            tracker.record_app_lifecycle_status_change(name, lifecycle_state=LifecycleState.running)
+        return (time.perf_counter() - start) / call_count
+
+def measure_update_status_tracker(config, artifact_count, call_count):
+    UpdateStatuses.save_update_statuses(
+        UpdateStatuses([UpdateStatus(to_app_name(i), ArtifactKind.application, 'revision-{}'.format(i), None, UpdateCompletionState.confirmed) for i in range(artifact_count)]),
+        config.update_status_path
+    )
+
+    names = [to_app_name(random.randrange(artifact_count)) for _ in range(call_count)]
+    with UpdateStatusTracker(config) as tracker:
+        start = time.perf_counter()
+        for name in names:
+            tracker.record_app_update_status(name, completion_state=UpdateCompletionState.invalidated)
+        return (time.perf_counter() - start) / call_count
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-call cost of recording deployed artifact and update status changes')
+    parser.add_argument('-a', '--artifacts', type=int, nargs='+', default=[10, 100, 1000, 10000], help='numbers of artifacts being tracked')
+    parser.add_argument('-c', '--calls', type=int, default=1000, help='number of record calls per measurement')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='trackers-benchmark-') as temp_dir:
+        config = ConfigLoader()
+        config.deployed_artifacts_path = os.path.join(temp_dir, 'deployed-artifacts.json')
+        config.update_status_path = os.path.join(temp_dir, 'update-status.json')
+
+        # Keep compaction of update status journal out of measured record calls
+        config.update_status_journal_max_entries = args.calls + 1
+
+        print('{:>10} {:>28} {:>28}'.format('artifacts', 'DeployedArtifactsTracker [us]', 'UpdateStatusTracker [us]'))
+        for artifact_count in args.artifacts:
+            deployed_artifacts_duration = measure_deployed_artifacts_tracker(config, artifact_count, args.calls)
+            update_status_duration = measure_update_status_tracker(config, artifact_count, args.calls)
+            print('{:>10} {:>28.2f} {:>28.2f}'.format(artifact_count, deployed_artifacts_duration * 1e6, update_status_duration * 1e6))
+
+if __name__ == '__main__':
+    sys.exit(main())
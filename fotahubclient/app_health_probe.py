@@ -0,0 +1,83 @@
+import time
+import logging
+import urllib.request
+from enum import Enum
+
+from fotahubclient.system_helper import run_command
+from fotahubclient.runc_operator import ContainerState
+
+HEALTH_PROBE_TIMEOUT_DEFAULT = 30.0
+HEALTH_PROBE_INTERVAL_DEFAULT = 1.0
+HEALTH_PROBE_RUNNING_PERIOD_DEFAULT = 10.0
+
+class HealthProbeType(Enum):
+    command = 'command'
+    http = 'http'
+    running = 'running'
+
+    def __str__(self):
+        return self.value
+
+class AppHealthProbe(object):
+
+    # Checks whether a freshly updated application works as expected; gives up once its timeout has elapsed
+    # so that a bad application revision is detected (and can be rolled back) within a bounded time
+    def __init__(self, probe_type, command=None, url=None, running_period=HEALTH_PROBE_RUNNING_PERIOD_DEFAULT, timeout=HEALTH_PROBE_TIMEOUT_DEFAULT, interval=HEALTH_PROBE_INTERVAL_DEFAULT):
+        self.logger = logging.getLogger()
+
+        self.probe_type = HealthProbeType(probe_type)
+        self.command = command
+        self.url = url
+        self.running_period = running_period
+        self.timeout = timeout
+        self.interval = interval
+
+        if self.probe_type == HealthProbeType.command and not self.command:
+            raise ValueError("No command given for command health probe")
+        if self.probe_type == HealthProbeType.http and not self.url:
+            raise ValueError("No URL given for HTTP health probe")
+
+    def probe(self, name, runc):
+        deadline = time.monotonic() + self.timeout
+        if self.probe_type == HealthProbeType.running:
+            return self.__probe_running(name, runc, deadline)
+
+        # Retry until the application responds or the deadline has been reached (applications may take a while to come up)
+        while True:
+            remaining_time = deadline - time.monotonic()
+            if self.probe_type == HealthProbeType.command:
+                [healthy, message] = self.__probe_command(name, remaining_time)
+            else:
+                [healthy, message] = self.__probe_http(name, remaining_time)
+            if healthy:
+                return [True, message]
+
+            remaining_time = deadline - time.monotonic()
+            if remaining_time <= 0:
+                return [False, "Health probe of '{}' application did not succeed within {} seconds: {}".format(name, self.timeout, message)]
+            time.sleep(min(self.interval, remaining_time))
+
+    def __probe_command(self, name, timeout):
+        return run_command("'{}' application health probe".format(name), self.command, name, timeout=max(timeout, 0))
+
+    def __probe_http(self, name, timeout):
+        # Bypass any proxies configured in the environment, health endpoints are meant to be local
+        opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+        try:
+            with opener.open(self.url, timeout=max(timeout, 0.001)) as response:
+                return [True, "'{}' application health probe succeeded: {} responded with status {}".format(name, self.url, response.status)]
+        except Exception as err:
+            # HTTP error responses (e.g., 503) are raised as HTTPError
+            return [False, "{} did not respond successfully: {}".format(self.url, err)]
+
+    def __probe_running(self, name, runc, deadline):
+        end_time = min(time.monotonic() + self.running_period, deadline)
+        while True:
+            container_state = runc.get_container_state(name)
+            if container_state is not ContainerState.running:
+                return [False, "'{}' application stopped running within {} seconds after having been launched".format(name, self.running_period)]
+
+            remaining_time = end_time - time.monotonic()
+            if remaining_time <= 0:
+                return [True, "'{}' application kept running for {} seconds".format(name, self.running_period)]
+            time.sleep(min(self.interval, remaining_time))
@@ -1,16 +1,20 @@
 import os
+import time
 import shutil
 import logging
-from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 
 from fotahubclient.app_updater import AppUpdater
 from fotahubclient.json_document_models import LifecycleState, UpdateCompletionState
+from fotahubclient.app_run_mode import AppRunMode
 from fotahubclient.runc_operator import RunCOperator
 from fotahubclient.deployed_artifacts_tracker import DeployedArtifactsTracker
 from fotahubclient.update_status_tracker import UpdateStatusTracker
 import fotahubclient.common_constants as constants
 from fotahubclient.system_helper import touch
+from fotahubclient.pull_progress import create_pull_progress
 from fotahubclient.runc_operator import RunCOperator, ContainerState
+from fotahubclient.app_health_probe import AppHealthProbe
 
 class AppUpdateError(Exception):
     pass
@@ -27,21 +31,20 @@ def container_state_to_lifecycle_state(container_state, none_equivalent):
     else:
         raise ValueError("Unknown container state: {}".format(container_state))
 
-class AppRunMode(Enum):
-    automatic = 'automatic'
-    manual = 'manual'
-
-    def __str__(self):
-        return self.value
-
 class AppManager(object):
     
     def __init__(self, config):
         self.logger = logging.getLogger()
         self.config = config
 
-        self.runc = RunCOperator()
-        self.updater = AppUpdater(self.config.app_ostree_repo_path, self.config.ostree_gpg_verify)
+        self.runc = RunCOperator(
+            stop_grace_period=self.config.app_stop_grace_period, 
+            stop_timeout=self.config.app_stop_timeout, 
+            log_max_size=self.config.app_log_max_size, 
+            log_max_backups=self.config.app_log_max_backups, 
+            log_compress=self.config.app_log_compress
+        )
+        self.updater = AppUpdater(self.config.app_ostree_repo_path, self.config.ostree_gpg_verify, self.config.app_delta_checkout)
 
     def __to_app_deploy_path(self, name):
             return self.config.app_deploy_root + '/' + name
@@ -69,20 +72,34 @@ class AppManager(object):
         self.logger.info("Applying '{}' application update to revision '{}'".format(name, revision))
         self.updater.checkout_app_revision(name, revision, self.__to_app_deploy_path(name))
 
+    def __check_app_checkout(self, name):
+        # Delta checkouts change deployed applications path by path, so never launch an application whose checkout 
+        # has been interrupted midway and may therefore be a mix of two revisions until it gets checked out again
+        if not self.updater.is_app_checkout_complete(self.__to_app_deploy_path(name)):
+            raise ValueError("Checkout of '{}' application is incomplete (run 'fotahub deploy-applications' to have it checked out again)".format(name))
+
     def __run_app(self, name):
         if not self.__is_app_deployed(name):
             raise ValueError("Application '{}' not found".format(name))
+        self.__check_app_checkout(name)
 
         self.logger.info("Running '{}' application".format(name))
         [container_state, message] = self.runc.run_container(name, self.__to_app_deploy_path(name))
         return [container_state_to_lifecycle_state(container_state, LifecycleState.ready), message]
 
+    def __prepare_app(self, name):
+        if self.config.app_precreate_containers:
+            self.__check_app_checkout(name)
+
+            self.logger.info("Preparing '{}' application".format(name))
+            self.runc.create_container(name, self.__to_app_deploy_path(name))
+
     def __get_app_lifecycle_state(self, name):
         if not self.__is_app_deployed(name):
             raise ValueError("Application '{}' not found".format(name))
 
         self.logger.info("Retrieving '{}' application lifecycle state".format(name))
-        container_state = self.runc.get_container_state(name)
+        container_state = self.runc.get_container_state(name, from_snapshot=True)
         return container_state_to_lifecycle_state(container_state, LifecycleState.ready)
 
     def __read_app_logs(self, name, max_lines):
@@ -92,6 +109,13 @@ class AppManager(object):
         self.logger.info("Reading '{}' application logs".format(name))
         return self.runc.read_container_logs(self.__to_app_deploy_path(name), max_lines)
 
+    def __follow_app_logs(self, name):
+        if not self.__is_app_deployed(name):
+            raise ValueError("Application '{}' not found".format(name))
+
+        self.logger.info("Following '{}' application logs".format(name))
+        return self.runc.follow_container_logs(name, self.__to_app_deploy_path(name))
+
     def __halt_app(self, name):
         if not self.__is_app_deployed(name):
             raise ValueError("Application '{}' not found".format(name))
@@ -99,12 +123,106 @@ class AppManager(object):
         self.logger.info("Halting '{}' application".format(name))
         self.runc.delete_container(name)
 
+    def __verify_app_update(self, name, revision):
+        start_time = time.monotonic()
+        self.updater.verify_app_update(name, revision, self.config.app_verify_concurrency or os.cpu_count() or 1)
+        return time.monotonic() - start_time
+
+    def __self_test_app(self, name):
+        settings = self.config.app_health_probes.get(name)
+        if not settings or not self.__is_run_app_automatically(name):
+            return None
+
+        self.logger.info("Self testing '{}' application".format(name))
+        start_time = time.monotonic()
+        [healthy, message] = AppHealthProbe(**settings).probe(name, self.runc)
+        return [healthy, message, time.monotonic() - start_time]
+
+    def __restore_app_revision(self, name, revision):
+        self.__halt_app(name)
+        self.__deploy_app_revision(name, revision)
+
+        # Make sure that the restored revision and not the one that has been rolled back gets deployed upon next boot
+        self.updater.set_app_deploy_revision(name, revision)
+
+        if self.__is_run_app_automatically(name):
+            return self.__run_app(name)
+
+        self.__prepare_app(name)
+        return None
+
+    def __update_app(self, name, revision, previous_revision):
+        self.__halt_app(name)
+        self.__apply_app_update(name, revision)
+
+        if self.__is_run_app_automatically(name):
+            run_result = self.__run_app(name)
+        else:
+            self.__prepare_app(name)
+            run_result = None
+
+        # Roll back right away rather than when recording the outcome so that applications that fail 
+        # their self tests during batch updates are restored concurrently as well
+        self_test_result = self.__self_test_app(name)
+        rollback_result = None
+        if self_test_result is not None and not self_test_result[0]:
+            if not previous_revision:
+                raise AppUpdateError("'{}' application failed its self test and cannot be rolled back as no previous revision is available: {}".format(name, self_test_result[1]))
+
+            self.logger.warning("Rolling back '{}' application to revision '{}' as its self test failed".format(name, previous_revision))
+            start_time = time.monotonic()
+            rollback_run_result = self.__restore_app_revision(name, previous_revision)
+            rollback_result = [rollback_run_result, time.monotonic() - start_time]
+
+        return [run_result, self_test_result, rollback_result]
+
+    def __record_lifecycle_state(self, deploy_tracker, name, run_result):
+        if run_result is not None:
+            [lifecycle_state, message] = run_result
+            deploy_tracker.record_app_lifecycle_status_change(name, lifecycle_state=lifecycle_state, message=message)
+        else:
+            deploy_tracker.record_app_lifecycle_status_change(name, lifecycle_state=LifecycleState.ready)
+
+    def __record_app_update_outcome(self, deploy_tracker, update_tracker, name, revision, previous_revision, outcome):
+        [run_result, self_test_result, rollback_result] = outcome
+
+        deploy_tracker.record_app_deployed_revision_change(name, revision, updating=True)
+        update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.applied)
+        self.__record_lifecycle_state(deploy_tracker, name, run_result)
+
+        if self_test_result is None:
+            update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.confirmed, message='Application update successfully completed')
+            return True
+
+        [healthy, message, self_test_duration] = self_test_result
+        if healthy:
+            update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.confirmed, message='Application update successfully completed', self_test_duration=self_test_duration)
+            return True
+
+        [rollback_run_result, rollback_duration] = rollback_result
+        deploy_tracker.record_app_deployed_revision_change(name, previous_revision, updating=False)
+        self.__record_lifecycle_state(deploy_tracker, name, rollback_run_result)
+        update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.rolled_back, status=False, message='Update rolled back automatically as application self test failed: {}'.format(message), self_test_duration=self_test_duration, rollback_duration=rollback_duration)
+        return False
+
     def __delete_app(self, name):
         self.__halt_app(name)
 
         self.logger.info("Deleting '{}' application".format(name))
         shutil.rmtree(self.__to_app_deploy_path(name))
 
+    def __deploy_and_run_app(self, name, revision):
+        if self.updater.is_app_revision_deployed(name, revision, self.__to_app_deploy_path(name), self.config.app_deploy_integrity_check):
+            self.logger.info("Skipping deployment of '{}' application revision '{}' as the same is already deployed".format(name, revision))
+        else:
+            self.__deploy_app_revision(name, revision)
+
+        if self.__is_run_app_automatically(name):
+            return self.__run_app(name)
+        
+        self.__prepare_app(name)
+        return None
+
     def deploy_and_run_apps(self):
         with DeployedArtifactsTracker(self.config) as tracker:
             names = self.updater.list_app_names()
@@ -112,19 +230,27 @@ class AppManager(object):
             deploy_err = False
             if names:
                 self.logger.info("Deploying and launching applications")
-            for name in names:
-                revision = self.updater.get_app_deploy_revision(name)
-                tracker.register_app(name, revision)
-                try:
-                    self.__deploy_app_revision(name, revision)
-                    tracker.record_app_lifecycle_status_change(name, lifecycle_state=LifecycleState.ready)
 
-                    if self.__is_run_app_automatically(name):
-                        [lifecycle_state, message] = self.__run_app(name)
-                        tracker.record_app_lifecycle_status_change(name, lifecycle_state=lifecycle_state, message=message)
-                except Exception as err:
-                    tracker.record_app_lifecycle_status_change(name, status=False, message=str(err))
-                    deploy_err = True
+            revisions = {}
+            for name in names:
+                revisions[name] = self.updater.get_app_deploy_revision(name)
+                tracker.register_app(name, revisions[name])
+
+            # Check out and launch applications concurrently but record their outcomes sequentially 
+            # in the order the applications have been listed
+            with ThreadPoolExecutor(max_workers=max(1, self.config.app_deploy_concurrency)) as executor:
+                futures = [[name, executor.submit(self.__deploy_and_run_app, name, revisions[name])] for name in names]
+                for [name, future] in futures:
+                    try:
+                        run_result = future.result()
+                        tracker.record_app_lifecycle_status_change(name, lifecycle_state=LifecycleState.ready)
+
+                        if run_result is not None:
+                            [lifecycle_state, message] = run_result
+                            tracker.record_app_lifecycle_status_change(name, lifecycle_state=lifecycle_state, message=message)
+                    except Exception as err:
+                        tracker.record_app_lifecycle_status_change(name, status=False, message=str(err))
+                        deploy_err = True
         
         if deploy_err:
             raise AppUpdateError("Failed to deploy or run one or several applications (run 'fotahub describe-deployed-artifacts' to get more details)") 
@@ -148,46 +274,104 @@ class AppManager(object):
     def read_app_logs(self, name, max_lines):
         return self.__read_app_logs(name, max_lines)
 
+    def follow_app_logs(self, name):
+        return self.__follow_app_logs(name)
+
     def halt_app(self, name):
         with DeployedArtifactsTracker(self.config) as deploy_tracker:
             try:
                 self.__halt_app(name)
+                self.__prepare_app(name)
                 deploy_tracker.record_app_lifecycle_status_change(name, lifecycle_state=LifecycleState.ready)
             except Exception as err:
                 deploy_tracker.record_app_lifecycle_status_change(name, status=False, message=str(err))
                 raise AppUpdateError("Failed to halt '{}' application".format(name)) from err
 
-    def update_app(self, name, revision):
+    def prefetch_app_update(self, name, revision, source=None):
+        with UpdateStatusTracker(self.config) as update_tracker:
+            self.logger.info("Prefetching '{}' application revision '{}'".format(name, revision))
+            try:
+                update_tracker.record_app_update_status(name, revision=revision, completion_state=UpdateCompletionState.initiated)
+
+                pull_progress = self.updater.prefetch_app_update(name, revision, create_pull_progress(self.config, name), source)
+                update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.downloaded, pull_progress=pull_progress)
+            except Exception as err:
+                update_tracker.record_app_update_status(name, status=False, message=str(err))
+                raise AppUpdateError("Failed to prefetch '{}' application update".format(name)) from err
+
+    def update_app(self, name, revision, source=None):
         with DeployedArtifactsTracker(self.config) as deploy_tracker:
             with UpdateStatusTracker(self.config) as update_tracker:
                 self.logger.info("Updating '{}' application to revision '{}'".format(name, revision))
                 try:
                     update_tracker.record_app_update_status(name, revision=revision, completion_state=UpdateCompletionState.initiated)
+                    previous_revision = deploy_tracker.get_app_deployed_revision(name)
                     
-                    self.__halt_app(name)
-                    deploy_tracker.record_app_lifecycle_status_change(name, lifecycle_state=LifecycleState.ready)
-                    
-                    self.updater.pull_app_update(name, revision)
-                    update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.downloaded)
+                    # Keep application running while downloading its update
+                    pull_progress = self.updater.pull_app_update(name, revision, create_pull_progress(self.config, name), source)
+                    update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.downloaded, pull_progress=pull_progress)
 
-                    # TODO Implement checksum/signature verification
-                    update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.verified)
+                    verification_duration = self.__verify_app_update(name, revision)
+                    update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.verified, verification_duration=verification_duration)
                     
-                    self.__apply_app_update(name, revision)
-                    deploy_tracker.record_app_deployed_revision_change(name, revision, updating=True)
-                    update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.applied)
-
-                    if self.__is_run_app_automatically(name):
-                        [lifecycle_state, message] = self.__run_app(name)
-                        deploy_tracker.record_app_lifecycle_status_change(name, lifecycle_state=lifecycle_state, message=message)
-
-                    # TODO Implement app self testing and roll back app if the same fails 
-                    update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.confirmed, message='Application update successfully completed')
+                    outcome = self.__update_app(name, revision, previous_revision)
+                    confirmed = self.__record_app_update_outcome(deploy_tracker, update_tracker, name, revision, previous_revision, outcome)
                 except Exception as err:
                     deploy_tracker.record_app_lifecycle_status_change(name, status=False, message=str(err))
                     update_tracker.record_app_update_status(name, status=False, message=str(err))
                     raise AppUpdateError("Failed to update '{}' application".format(name)) from err
 
+        if not confirmed:
+            raise AppUpdateError("Failed to update '{}' application: update has been rolled back as application self test failed (run 'fotahub describe-update-status' to get more details)".format(name))
+
+    def update_apps(self, revisions, source=None):
+        with DeployedArtifactsTracker(self.config) as deploy_tracker:
+            with UpdateStatusTracker(self.config) as update_tracker:
+                self.logger.info("Updating {} application(s)".format(len(revisions)))
+                previous_revisions = {}
+                for name, revision in revisions.items():
+                    update_tracker.record_app_update_status(name, revision=revision, completion_state=UpdateCompletionState.initiated)
+                    previous_revisions[name] = deploy_tracker.get_app_deployed_revision(name)
+
+                # Download all application updates at once while all applications keep running; as the downloaded objects 
+                # cannot be attributed to individual applications, each of them gets the download info of the whole pull
+                try:
+                    pull_progress = self.updater.pull_app_updates(revisions, create_pull_progress(self.config, ','.join(revisions.keys())), source)
+                except Exception as err:
+                    for name in revisions.keys():
+                        update_tracker.record_app_update_status(name, status=False, message=str(err))
+                    raise AppUpdateError("Failed to download application updates") from err
+
+                for name in revisions.keys():
+                    update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.downloaded, pull_progress=pull_progress)
+
+                # Don't touch any application unless all application updates are intact
+                try:
+                    for name, revision in revisions.items():
+                        verification_duration = self.__verify_app_update(name, revision)
+                        update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.verified, verification_duration=verification_duration)
+                except Exception as err:
+                    for name in revisions.keys():
+                        update_tracker.record_app_update_status(name, status=False, message=str(err))
+                    raise AppUpdateError("Failed to verify application updates") from err
+
+                # Halt, check out, relaunch and self test applications concurrently but record their outcomes sequentially 
+                # in the order the applications have been listed
+                update_err = False
+                with ThreadPoolExecutor(max_workers=max(1, self.config.app_deploy_concurrency)) as executor:
+                    futures = [[name, executor.submit(self.__update_app, name, revision, previous_revisions[name])] for name, revision in revisions.items()]
+                    for [name, future] in futures:
+                        try:
+                            if not self.__record_app_update_outcome(deploy_tracker, update_tracker, name, revisions[name], previous_revisions[name], future.result()):
+                                update_err = True
+                        except Exception as err:
+                            deploy_tracker.record_app_lifecycle_status_change(name, status=False, message=str(err))
+                            update_tracker.record_app_update_status(name, status=False, message=str(err))
+                            update_err = True
+
+        if update_err:
+            raise AppUpdateError("Failed to update one or several applications (run 'fotahub describe-update-status' to get more details)")
+
     def roll_back_app(self, name):
         revision = self.updater.get_app_rollback_revision(name, self.config.deployed_artifacts_path)
         if not revision:
@@ -197,15 +381,9 @@ class AppManager(object):
             with UpdateStatusTracker(self.config) as update_tracker:
                 self.logger.info("Rolling back '{}' application to revision '{}'".format(name, revision))
                 try:
-                    self.__halt_app(name)
-                    deploy_tracker.record_app_lifecycle_status_change(name, lifecycle_state=LifecycleState.ready)
-
-                    self.__deploy_app_revision(name, revision)
+                    run_result = self.__restore_app_revision(name, revision)
                     deploy_tracker.record_app_deployed_revision_change(name, revision, updating=False)
-
-                    if self.__is_run_app_automatically(name):
-                        [lifecycle_state, message] = self.__run_app(name)
-                        deploy_tracker.record_app_lifecycle_status_change(name, lifecycle_state=lifecycle_state, message=message)
+                    self.__record_lifecycle_state(deploy_tracker, name, run_result)
 
                     update_tracker.record_app_update_status(name, completion_state=UpdateCompletionState.rolled_back, message='Update rolled back due to application-level or external request')
                 except Exception as err:
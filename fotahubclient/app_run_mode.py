@@ -0,0 +1,8 @@
+from enum import Enum
+
+class AppRunMode(Enum):
+    automatic = 'automatic'
+    manual = 'manual'
+
+    def __str__(self):
+        return self.value
@@ -13,9 +13,11 @@ from fotahubclient.system_helper import chowntree
 
 class AppUpdater(object):
 
-    def __init__(self, ostree_repo_path, ostree_gpg_verify):
+    def __init__(self, ostree_repo_path, ostree_gpg_verify, delta_checkout=False):
         self.logger = logging.getLogger()
 
+        self.delta_checkout = delta_checkout
+
         repo = self.__open_ostree_repo(ostree_repo_path)
         if repo:
             self.ostree_repo = OSTreeRepo(repo)
@@ -44,7 +46,7 @@ class AppUpdater(object):
             return []
         
         refs = self.ostree_repo.list_ostree_refs()
-        return [ref.split(':')[1] if ':' in ref else ref for ref in refs.keys()]
+        return [ref.split(':')[1] if ':' in ref else ref for ref in refs.keys() if not ref.startswith(constants.APP_RETAINED_REF_PREFIX)]
 
     def get_app_deploy_revision(self, name):
         if not self.ostree_repo:
@@ -52,6 +54,12 @@ class AppUpdater(object):
 
         return self.ostree_repo.resolve_ostree_revision(self.remote_name, name)
 
+    def set_app_deploy_revision(self, name, revision):
+        if not self.ostree_repo:
+            raise OSTreeError("Applications side loading operations are not supported on this system (no application OSTree repo available)")
+
+        self.ostree_repo.set_ostree_ref(self.remote_name, name, revision)
+
     def get_app_rollback_revision(self, name, deployed_artifacts_path):
         if os.path.isfile(deployed_artifacts_path) and os.path.getsize(deployed_artifacts_path) > 0:
             deployed_artifacts = DeployedArtifacts.load_deployed_artifacts(deployed_artifacts_path)
@@ -61,25 +69,193 @@ class AppUpdater(object):
         else:
             return None
 
-    def pull_app_update(self, name, revision):
+    def prefetch_app_update(self, name, revision, pull_progress=None, source=None):
+        self.logger.info("Prefetching '{}' application revision '{}'".format(name, revision))
+        if not self.ostree_repo:
+            raise OSTreeError("Applications side loading operations are not supported on this system (no application OSTree repo available)")
+
+        if self.ostree_repo.has_ostree_revision(revision):
+            self.logger.info("Skipping download of '{}' application revision '{}' as the same is already available locally".format(name, revision))
+            return None
+
+        # Leave application ref untouched as it determines which revision gets deployed upon next boot
+        return self.ostree_repo.pull_ostree_revision(self.remote_name, name, revision, constants.OSTREE_PULL_DEPTH, pull_progress, update_ref=False, source=source)
+
+    def pull_app_update(self, name, revision, pull_progress=None, source=None):
         self.logger.info("Pulling '{}' application revision '{}'".format(name, revision))
         if not self.ostree_repo:
             raise OSTreeError("Applications side loading operations are not supported on this system (no application OSTree repo available)")
 
-        self.ostree_repo.pull_ostree_revision(self.remote_name, name, revision, constants.OSTREE_PULL_DEPTH)
+        if self.ostree_repo.has_ostree_revision(revision):
+            # Revision has been prefetched before, only the application ref needs to be advanced
+            self.logger.info("Skipping download of '{}' application revision '{}' as the same is already available locally".format(name, revision))
+            self.ostree_repo.set_ostree_ref(self.remote_name, name, revision)
+            return None
 
-    def checkout_app_revision(self, name, revision, checkout_path):
-        self.logger.info("Checking out '{}' application revision '{}'".format(name, revision))
+        return self.ostree_repo.pull_ostree_revision(self.remote_name, name, revision, constants.OSTREE_PULL_DEPTH, pull_progress, source=source)
+
+    def pull_app_updates(self, revisions, pull_progress=None, source=None):
+        self.logger.info("Pulling {} application revision(s)".format(len(revisions)))
+        if not self.ostree_repo:
+            raise OSTreeError("Applications side loading operations are not supported on this system (no application OSTree repo available)")
+
+        missing_revisions = {}
+        for name, revision in revisions.items():
+            if self.ostree_repo.has_ostree_revision(revision):
+                self.logger.info("Skipping download of '{}' application revision '{}' as the same is already available locally".format(name, revision))
+                self.ostree_repo.set_ostree_ref(self.remote_name, name, revision)
+            else:
+                missing_revisions[name] = revision
+
+        if not missing_revisions:
+            return None
+        return self.ostree_repo.pull_ostree_revisions(self.remote_name, missing_revisions, constants.OSTREE_PULL_DEPTH, pull_progress, source=source)
+
+    def collect_garbage(self, retained_revisions, keep_revisions, cancellable=None):
+        self.logger.info('Collecting garbage in application OSTree repo')
+        if not self.ostree_repo:
+            return [0, 0, 0]
+
+        # Revisions that are not referenced by application refs but must be kept nonetheless (e.g., rollback or 
+        # prefetched revisions) get dedicated refs
+        self.ostree_repo.retain_ostree_revisions(constants.APP_RETAINED_REF_PREFIX, retained_revisions)
+
+        # Besides the revisions the refs point to, keep given number of revisions in the history of each application
+        return self.ostree_repo.prune_ostree_repo(max(keep_revisions, 1) - 1, cancellable)
+
+    def verify_app_update(self, name, revision, max_workers=1):
+        self.logger.info("Verifying '{}' application revision '{}'".format(name, revision))
         if not self.ostree_repo:
             raise OSTreeError("Applications side loading operations are not supported on this system (no application OSTree repo available)")
 
+        self.ostree_repo.verify_ostree_revision(self.remote_name, revision, max_workers)
+
+    def get_deployed_app_revision(self, checkout_path):
+        stamp_path = checkout_path + '/' + constants.APP_REVISION_STAMP_FILE_NAME
         try:
-            if os.path.isdir(checkout_path):
-                shutil.rmtree(checkout_path)
-            os.mkdir(checkout_path)
+            with open(stamp_path) as file:
+                return file.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def is_app_checkout_complete(self, checkout_path):
+        # Revision stamp is written last when checking out and removed first when a delta checkout starts changing the live tree
+        return self.get_deployed_app_revision(checkout_path) is not None
 
-            self.ostree_repo.checkout_at(revision, checkout_path)
+    def is_app_revision_deployed(self, name, revision, checkout_path, verify_integrity=False):
+        if revision is None or self.get_deployed_app_revision(checkout_path) != revision:
+            return False
 
-            chowntree(checkout_path, constants.APP_UID, constants.APP_GID)
+        if verify_integrity:
+            self.logger.debug("Verifying integrity of '{}' application revision '{}' deployed at '{}'".format(name, revision, checkout_path))
+            
+            try:
+                # Ignore added paths as deployments may contain files that are not part of the application itself (e.g., logs)
+                [modified, removed, _] = self.ostree_repo.diff_ostree_revision_against_path(revision, checkout_path, 0, 0)
+                intact = not modified and not removed
+                if not intact:
+                    self.logger.warning("Deployment of '{}' application revision '{}' has been tampered with ({} modified, {} removed path(s)), enforcing full checkout".format(name, revision, len(modified), len(removed)))
+            except OSTreeError as err:
+                self.logger.warning("Failed to verify integrity of '{}' application revision '{}', enforcing full checkout: {}".format(name, revision, err))
+                intact = False
+
+            if not intact:
+                self.__remove_revision_stamp(checkout_path)
+                return False
+
+        return True
+
+    def __write_revision_stamp(self, checkout_path, revision):
+        with open(checkout_path + '/' + constants.APP_REVISION_STAMP_FILE_NAME, 'w') as file:
+            file.write(revision)
+
+    def __remove_revision_stamp(self, checkout_path):
+        stamp_path = checkout_path + '/' + constants.APP_REVISION_STAMP_FILE_NAME
+        if os.path.isfile(stamp_path):
+            os.remove(stamp_path)
+
+    def checkout_app_revision(self, name, revision, checkout_path):
+        self.logger.info("Checking out '{}' application revision '{}'".format(name, revision))
+        if not self.ostree_repo:
+            raise OSTreeError("Applications side loading operations are not supported on this system (no application OSTree repo available)")
+
+        deployed_revision = self.get_deployed_app_revision(checkout_path) if os.path.isdir(checkout_path) else None
+        if self.delta_checkout and deployed_revision is not None:
+            try:
+                self.__checkout_app_revision_delta(name, deployed_revision, revision, checkout_path)
+                return
+            except Exception as err:
+                self.logger.warning("Failed to check out '{}' application revision '{}' incrementally, falling back to full checkout: {}".format(name, revision, err))
+
+        try:
+            self.__checkout_app_revision_full(revision, checkout_path)
         except GLib.Error as err:
             raise OSTreeError("Failed to check out '{}' application revision '{}'".format(name, revision)) from err
+
+    def __checkout_app_revision_full(self, revision, checkout_path):
+        if os.path.isdir(checkout_path):
+            shutil.rmtree(checkout_path)
+        os.mkdir(checkout_path)
+
+        self.ostree_repo.checkout_at(revision, checkout_path)
+
+        chowntree(checkout_path, constants.APP_UID, constants.APP_GID)
+
+        self.__write_revision_stamp(checkout_path, revision)
+
+    def __checkout_app_revision_delta(self, name, deployed_revision, revision, checkout_path):
+        [modified, removed, added] = self.ostree_repo.diff_ostree_revisions(deployed_revision, revision)
+
+        # Added (or removed) directories are listed along with everything they contain, 
+        # checking out (or removing) the directories themselves takes care of the latter
+        changed = self.__omit_nested_paths(modified + added)
+        removed = self.__omit_nested_paths(removed)
+        self.logger.debug("Applying delta from revision '{}' to revision '{}' to '{}' application: {} modified, {} removed, {} added path(s)".format(deployed_revision, revision, name, len(modified), len(removed), len(added)))
+
+        # Stage all new and modified paths beside the live tree (i.e., on the same file system) 
+        # so that they can be moved into the same by merely renaming them
+        staging_path = checkout_path + constants.APP_STAGING_DIR_SUFFIX
+        if os.path.isdir(staging_path):
+            shutil.rmtree(staging_path)
+        os.mkdir(staging_path)
+        try:
+            for path in changed:
+                staged_path = staging_path + path
+                os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+                self.ostree_repo.checkout_path_at(revision, path, staged_path)
+                chowntree(staged_path, constants.APP_UID, constants.APP_GID)
+
+            # Invalidate revision stamp while live tree is being changed so that any interrupted 
+            # delta checkout gets superseded by a full checkout next time
+            self.__remove_revision_stamp(checkout_path)
+
+            for path in removed:
+                self.__remove_path(checkout_path + path)
+            for path in changed:
+                live_path = checkout_path + path
+                staged_path = staging_path + path
+
+                # Files replace files atomically, anything involving directories must be cleared out of the way first
+                if (os.path.isdir(live_path) and not os.path.islink(live_path)) or (os.path.isdir(staged_path) and not os.path.islink(staged_path)):
+                    self.__remove_path(live_path)
+                os.replace(staged_path, live_path)
+        finally:
+            shutil.rmtree(staging_path, ignore_errors=True)
+
+        self.__write_revision_stamp(checkout_path, revision)
+
+    def __omit_nested_paths(self, paths):
+        path_set = set(paths)
+        return [path for path in paths if not any(parent in path_set for parent in self.__get_parent_paths(path))]
+
+    def __get_parent_paths(self, path):
+        parent = os.path.dirname(path)
+        while parent not in ('/', ''):
+            yield parent
+            parent = os.path.dirname(parent)
+
+    def __remove_path(self, path):
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        elif os.path.lexists(path):
+            os.remove(path)
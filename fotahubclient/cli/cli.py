@@ -4,11 +4,17 @@ import os
 
 import fotahubclient.config_loader as config_loader
 import fotahubclient.cli.command_interpreter as commands
-import fotahubclient.os_updater as os_updater
+import fotahubclient.common_constants as constants
 import fotahubclient.runc_operator as runc_operator
 from fotahubclient.cli.help_formatters import CommandHelpFormatter, OptionHelpFormatter
 from fotahubclient.cli.help_formatters import set_command_parser_titles
-from fotahubclient.app_manager import AppRunMode
+from fotahubclient.app_run_mode import AppRunMode
+
+def parse_app_revision(value):
+    [name, separator, revision] = value.partition('=')
+    if not separator or not name or not revision:
+        raise argparse.ArgumentTypeError("'{}' is not of the form NAME=REVISION".format(value))
+    return [name, revision]
 
 class CLI(object):
 
@@ -22,10 +28,16 @@ class CLI(object):
         self.cli_parser.add_argument('-s', '--stacktrace', action='store_true', default=False, help='enable output of stacktrace for exceptions (optional, disabled by default)')
         cmds = self.cli_parser.add_subparsers(dest='command')
 
+        cmd = cmds.add_parser(commands.PREFETCH_OPERATING_SYSTEM_CMD, help='download operating system revision ahead of updating to it', formatter_class=OptionHelpFormatter)
+        set_command_parser_titles(cmd)
+        cmd.add_argument('-r', '--revision', required=True, help='operating system revision to download')
+        cmd.add_argument('--source', help='local OSTree repo or static delta file to take operating system revision from instead of downloading it (optional, defaults to FotaHub)')
+
         cmd = cmds.add_parser(commands.UPDATE_OPERATING_SYSTEM_CMD, help='update operating system (involves a reboot)', formatter_class=OptionHelpFormatter)
         set_command_parser_titles(cmd)
         cmd.add_argument('-r', '--revision', required=True, help='operating system revision to update to')
-        cmd.add_argument('--max-reboot-failures', default=os_updater.MAX_REBOOT_FAILURES_DEFAULT, help='maximum number of reboot failures before automatically rolling back operating system update (optional, defaults to ' + str(os_updater.MAX_REBOOT_FAILURES_DEFAULT) + ')')
+        cmd.add_argument('--source', help='local OSTree repo or static delta file to take operating system revision from instead of downloading it (optional, defaults to FotaHub)')
+        cmd.add_argument('--max-reboot-failures', default=constants.MAX_REBOOT_FAILURES_DEFAULT, help='maximum number of reboot failures before automatically rolling back operating system update (optional, defaults to ' + str(constants.MAX_REBOOT_FAILURES_DEFAULT) + ')')
         
         cmd = cmds.add_parser(commands.ROLL_BACK_OPERATING_SYSTEM_CMD, help='roll back operating system to previous revision', formatter_class=OptionHelpFormatter)
         set_command_parser_titles(cmd)
@@ -48,16 +60,29 @@ class CLI(object):
         cmd = cmds.add_parser(commands.READ_APPLICATION_LOGS_CMD, help='read the logs of an application', formatter_class=OptionHelpFormatter)
         set_command_parser_titles(cmd)
         cmd.add_argument('-n', '--name', required=True, help='name of application of which to read the logs')
-        cmd.add_argument('-l', '--max-lines', default=runc_operator.MAX_LOG_LINES_DEFAULT, help='maximum number of log lines to read (optional, defaults to ' + str(runc_operator.MAX_LOG_LINES_DEFAULT) + ')')
+        cmd.add_argument('-l', '--max-lines', type=int, default=runc_operator.MAX_LOG_LINES_DEFAULT, help='maximum number of log lines to read (optional, defaults to ' + str(runc_operator.MAX_LOG_LINES_DEFAULT) + ')')
+        cmd.add_argument('-f', '--follow', action='store_true', default=False, help='keep reading log lines as they are being written until application exits (optional, disabled by default)')
 
         cmd = cmds.add_parser(commands.HALT_APPLICATION_CMD, help='halt an application', formatter_class=OptionHelpFormatter)
         set_command_parser_titles(cmd)
         cmd.add_argument('-n', '--name', required=True, help='name of application to halt')
 
+        cmd = cmds.add_parser(commands.PREFETCH_APPLICATION_CMD, help='download application revision ahead of updating to it', formatter_class=OptionHelpFormatter)
+        set_command_parser_titles(cmd)
+        cmd.add_argument('-n', '--name', required=True, help='name of application to download')
+        cmd.add_argument('-r', '--revision', required=True, help='application revision to download')
+        cmd.add_argument('--source', help='local OSTree repo or static delta file to take application revision from instead of downloading it (optional, defaults to FotaHub)')
+
         cmd = cmds.add_parser(commands.UPDATE_APPLICATION_CMD, help='update an application', formatter_class=OptionHelpFormatter)
         set_command_parser_titles(cmd)
         cmd.add_argument('-n', '--name', required=True, help='name of application to update')
         cmd.add_argument('-r', '--revision', required=True, help='application revision to update to')
+        cmd.add_argument('--source', help='local OSTree repo or static delta file to take application revision from instead of downloading it (optional, defaults to FotaHub)')
+
+        cmd = cmds.add_parser(commands.UPDATE_APPLICATIONS_CMD, help='update several applications at once', formatter_class=OptionHelpFormatter)
+        set_command_parser_titles(cmd)
+        cmd.add_argument('-m', '--manifest', metavar='NAME=REVISION', required=True, nargs='+', type=parse_app_revision, help='names of applications to update along with the revisions to update them to')
+        cmd.add_argument('--source', help='local OSTree repo or static delta file to take application revisions from instead of downloading them (optional, defaults to FotaHub)')
 
         cmd = cmds.add_parser(commands.ROLL_BACK_APPLICATION_CMD, help='roll back an application to previous revision', formatter_class=OptionHelpFormatter)
         set_command_parser_titles(cmd)
@@ -74,12 +99,19 @@ class CLI(object):
         cmd = cmds.add_parser(commands.DESCRIBE_UPDATE_STATUS_CMD, help='retrieve update status', formatter_class=OptionHelpFormatter)
         set_command_parser_titles(cmd)
         cmd.add_argument('-n', '--artifact-names', metavar='ARTIFACT_NAME', nargs='*', default=[], help='names of artifacts to consider (defaults to all artifacts)')
+
+        cmd = cmds.add_parser(commands.COLLECT_GARBAGE_CMD, help='remove objects which are no longer needed from operating system and application OSTree repos', formatter_class=OptionHelpFormatter)
+        set_command_parser_titles(cmd)
+        cmd.add_argument('-t', '--time-budget', type=float, default=None, help='maximum number of seconds to spend on garbage collection (optional, defaults to configured garbage collection time budget)')
         
-    def parse_args(self):
+    def parse_args(self, args=None):
+
+        if args is None:
+            args = sys.argv[1:]
 
         # Show help when no arguments are supplied
-        if len(sys.argv) == 1:
+        if not args:
             self.cli_parser.print_help()
             sys.exit(0)
 
-        return self.cli_parser.parse_args()
+        return self.cli_parser.parse_args(args)
@@ -0,0 +1,56 @@
+import os
+import sys
+import socket
+import logging
+
+from fotahubclient.command_channel import REQUEST_ARGS_KEY, REQUEST_WORKING_DIR_KEY, REQUEST_CONFIG_PATH_KEY, RESPONSE_STDOUT_KEY, RESPONSE_STDERR_KEY, RESPONSE_EXIT_CODE_KEY
+from fotahubclient.command_channel import write_message, read_message
+
+DAEMON_CONNECT_TIMEOUT = 1.0
+
+class CommandClient(object):
+
+    def __init__(self, socket_path):
+        self.logger = logging.getLogger()
+        self.socket_path = socket_path
+
+    def connect(self):
+        if not self.socket_path or not os.path.exists(self.socket_path):
+            return None
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(DAEMON_CONNECT_TIMEOUT)
+            sock.connect(self.socket_path)
+            sock.settimeout(None)
+            return sock
+        except OSError as err:
+            sock.close()
+            self.logger.debug("No FotaHub daemon reachable through '{}': {}".format(self.socket_path, err))
+            return None
+
+    def run(self, sock, args, stdout=None, stderr=None, config_path=None):
+        self.logger.debug("Forwarding command to FotaHub daemon through '{}'".format(self.socket_path))
+
+        stdout = stdout if stdout is not None else sys.stdout
+        stderr = stderr if stderr is not None else sys.stderr
+
+        with sock, sock.makefile('rwb') as stream:
+            # Relative paths in command line arguments (e.g., update sources) refer to working directory of the CLI, 
+            # and the command is to be executed with the configuration the CLI has loaded
+            request = { REQUEST_ARGS_KEY: args, REQUEST_WORKING_DIR_KEY: os.getcwd() }
+            if config_path:
+                request[REQUEST_CONFIG_PATH_KEY] = os.path.abspath(config_path)
+            write_message(stream, request)
+            while True:
+                message = read_message(stream)
+                if message is None:
+                    raise ConnectionError('FotaHub daemon closed connection before command has been completed')
+                if RESPONSE_STDOUT_KEY in message:
+                    stdout.write(message[RESPONSE_STDOUT_KEY])
+                    stdout.flush()
+                elif RESPONSE_STDERR_KEY in message:
+                    stderr.write(message[RESPONSE_STDERR_KEY])
+                    stderr.flush()
+                elif RESPONSE_EXIT_CODE_KEY in message:
+                    return message[RESPONSE_EXIT_CODE_KEY]
@@ -1,10 +1,6 @@
 import logging
 
-from fotahubclient.os_update_manager import OSUpdateManager
-from fotahubclient.app_manager import AppManager
-from fotahubclient.update_status_describer import UpdateStatusDescriber
-from fotahubclient.deployed_artifacts_describer import DeployedArtifactsDescriber
-
+PREFETCH_OPERATING_SYSTEM_CMD = 'prefetch-operating-system'
 UPDATE_OPERATING_SYSTEM_CMD = 'update-operating-system'
 ROLL_BACK_OPERATING_SYSTEM_CMD = 'roll-back-operating-system'
 FINALIZE_OPERATING_SYSTEM_CHANGE_CMD = 'finalize-operating-system-change'
@@ -13,21 +9,31 @@ CONFIGURE_APPLICATION_CMD = 'configure-application'
 RUN_APPLICATION_CMD = 'run-application'
 READ_APPLICATION_LOGS_CMD = 'read-application-logs'
 HALT_APPLICATION_CMD = 'halt-application'
+PREFETCH_APPLICATION_CMD = 'prefetch-application'
 UPDATE_APPLICATION_CMD = 'update-application'
+UPDATE_APPLICATIONS_CMD = 'update-applications'
 ROLL_BACK_APPLICATION_CMD = 'roll-back-application'
 DELETE_APPLICATION_CMD = 'delete-application'
 DESCRIBE_DEPLOYED_ARTIFACTS_CMD = 'describe-deployed-artifacts'
 DESCRIBE_UPDATE_STATUS_CMD = 'describe-update-status'
+COLLECT_GARBAGE_CMD = 'collect-garbage'
 
 class CommandInterpreter(object):
 
-    def __init__(self, config):
+    def __init__(self, config, cache_managers=False):
         self.logger = logging.getLogger()
         self.config = config
 
+        # Keep managers along with the repos and sysroot they have opened for subsequent commands (used by resident daemon)
+        self.cache_managers = cache_managers
+        self.os_update_manager = None
+        self.app_manager = None
+
     def run(self, args):
-        if args.command == UPDATE_OPERATING_SYSTEM_CMD:
-            self.update_operating_system(args.revision, args.max_reboot_failures)
+        if args.command == PREFETCH_OPERATING_SYSTEM_CMD:
+            self.prefetch_operating_system(args.revision, args.source)
+        elif args.command == UPDATE_OPERATING_SYSTEM_CMD:
+            self.update_operating_system(args.revision, args.max_reboot_failures, args.source)
         elif args.command == ROLL_BACK_OPERATING_SYSTEM_CMD:
             self.roll_back_operating_system()
         elif args.command == FINALIZE_OPERATING_SYSTEM_CHANGE_CMD:
@@ -39,11 +45,15 @@ class CommandInterpreter(object):
         elif args.command == RUN_APPLICATION_CMD:
             self.run_application(args.name)
         elif args.command == READ_APPLICATION_LOGS_CMD:
-            self.read_application_logs(args.name, args.max_lines)
+            self.read_application_logs(args.name, args.max_lines, args.follow)
         elif args.command == HALT_APPLICATION_CMD:
             self.halt_application(args.name)
+        elif args.command == PREFETCH_APPLICATION_CMD:
+            self.prefetch_application(args.name, args.revision, args.source)
         elif args.command == UPDATE_APPLICATION_CMD:
-            self.update_application(args.name, args.revision)
+            self.update_application(args.name, args.revision, args.source)
+        elif args.command == UPDATE_APPLICATIONS_CMD:
+            self.update_applications(dict(args.manifest), args.source)
         elif args.command == ROLL_BACK_APPLICATION_CMD:
             self.roll_back_application(args.name)
         elif args.command == DELETE_APPLICATION_CMD:
@@ -52,85 +62,150 @@ class CommandInterpreter(object):
             self.describe_deployed_artifacts(args.artifact_names)
         elif args.command == DESCRIBE_UPDATE_STATUS_CMD:
             self.describe_update_status(args.artifact_names)
+        elif args.command == COLLECT_GARBAGE_CMD:
+            self.collect_garbage(args.time_budget)
 
-    def update_operating_system(self, revision, max_reboot_failures):
-        self.logger.debug("Initiating OS update to revision '{}'".format(revision))
+    # Managers and describers are imported only once the command requiring them is run, so that commands 
+    # which don't deal with OSTree repos don't pay for loading GObject introspection and the OSTree typelib
+
+    def __get_os_update_manager(self):
+        if self.os_update_manager is not None:
+            # OS deployments may have been changed by other processes in the meantime
+            self.os_update_manager.updater.reload_sysroot_if_changed()
+            return self.os_update_manager
 
+        from fotahubclient.os_update_manager import OSUpdateManager
         manager = OSUpdateManager(self.config)
-        manager.initiate_os_update(revision, max_reboot_failures)
+        if self.cache_managers:
+            self.os_update_manager = manager
+        return manager
+
+    def __get_app_manager(self):
+        if self.app_manager is not None:
+            return self.app_manager
+
+        from fotahubclient.app_manager import AppManager
+        manager = AppManager(self.config)
+        if self.cache_managers:
+            self.app_manager = manager
+        return manager
+
+    def prefetch_operating_system(self, revision, source=None):
+        self.logger.debug("Prefetching OS revision '{}'".format(revision))
+
+        manager = self.__get_os_update_manager()
+        manager.prefetch_os_update(revision, source)
+
+    def update_operating_system(self, revision, max_reboot_failures, source=None):
+        self.logger.debug("Initiating OS update to revision '{}'".format(revision))
+
+        manager = self.__get_os_update_manager()
+        manager.initiate_os_update(revision, max_reboot_failures, source)
 
     def roll_back_operating_system(self):
         self.logger.debug('Rolling back OS to previous revision')
 
-        manager = OSUpdateManager(self.config)
+        manager = self.__get_os_update_manager()
         manager.roll_back_os_update()
 
     def finalize_operating_system_change(self):
         self.logger.debug('Finalizing OS update or rollback in case any such has just happened')
 
-        manager = OSUpdateManager(self.config)
+        manager = self.__get_os_update_manager()
         manager.finalize_os_update()
 
     def deploy_applications(self):
         self.logger.debug('Deploying applications and running those configured to be run automatically')
         
-        manager = AppManager(self.config)
+        manager = self.__get_app_manager()
         manager.deploy_and_run_apps()
 
     def configure_application(self, name, run_mode):
         self.logger.debug('Configuring ' + name + ' application')
         
-        manager = AppManager(self.config)
+        manager = self.__get_app_manager()
         manager.configure_app(name, run_mode)
 
     def run_application(self, name):
         self.logger.debug('Running ' + name + ' application')
         
-        manager = AppManager(self.config)
+        manager = self.__get_app_manager()
         message = manager.run_app(name)
         if message:
             print(message)
 
-    def read_application_logs(self, name, max_lines):
+    def read_application_logs(self, name, max_lines, follow=False):
         self.logger.debug('Reading ' + name + ' application logs')
         
-        manager = AppManager(self.config)
+        manager = self.__get_app_manager()
+
+        # Start following logs before reading the last lines so that nothing being logged in between gets lost
+        followed_logs = manager.follow_app_logs(name) if follow else None
+
         logs = manager.read_app_logs(name, max_lines)
         if logs:
             print(logs)
 
+        if followed_logs is not None:
+            try:
+                for logs in followed_logs:
+                    print(logs, end='', flush=True)
+            except KeyboardInterrupt:
+                pass
+
     def halt_application(self, name):
         self.logger.debug('Halting ' + name + ' application')
         
-        manager = AppManager(self.config)
+        manager = self.__get_app_manager()
         manager.halt_app(name)
 
-    def update_application(self, name, revision):
+    def prefetch_application(self, name, revision, source=None):
+        self.logger.debug("Prefetching " + name + " application revision '{}'".format(revision))
+        
+        manager = self.__get_app_manager()
+        manager.prefetch_app_update(name, revision, source)
+
+    def update_application(self, name, revision, source=None):
         self.logger.debug("Updating ' + name + ' application to revision '{}'".format(revision))
         
-        manager = AppManager(self.config)
-        manager.update_app(name, revision)
+        manager = self.__get_app_manager()
+        manager.update_app(name, revision, source)
+
+    def update_applications(self, revisions, source=None):
+        self.logger.debug("Updating " + ', '.join(revisions.keys()) + " applications")
+        
+        manager = self.__get_app_manager()
+        manager.update_apps(revisions, source)
 
     def roll_back_application(self, name):
         self.logger.debug('Rolling back ' + name + ' application to previous revision ')
         
-        manager = AppManager(self.config)
+        manager = self.__get_app_manager()
         manager.roll_back_app(name)
 
     def delete_application(self, name):
         self.logger.debug('Deleting ' + name + ' application')
         
-        manager = AppManager(self.config)
+        manager = self.__get_app_manager()
         manager.delete_app(name)
 
     def describe_deployed_artifacts(self, artifact_names=[]):
         self.logger.debug('Retrieving deployed artifacts')
 
-        describer = DeployedArtifactsDescriber(self.config)
+        from fotahubclient.deployed_artifacts_describer import DeployedArtifactsDescriber
+        describer = DeployedArtifactsDescriber(self.config, self.__get_app_manager() if self.cache_managers else None)
         print(describer.describe_deployed_artifacts(artifact_names))
 
     def describe_update_status(self, artifact_names=[]):
         self.logger.debug('Retrieving update status')
 
+        from fotahubclient.update_status_describer import UpdateStatusDescriber
         describer = UpdateStatusDescriber(self.config)
         print(describer.describe_update_status(artifact_names))
+
+    def collect_garbage(self, time_budget=None):
+        self.logger.debug('Collecting garbage in local OSTree repos')
+
+        from fotahubclient.garbage_collector import GarbageCollector
+        collector = GarbageCollector(self.config)
+        print(collector.collect_garbage(time_budget if time_budget is not None else self.config.gc_time_budget).serialize())
@@ -1,12 +1,17 @@
 import sys
 import logging
-import traceback
 
 from fotahubclient.cli.cli import CLI
 from fotahubclient.config_loader import ConfigLoader
 from fotahubclient.cli.command_interpreter import CommandInterpreter
+import fotahubclient.cli.command_interpreter as commands
+from fotahubclient.cli.command_client import CommandClient
 import fotahubclient.common_constants as constants
-from fotahubclient.system_helper import join_exception_messages
+from fotahubclient.system_helper import format_exception_report
+
+def is_long_running_command(args):
+    return (args.command == commands.READ_APPLICATION_LOGS_CMD and args.follow) or \
+        args.command in [commands.PREFETCH_OPERATING_SYSTEM_CMD, commands.PREFETCH_APPLICATION_CMD]
 
 def main():
     config = None
@@ -19,14 +24,20 @@ def main():
 
         logging.basicConfig(stream=sys.stdout, level=config.log_level, format=constants.LOG_MESSAGE_FORMAT, datefmt=constants.LOG_DATE_FORMAT)
 
-        command_interpreter = CommandInterpreter(config)
-        command_interpreter.run(args)
-    except Exception as err:
-        if config is not None and config.stacktrace:
-            print(''.join(traceback.format_exception(type(err), err, err.__traceback__)), file=sys.stderr)
+        # Let resident FotaHub daemon execute the command if there is any, execute it right here otherwise
+        # (except for following application logs or prefetching updates which would keep the daemon from serving other commands)
+        client = CommandClient(config.daemon_socket_path)
+        sock = client.connect() if not is_long_running_command(args) else None
+        if sock is not None:
+            exit_code = client.run(sock, sys.argv[1:], config_path=config.config_path)
+            if exit_code:
+                sys.exit(exit_code)
         else:
-            print('ERROR: ' + join_exception_messages(err), file=sys.stderr)
+            command_interpreter = CommandInterpreter(config)
+            command_interpreter.run(args)
+    except Exception as err:
+        print(format_exception_report(err, config is not None and config.stacktrace), file=sys.stderr)
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
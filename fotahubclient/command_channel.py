@@ -0,0 +1,39 @@
+import json
+
+# Messages exchanged between 'fotahub' CLI and resident FotaHub daemon are JSON objects, one per line:
+# the CLI sends a single request carrying its command line arguments, the daemon answers with any number
+# of output messages followed by a final message carrying the exit code of the command
+REQUEST_ARGS_KEY = 'Args'
+REQUEST_WORKING_DIR_KEY = 'WorkingDir'
+REQUEST_CONFIG_PATH_KEY = 'ConfigPath'
+RESPONSE_STDOUT_KEY = 'Stdout'
+RESPONSE_STDERR_KEY = 'Stderr'
+RESPONSE_EXIT_CODE_KEY = 'ExitCode'
+
+def write_message(stream, message):
+    stream.write((json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8'))
+    stream.flush()
+
+def read_message(stream):
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+class OutputChannel(object):
+
+    def __init__(self, stream, key):
+        self.stream = stream
+        self.key = key
+
+    def write(self, text):
+        if text and self.stream is not None:
+            try:
+                write_message(self.stream, { self.key: text })
+            except OSError:
+                # Keep executing the command even if the client has gone away
+                self.stream = None
+        return len(text)
+
+    def flush(self):
+        pass
@@ -3,10 +3,17 @@ FOTAHUB_OSTREE_REMOTE_URL = 'https://delta.fotahub.com'
 
 OSTREE_PULL_DEPTH = 1
 
+MAX_REBOOT_FAILURES_DEFAULT = 3
+
 APP_UID = 1000
 APP_GID = 1000
 
 APP_AUTORUN_MARKER_FILE_NAME = 'autorun'
+APP_REVISION_STAMP_FILE_NAME = '.revision'
+APP_STAGING_DIR_SUFFIX = '.staging'
+APP_RETAINED_REF_PREFIX = 'fotahub/retained/'
+
+OS_RETAINED_REF_PREFIX = 'fotahub/retained/'
 
 LOG_MESSAGE_FORMAT = '%(asctime)s %(levelname)-8s %(message)s'
 LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
\ No newline at end of file
@@ -7,6 +7,26 @@ DISTRO_NAME_DEFAULT = 'os'
 REBOOT_OPTIONS_DEFAULT = '--force'
 DEPLOYED_ARTIFACTS_PATH_DEFAULT = '/var/log/fotahub/deployed-artifacts.json'
 UPDATE_STATUS_PATH_DEFAULT = '/var/log/fotahub/update-status.json'
+UPDATE_STATUS_JOURNAL_MAX_ENTRIES_DEFAULT = 64
+DAEMON_SOCKET_PATH_DEFAULT = '/run/fotahub/fotahub.sock'
+PULL_PROGRESS_INTERVAL_DEFAULT = 1.0
+GC_TIME_BUDGET_DEFAULT = 60.0
+GC_IDLE_DELAY_DEFAULT = 300.0
+GC_INTERVAL_DEFAULT = 86400.0
+OS_STATUS_SNAPSHOT_PATH_DEFAULT = '/run/fotahub/os-status.json'
+APP_DEPLOY_CONCURRENCY_DEFAULT = 4
+APP_STOP_GRACE_PERIOD_DEFAULT = 5
+APP_STOP_TIMEOUT_DEFAULT = 10
+APP_LOG_MAX_SIZE_DEFAULT = 0
+APP_LOG_MAX_BACKUPS_DEFAULT = 2
+APP_GC_KEEP_REVISIONS_DEFAULT = 1
+APP_VERIFY_CONCURRENCY_DEFAULT = 0
+APP_HEALTH_PROBE_TIMEOUT_DEFAULT = 30.0
+APP_HEALTH_PROBE_INTERVAL_DEFAULT = 1.0
+APP_HEALTH_PROBE_RUNNING_PERIOD_DEFAULT = 10.0
+
+# Settings of individual applications go into sections named after the same (e.g., [App.hello-world])
+APP_SECTION_PREFIX = 'App.'
 
 SYSTEM_CONFIG_PATH = '/etc/fotahub.conf'
 USER_CONFIG_FILE_NAME = '.fotahub'
@@ -20,6 +40,17 @@ class ConfigLoader(object):
 
         self.deployed_artifacts_path = None
         self.update_status_path = None
+        self.update_status_journal_max_entries = UPDATE_STATUS_JOURNAL_MAX_ENTRIES_DEFAULT
+        self.update_status_journal_compact_on_exit = False
+
+        self.daemon_socket_path = DAEMON_SOCKET_PATH_DEFAULT
+
+        self.pull_progress_path = None
+        self.pull_progress_interval = PULL_PROGRESS_INTERVAL_DEFAULT
+
+        self.gc_time_budget = GC_TIME_BUDGET_DEFAULT
+        self.gc_idle_delay = GC_IDLE_DELAY_DEFAULT
+        self.gc_interval = GC_INTERVAL_DEFAULT
         
         self.log_level = logging.WARNING
         if verbose:
@@ -32,9 +63,22 @@ class ConfigLoader(object):
         self.os_reboot_options = None
         self.os_update_verification_command = None
         self.os_update_self_test_command = None
+        self.os_status_snapshot_path = OS_STATUS_SNAPSHOT_PATH_DEFAULT
 
         self.app_ostree_repo_path = None
         self.app_deploy_root = None
+        self.app_delta_checkout = True
+        self.app_deploy_integrity_check = False
+        self.app_deploy_concurrency = APP_DEPLOY_CONCURRENCY_DEFAULT
+        self.app_precreate_containers = False
+        self.app_stop_grace_period = APP_STOP_GRACE_PERIOD_DEFAULT
+        self.app_stop_timeout = APP_STOP_TIMEOUT_DEFAULT
+        self.app_log_max_size = APP_LOG_MAX_SIZE_DEFAULT
+        self.app_log_max_backups = APP_LOG_MAX_BACKUPS_DEFAULT
+        self.app_log_compress = False
+        self.app_gc_keep_revisions = APP_GC_KEEP_REVISIONS_DEFAULT
+        self.app_verify_concurrency = APP_VERIFY_CONCURRENCY_DEFAULT
+        self.app_health_probes = {}
 
     def load(self):
         user_config_path = os.path.expanduser("~") + '/' + USER_CONFIG_FILE_NAME
@@ -51,6 +95,17 @@ class ConfigLoader(object):
 
             self.deployed_artifacts_path = config.get('General', 'DeployedArtifactsPath', fallback=DEPLOYED_ARTIFACTS_PATH_DEFAULT)
             self.update_status_path = config.get('General', 'UpdateStatusPath', fallback=UPDATE_STATUS_PATH_DEFAULT)
+            self.update_status_journal_max_entries = config.getint('General', 'UpdateStatusJournalMaxEntries', fallback=UPDATE_STATUS_JOURNAL_MAX_ENTRIES_DEFAULT)
+            self.update_status_journal_compact_on_exit = config.getboolean('General', 'UpdateStatusJournalCompactOnExit', fallback=False)
+
+            self.daemon_socket_path = config.get('General', 'DaemonSocketPath', fallback=DAEMON_SOCKET_PATH_DEFAULT)
+
+            self.pull_progress_path = config.get('General', 'PullProgressPath', fallback=None)
+            self.pull_progress_interval = config.getfloat('General', 'PullProgressInterval', fallback=PULL_PROGRESS_INTERVAL_DEFAULT)
+
+            self.gc_time_budget = config.getfloat('General', 'GCTimeBudget', fallback=GC_TIME_BUDGET_DEFAULT)
+            self.gc_idle_delay = config.getfloat('General', 'GCIdleDelay', fallback=GC_IDLE_DELAY_DEFAULT)
+            self.gc_interval = config.getfloat('General', 'GCInterval', fallback=GC_INTERVAL_DEFAULT)
 
             if config.getboolean('General', 'Verbose', fallback=False):
                 self.log_level = logging.INFO
@@ -63,9 +118,32 @@ class ConfigLoader(object):
             self.os_reboot_options = config.get('OS', 'OSRebootOptions', fallback=REBOOT_OPTIONS_DEFAULT).split()
             self.os_update_verification_command = config.get('OS', 'OSUpdateVerificationCommand', fallback=None)
             self.os_update_self_test_command = config.get('OS', 'OSUpdateSelfTestCommand', fallback=None)
+            self.os_status_snapshot_path = config.get('OS', 'OSStatusSnapshotPath', fallback=OS_STATUS_SNAPSHOT_PATH_DEFAULT)
 
             self.app_ostree_repo_path = config.get('App', 'AppOSTreeRepoPath')
             self.app_deploy_root = config.get('App', 'AppDeployRoot')
+            self.app_delta_checkout = config.getboolean('App', 'AppDeltaCheckout', fallback=True)
+            self.app_deploy_integrity_check = config.getboolean('App', 'AppDeployIntegrityCheck', fallback=False)
+            self.app_deploy_concurrency = config.getint('App', 'AppDeployConcurrency', fallback=APP_DEPLOY_CONCURRENCY_DEFAULT)
+            self.app_precreate_containers = config.getboolean('App', 'AppPrecreateContainers', fallback=False)
+            self.app_stop_grace_period = config.getfloat('App', 'AppStopGracePeriod', fallback=APP_STOP_GRACE_PERIOD_DEFAULT)
+            self.app_stop_timeout = config.getfloat('App', 'AppStopTimeout', fallback=APP_STOP_TIMEOUT_DEFAULT)
+            self.app_log_max_size = config.getint('App', 'AppLogMaxSize', fallback=APP_LOG_MAX_SIZE_DEFAULT)
+            self.app_log_max_backups = config.getint('App', 'AppLogMaxBackups', fallback=APP_LOG_MAX_BACKUPS_DEFAULT)
+            self.app_log_compress = config.getboolean('App', 'AppLogCompress', fallback=False)
+            self.app_gc_keep_revisions = config.getint('App', 'AppGCKeepRevisions', fallback=APP_GC_KEEP_REVISIONS_DEFAULT)
+            self.app_verify_concurrency = config.getint('App', 'AppVerifyConcurrency', fallback=APP_VERIFY_CONCURRENCY_DEFAULT)
+
+            for section in config.sections():
+                if section.startswith(APP_SECTION_PREFIX) and config.has_option(section, 'HealthProbeType'):
+                    self.app_health_probes[section[len(APP_SECTION_PREFIX):]] = {
+                        'probe_type': config.get(section, 'HealthProbeType'),
+                        'command': config.get(section, 'HealthProbeCommand', fallback=None),
+                        'url': config.get(section, 'HealthProbeURL', fallback=None),
+                        'running_period': config.getfloat(section, 'HealthProbeRunningPeriod', fallback=APP_HEALTH_PROBE_RUNNING_PERIOD_DEFAULT),
+                        'timeout': config.getfloat(section, 'HealthProbeTimeout', fallback=APP_HEALTH_PROBE_TIMEOUT_DEFAULT),
+                        'interval': config.getfloat(section, 'HealthProbeInterval', fallback=APP_HEALTH_PROBE_INTERVAL_DEFAULT)
+                    }
         except configparser.NoSectionError as err:
             raise ValueError("No '{}' section in FotaHub configuration file {}".format(err.section, self.config_path))
         except configparser.NoOptionError as err:
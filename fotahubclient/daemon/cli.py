@@ -16,6 +16,7 @@ class CLI(object):
         self.cli_parser.add_argument('-v', '--verbose', action='store_true', default=False, help='enable verbose output (optional, disabled by default)')
         self.cli_parser.add_argument('-d', '--debug', action='store_true', default=False, help='enable debug output (optional, disabled by default)')
         self.cli_parser.add_argument('-s', '--stacktrace', action='store_true', default=False, help='enable output of stacktrace for exceptions (optional, disabled by default)')
+        self.cli_parser.add_argument('-r', '--resident', action='store_true', default=False, help='keep running after boot-time operations and serve commands issued through the fotahub CLI (optional, disabled by default)')
 
     def parse_args(self):
 
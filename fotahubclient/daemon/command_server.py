@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import socket
+import logging
+import socketserver
+from contextlib import redirect_stdout, redirect_stderr
+
+import fotahubclient.common_constants as constants
+from fotahubclient.cli.cli import CLI
+from fotahubclient.cli.command_interpreter import CommandInterpreter
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.command_channel import REQUEST_ARGS_KEY, REQUEST_WORKING_DIR_KEY, REQUEST_CONFIG_PATH_KEY, RESPONSE_STDOUT_KEY, RESPONSE_STDERR_KEY, RESPONSE_EXIT_CODE_KEY
+from fotahubclient.command_channel import OutputChannel, write_message, read_message
+from fotahubclient.system_helper import format_exception_report
+
+# Only privileged users may run commands through the daemon
+DAEMON_SOCKET_UMASK = 0o177
+
+def to_command_log_level(args, default_log_level):
+    if args.debug:
+        return logging.DEBUG
+    if args.verbose:
+        return logging.INFO
+    return default_log_level
+
+class CommandRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        request = read_message(self.rfile)
+        if request is None:
+            return
+
+        exit_code = self.server.execute_command(
+            request.get(REQUEST_ARGS_KEY, []), 
+            OutputChannel(self.wfile, RESPONSE_STDOUT_KEY), 
+            OutputChannel(self.wfile, RESPONSE_STDERR_KEY),
+            request.get(REQUEST_WORKING_DIR_KEY),
+            request.get(REQUEST_CONFIG_PATH_KEY)
+        )
+        try:
+            write_message(self.wfile, { RESPONSE_EXIT_CODE_KEY: exit_code })
+        except OSError:
+            self.server.logger.debug('Client disconnected before having received exit code of command')
+
+class CommandServer(socketserver.UnixStreamServer):
+
+    def __init__(self, config, command_interpreter):
+        self.logger = logging.getLogger()
+        self.config = config
+        self.command_interpreter = command_interpreter
+
+        self.socket_path = self.config.daemon_socket_path
+        self.__remove_stale_socket()
+
+        parent = os.path.dirname(self.socket_path)
+        if parent and not os.path.isdir(parent):
+            os.makedirs(parent, exist_ok=True)
+
+        umask = os.umask(DAEMON_SOCKET_UMASK)
+        try:
+            super().__init__(self.socket_path, CommandRequestHandler)
+        finally:
+            os.umask(umask)
+
+        self.logger.info("Serving commands through '{}'".format(self.socket_path))
+
+        self.last_command_time = time.monotonic()
+        self.last_gc_time = None
+
+    def __remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            self.logger.debug("Removing stale socket '{}'".format(self.socket_path))
+            os.remove(self.socket_path)
+            return
+        finally:
+            sock.close()
+        raise OSError("Another FotaHub daemon is already serving commands through '{}'".format(self.socket_path))
+
+    def service_actions(self):
+        # Collect garbage when no commands have been served for a while (invoked by serve_forever() between requests)
+        if self.config.gc_interval <= 0:
+            return
+
+        now = time.monotonic()
+        if now - self.last_command_time >= self.config.gc_idle_delay and (self.last_gc_time is None or now - self.last_gc_time >= self.config.gc_interval):
+            self.last_gc_time = now
+            try:
+                self.collect_garbage()
+            except Exception as err:
+                self.logger.warning('Failed to collect garbage: {}'.format(err))
+
+    def collect_garbage(self):
+        from fotahubclient.garbage_collector import GarbageCollector
+        GarbageCollector(self.config).collect_garbage(self.config.gc_time_budget)
+
+    def __get_command_interpreter(self, config_path, parsed_args):
+        if not config_path or os.path.realpath(config_path) == os.path.realpath(self.config.config_path):
+            return self.command_interpreter
+
+        # Honor configuration loaded by the client (e.g., as per its -c option) rather than executing the command with the daemon's one
+        self.logger.debug("Executing command with configuration '{}'".format(config_path))
+        config = ConfigLoader(config_path=config_path, verbose=parsed_args.verbose, debug=parsed_args.debug, stacktrace=parsed_args.stacktrace)
+        config.load()
+        return CommandInterpreter(config)
+
+    def execute_command(self, args, stdout, stderr, working_dir=None, config_path=None):
+        root_logger = logging.getLogger()
+        root_log_level = root_logger.level
+        daemon_working_dir = os.getcwd()
+
+        # Forward log messages emitted while executing the command to the client
+        log_handler = logging.StreamHandler(stdout)
+        log_handler.setFormatter(logging.Formatter(constants.LOG_MESSAGE_FORMAT, constants.LOG_DATE_FORMAT))
+
+        stacktrace = self.config.stacktrace
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    # Commands are executed one after another, so switching the working directory of the whole daemon is safe
+                    if working_dir:
+                        os.chdir(working_dir)
+
+                    parsed_args = CLI().parse_args(args)
+                    stacktrace = stacktrace or parsed_args.stacktrace
+
+                    log_handler.setLevel(to_command_log_level(parsed_args, self.config.log_level))
+                    root_logger.addHandler(log_handler)
+                    root_logger.setLevel(min(root_log_level, log_handler.level))
+
+                    self.__get_command_interpreter(config_path, parsed_args).run(parsed_args)
+                    return 0
+                except SystemExit as err:
+                    # Raised by argument parser upon invalid arguments or when printing help
+                    return err.code if isinstance(err.code, int) else (0 if err.code is None else 1)
+                except Exception as err:
+                    print(format_exception_report(err, stacktrace), file=sys.stderr)
+                    return 1
+        finally:
+            root_logger.removeHandler(log_handler)
+            root_logger.setLevel(root_log_level)
+            os.chdir(daemon_working_dir)
+            self.last_command_time = time.monotonic()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
@@ -1,22 +1,34 @@
 import sys
+import signal
 import logging
-import traceback
+import threading
 
 from fotahubclient.daemon.cli import CLI
 from fotahubclient.config_loader import ConfigLoader
 import fotahubclient.common_constants as constants
-from fotahubclient.os_update_manager import OSUpdateManager
-from fotahubclient.app_manager import AppManager
-from fotahubclient.system_helper import join_exception_messages
+from fotahubclient.cli.command_interpreter import CommandInterpreter
+from fotahubclient.daemon.command_server import CommandServer
+from fotahubclient.system_helper import format_exception_report
 
-def run(config):
-    logging.getLogger().debug('Finalizing OS update or rollback in case any such has just happened')
-    manager = OSUpdateManager(config)
-    manager.finalize_os_update()
+def run(command_interpreter):
+    command_interpreter.finalize_operating_system_change()
+    command_interpreter.deploy_applications()
 
-    logging.getLogger().debug('Deploying applications and launching those configured to be run automatically')
-    manager = AppManager(config)
-    manager.deploy_and_run_apps()
+def serve(config, command_interpreter):
+    server = CommandServer(config, command_interpreter)
+
+    def shut_down(signum, frame):
+        logging.getLogger().info('Shutting down FotaHub daemon')
+
+        # Stop serving commands from another thread as shutdown() waits for serve_forever() to return
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, shut_down)
+    signal.signal(signal.SIGINT, shut_down)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
 
 def main():
     config = None
@@ -29,13 +41,23 @@ def main():
 
         logging.basicConfig(stream=sys.stdout, level=config.log_level, format=constants.LOG_MESSAGE_FORMAT, datefmt=constants.LOG_DATE_FORMAT)
 
-        run(config)
-    except Exception as err:
-        if config is not None and config.stacktrace:
-            print(''.join(traceback.format_exception(type(err), err, err.__traceback__)), file=sys.stderr)
+        if args.resident:
+            # Restrict daemon's own log output to configured log level irrespective of the log levels requested by the commands being served
+            for handler in logging.getLogger().handlers:
+                handler.setLevel(config.log_level)
+
+            command_interpreter = CommandInterpreter(config, cache_managers=True)
+            try:
+                run(command_interpreter)
+            except Exception as err:
+                # Failing boot-time operations must not prevent subsequent commands from being served
+                print(format_exception_report(err, config.stacktrace), file=sys.stderr)
+            serve(config, command_interpreter)
         else:
-            print('ERROR: ' + join_exception_messages(err), file=sys.stderr)
+            run(CommandInterpreter(config))
+    except Exception as err:
+        print(format_exception_report(err, config is not None and config.stacktrace), file=sys.stderr)
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
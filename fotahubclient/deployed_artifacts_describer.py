@@ -1,55 +1,68 @@
 import os
 
 from fotahubclient.json_document_models import ArtifactKind, LifecycleState, DeployedArtifacts, DeployedArtifact
-from fotahubclient.os_updater import OSUpdater
-from fotahubclient.app_manager import AppManager
+from fotahubclient.os_status_snapshot import OSStatusSnapshot
 
 class DeployedArtifactsDescriber(object):
 
-    def __init__(self, config):
+    def __init__(self, config, app_manager=None):
         self.config = config
-        self.app_manager = AppManager(self.config)
+        self.app_manager = app_manager
+
+    def __get_app_manager(self):
+        # Create app manager (and load GObject introspection and OSTree typelib along with it) only when
+        # applications are actually to be described
+        if self.app_manager is None:
+            from fotahubclient.app_manager import AppManager
+            self.app_manager = AppManager(self.config)
+        return self.app_manager
+
+    def __is_artifact_selected(self, name, artifact_names):
+        return not artifact_names or name in artifact_names
 
     def describe_deployed_artifacts(self, artifact_names=[]):
         if os.path.isfile(self.config.deployed_artifacts_path) and os.path.getsize(self.config.deployed_artifacts_path) > 0:
             deployed_artifacts = DeployedArtifacts.load_deployed_artifacts(self.config.deployed_artifacts_path)
-            
-            for deployed_artifact in deployed_artifacts.deployed_artifacts:
+
+            selected_artifacts = [
+                deployed_artifact for deployed_artifact in deployed_artifacts.deployed_artifacts
+                    if self.__is_artifact_selected(deployed_artifact.name, artifact_names)
+            ]
+            for deployed_artifact in selected_artifacts:
                 if deployed_artifact.kind == ArtifactKind.application:
-                    deployed_artifact.lifecycle_state = self.app_manager.get_app_lifecycle_state(deployed_artifact.name)
-                    
-            deployed_artifacts.deployed_artifacts.insert(0, self.describe_deployed_os())
-
-            return DeployedArtifacts([
-                deployed_artifact for deployed_artifact in deployed_artifacts.deployed_artifacts 
-                    if not artifact_names or deployed_artifact.name in artifact_names
-            ]).serialize()
+                    deployed_artifact.lifecycle_state = self.__get_app_manager().get_app_lifecycle_state(deployed_artifact.name)
+
+            if self.__is_artifact_selected(self.config.os_distro_name, artifact_names):
+                selected_artifacts.insert(0, self.describe_deployed_os())
+
+            return DeployedArtifacts(selected_artifacts).serialize()
         else:
             deployed_artifacts = DeployedArtifacts(
-                ([self.describe_deployed_os()] 
-                    if not artifact_names or self.config.os_distro_name in artifact_names else []) +
+                ([self.describe_deployed_os()]
+                    if self.__is_artifact_selected(self.config.os_distro_name, artifact_names) else []) +
                 self.describe_deployed_apps(artifact_names)
             )
             return deployed_artifacts.serialize()
 
     def describe_deployed_os(self):
-        os_updater = OSUpdater(self.config.os_distro_name, self.config.ostree_gpg_verify)
+        [deployed_revision, rollback_revision] = OSStatusSnapshot(self.config.os_status_snapshot_path, self.config.os_distro_name).get_os_revisions()
         return DeployedArtifact(
-            os_updater.os_distro_name, 
-            ArtifactKind.operating_system, 
-            os_updater.get_deployed_os_revision(),
-            os_updater.get_rollback_os_revision(),
+            self.config.os_distro_name,
+            ArtifactKind.operating_system,
+            deployed_revision,
+            rollback_revision,
             LifecycleState.running
         )
 
     def describe_deployed_apps(self, artifact_names=[]):
+        app_manager = self.__get_app_manager()
         return [
             DeployedArtifact(
-                name, 
-                ArtifactKind.application, 
-                self.app_manager.updater.get_app_deploy_revision(name),
+                name,
+                ArtifactKind.application,
+                app_manager.updater.get_app_deploy_revision(name),
                 None,
-                self.app_manager.get_app_lifecycle_state(name)
-            ) for name in self.app_manager.updater.list_app_names() 
-                if not artifact_names or name in artifact_names
-        ]
\ No newline at end of file
+                app_manager.get_app_lifecycle_state(name)
+            ) for name in app_manager.updater.list_app_names()
+                if self.__is_artifact_selected(name, artifact_names)
+        ]
@@ -7,12 +7,20 @@ class DeployedArtifactsTracker(object):
     def __init__(self, config):
         self.config = config
         self.deployed_artifacts = DeployedArtifacts()
+        self.deployed_artifact_index = {}
+        self.has_removals = False
 
     def __enter__(self):
         if os.path.isfile(self.config.deployed_artifacts_path) and os.path.getsize(self.config.deployed_artifacts_path) > 0:
             self.deployed_artifacts = DeployedArtifacts.load_deployed_artifacts(self.config.deployed_artifacts_path)
+        self.__index_deployed_artifacts()
         return self 
 
+    def __index_deployed_artifacts(self):
+        self.deployed_artifact_index = {}
+        for deployed_artifact in self.deployed_artifacts.deployed_artifacts:
+            self.deployed_artifact_index.setdefault((deployed_artifact.name, deployed_artifact.kind), deployed_artifact)
+
     def register_os(self, name, deployed_revision, rollback_revision=None):
         self.__register_artifact(name, ArtifactKind.operating_system, deployed_revision, rollback_revision, LifecycleState.running)
 
@@ -62,6 +70,10 @@ class DeployedArtifactsTracker(object):
         else:
             raise ValueError("Failed to record revision change for unknown firmware named '{}'".format(name))
 
+    def get_app_deployed_revision(self, name):
+        deployed_artifact = self.__lookup_deployed_artifact(name, ArtifactKind.application)
+        return deployed_artifact.deployed_revision if deployed_artifact is not None else None
+
     def record_app_lifecycle_status_change(self, name, lifecycle_state=None, status=True, message=None):
         deployed_artifact = self.__lookup_deployed_artifact(name, ArtifactKind.application)
         if deployed_artifact is not None:
@@ -70,16 +82,22 @@ class DeployedArtifactsTracker(object):
             raise ValueError("Failed to record lifecycle status change for unknown application named '{}'".format(name))
 
     def __lookup_deployed_artifact(self, name, kind):
-        for deployed_artifact in self.deployed_artifacts.deployed_artifacts:
-            if deployed_artifact.name == name and deployed_artifact.kind == kind:
-                return deployed_artifact
-        return None
+        return self.deployed_artifact_index.get((name, kind))
 
     def __append_deployed_artifact(self, deployed_artifact):
         self.deployed_artifacts.deployed_artifacts.append(deployed_artifact)
+        self.deployed_artifact_index[(deployed_artifact.name, deployed_artifact.kind)] = deployed_artifact
 
     def __remove_deployed_artifact(self, deployed_artifact):
-        self.deployed_artifacts.deployed_artifacts.remove(deployed_artifact)
+        # Drop removed deployed artifacts from ordered list only once when saving them
+        del self.deployed_artifact_index[(deployed_artifact.name, deployed_artifact.kind)]
+        self.has_removals = True
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.has_removals:
+            self.deployed_artifacts.deployed_artifacts = [
+                deployed_artifact for deployed_artifact in self.deployed_artifacts.deployed_artifacts 
+                    if self.deployed_artifact_index.get((deployed_artifact.name, deployed_artifact.kind)) is deployed_artifact
+            ]
+            self.has_removals = False
         DeployedArtifacts.save_deployed_artifacts(self.deployed_artifacts, self.config.deployed_artifacts_path)
@@ -0,0 +1,151 @@
+import os
+import time
+import errno
+import codecs
+import select
+import logging
+import ctypes
+import ctypes.util
+
+# See inotify(7) for details
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+INOTIFY_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_READ_SIZE = 4096
+
+FILE_WATCHER_POLL_INTERVAL_DEFAULT = 0.5
+
+def _load_inotify():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+class FileWatcher(object):
+
+    # Watches the directories containing the given files (rather than the files themselves) so as to also
+    # notice files being created, replaced or removed; falls back to polling when inotify is not available
+    def __init__(self, paths, poll_interval=FILE_WATCHER_POLL_INTERVAL_DEFAULT, use_inotify=True):
+        self.logger = logging.getLogger()
+        self.poll_interval = poll_interval
+
+        self.inotify_fd = None
+        if use_inotify:
+            self.__init_inotify(sorted(set(os.path.dirname(os.path.abspath(path)) for path in paths)))
+
+    def __init_inotify(self, dir_paths):
+        libc = _load_inotify()
+        if libc is None:
+            self.logger.debug('inotify not available, falling back to polling')
+            return
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            self.logger.debug('Failed to initialize inotify ({}), falling back to polling'.format(os.strerror(ctypes.get_errno())))
+            return
+
+        for dir_path in dir_paths:
+            if libc.inotify_add_watch(fd, os.fsencode(dir_path), INOTIFY_WATCH_MASK) < 0:
+                self.logger.debug("Failed to watch '{}' through inotify ({}), falling back to polling".format(dir_path, os.strerror(ctypes.get_errno())))
+                os.close(fd)
+                return
+        self.inotify_fd = fd
+
+    def uses_inotify(self):
+        return self.inotify_fd is not None
+
+    # Blocks until any of the watched files may have changed or the given timeout has elapsed
+    def wait(self, timeout):
+        if self.inotify_fd is None:
+            time.sleep(min(timeout, self.poll_interval))
+            return
+
+        [readable, _, _] = select.select([self.inotify_fd], [], [], timeout)
+        if readable:
+            # Content of events does not matter, the watched files are checked for changes anyway
+            try:
+                while os.read(self.inotify_fd, INOTIFY_READ_SIZE):
+                    pass
+            except OSError as err:
+                if err.errno != errno.EAGAIN:
+                    raise
+
+    def close(self):
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+class FileTail(object):
+
+    # Reads complete lines appended to a file after the tail has been created; finishes reading the file when it
+    # gets replaced by a new one (e.g., upon log rotation) and continues with the new one, starts over from 
+    # the beginning of the file when it gets truncated
+    def __init__(self, path):
+        self.path = path
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.pending_text = ''
+
+        self.file = None
+        self.__open()
+        if self.file is not None:
+            self.file.seek(0, os.SEEK_END)
+
+    def __open(self):
+        try:
+            self.file = open(self.path, 'rb')
+        except FileNotFoundError:
+            self.file = None
+
+    def __read_appended_data(self):
+        if self.file is None:
+            self.__open()
+            return self.file.read() if self.file is not None else b''
+
+        data = self.file.read()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+
+        if stat is None or stat.st_ino != os.fstat(self.file.fileno()).st_ino:
+            # Pick up what has been written to the replaced file in the meantime and then switch over to the new file
+            data += self.file.read()
+            self.file.close()
+            self.__open()
+            if self.file is not None:
+                data += self.file.read()
+        elif stat.st_size < self.file.tell():
+            self.file.seek(0)
+            data += self.file.read()
+        return data
+
+    def read_lines(self):
+        text = self.pending_text + self.decoder.decode(self.__read_appended_data())
+        end = text.rfind('\n') + 1
+        self.pending_text = text[end:]
+        return text[:end]
+
+    def read_remainder(self):
+        text = self.read_lines() + self.pending_text + self.decoder.decode(b'', final=True)
+        self.pending_text = ''
+        return text
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
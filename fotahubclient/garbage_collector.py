@@ -0,0 +1,95 @@
+import os
+import time
+import logging
+import threading
+
+import gi
+gi.require_version("OSTree", "1.0")
+from gi.repository import Gio
+
+from fotahubclient.json_document_models import ArtifactKind, UpdateCompletionState, DeployedArtifacts, GarbageCollectionResult, GarbageCollectionResults
+from fotahubclient.update_status_describer import UpdateStatusDescriber
+
+# Completion states of updates whose revisions have been downloaded but not yet been applied
+PENDING_UPDATE_COMPLETION_STATES = [UpdateCompletionState.downloaded, UpdateCompletionState.verified]
+
+class GarbageCollector(object):
+
+    # Prunes objects which are no longer needed from the OS and application OSTree repos; both repos share the
+    # same time budget, and pruning gets cancelled (keeping whatever has been reclaimed so far) when it runs out
+    def __init__(self, config):
+        self.logger = logging.getLogger()
+        self.config = config
+
+    def collect_garbage(self, time_budget):
+        deadline = time.monotonic() + time_budget
+        results = GarbageCollectionResults([
+            self.__collect_garbage(ArtifactKind.operating_system, self.__collect_os_garbage, deadline),
+            self.__collect_garbage(ArtifactKind.application, self.__collect_app_garbage, deadline)
+        ])
+        self.logger.info("Reclaimed {} bytes in local OSTree repos".format(results.get_reclaimed_bytes()))
+        return results
+
+    def __collect_garbage(self, artifact_kind, collect, deadline):
+        result = GarbageCollectionResult(artifact_kind)
+
+        remaining_time = deadline - time.monotonic()
+        if remaining_time <= 0:
+            result.message = 'Time budget exhausted'
+            return result
+
+        cancellable = Gio.Cancellable()
+        timer = threading.Timer(remaining_time, cancellable.cancel)
+        timer.daemon = True
+        timer.start()
+        start_time = time.monotonic()
+        try:
+            [result.objects_total, result.objects_pruned, result.reclaimed_bytes] = collect(cancellable)
+            result.completed = True
+        except Exception as err:
+            result.message = 'Time budget exhausted' if cancellable.is_cancelled() else str(err)
+            self.logger.warning("Failed to collect garbage for {}: {}".format(artifact_kind, result.message))
+        finally:
+            timer.cancel()
+            result.duration = round(time.monotonic() - start_time, 3)
+        return result
+
+    def __collect_os_garbage(self, cancellable):
+        from fotahubclient.os_updater import OSUpdater
+        updater = OSUpdater(self.config.os_distro_name, self.config.ostree_gpg_verify)
+        return updater.collect_garbage(self.get_retained_os_revisions(), cancellable)
+
+    def __collect_app_garbage(self, cancellable):
+        from fotahubclient.app_updater import AppUpdater
+        updater = AppUpdater(self.config.app_ostree_repo_path, self.config.ostree_gpg_verify, self.config.app_delta_checkout)
+        return updater.collect_garbage(self.get_retained_app_revisions(), self.config.app_gc_keep_revisions, cancellable)
+
+    def get_retained_os_revisions(self):
+        # Keep prefetched revisions for subsequent updates
+        revisions = self.__get_pending_revisions(ArtifactKind.operating_system)
+
+        revisions.discard(None)
+        revisions.discard('')
+        return revisions
+
+    def get_retained_app_revisions(self):
+        revisions = set()
+
+        if os.path.isfile(self.config.deployed_artifacts_path) and os.path.getsize(self.config.deployed_artifacts_path) > 0:
+            deployed_artifacts = DeployedArtifacts.load_deployed_artifacts(self.config.deployed_artifacts_path)
+            for deployed_artifact in deployed_artifacts.deployed_artifacts:
+                if deployed_artifact.kind == ArtifactKind.application:
+                    revisions.update([deployed_artifact.deployed_revision, deployed_artifact.rollback_revision])
+
+        # Keep prefetched revisions for subsequent updates
+        revisions.update(self.__get_pending_revisions(ArtifactKind.application))
+
+        revisions.discard(None)
+        revisions.discard('')
+        return revisions
+
+    def __get_pending_revisions(self, artifact_kind):
+        return set(
+            update_status.revision for update_status in UpdateStatusDescriber(self.config).load_update_statuses().update_statuses
+                if update_status.artifact_kind == artifact_kind and update_status.status and update_status.completion_state in PENDING_UPDATE_COMPLETION_STATES
+        )
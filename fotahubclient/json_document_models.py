@@ -1,10 +1,10 @@
 from enum import Enum
 import json
-import os
 import time
 import logging
 
 from fotahubclient.json_encode_decode import PascalCaseJSONEncoder, PascalCasedObjectArrayJSONDecoder
+from fotahubclient.system_helper import write_file_atomically
 
 class ArtifactKind(Enum):
     operating_system = 'OperatingSystem'
@@ -39,8 +39,10 @@ class UpdateCompletionState(Enum):
         return self.value
 
 class DeployedArtifact(object):
+    __slots__ = ('name', 'kind', 'deployed_revision', 'rollback_revision', 'lifecycle_state', 'status', 'message')
+
     def __init__(self, name, kind, deployed_revision, rollback_revision=None, lifecycle_state=LifecycleState.running, status=True, message=None):
-        logging.getLogger().debug("Initializing deployed artifact info: name={}, kind={}, deployed_revision={}, rollback_revision={}, lifecycle_state={}, status={}, message={}".format(name, kind, deployed_revision, rollback_revision, lifecycle_state, status, message))
+        logging.getLogger().debug("Initializing deployed artifact info: name=%s, kind=%s, deployed_revision=%s, rollback_revision=%s, lifecycle_state=%s, status=%s, message=%s", name, kind, deployed_revision, rollback_revision, lifecycle_state, status, message)
         self.name = name
         self.kind = kind
         self.deployed_revision = deployed_revision
@@ -50,7 +52,7 @@ class DeployedArtifact(object):
         self.message = message
 
     def reinit(self, deployed_revision, rollback_revision=None, lifecycle_state=LifecycleState.running):
-        logging.getLogger().debug("Reinitializing deployed artifact info for '{}': deployed_revision={}, rollback_revision={}, lifecycle_state={}".format(self.name, deployed_revision, rollback_revision, lifecycle_state))
+        logging.getLogger().debug("Reinitializing deployed artifact info for '%s': deployed_revision=%s, rollback_revision=%s, lifecycle_state=%s", self.name, deployed_revision, rollback_revision, lifecycle_state)
         self.deployed_revision = deployed_revision
         if rollback_revision:
             self.rollback_revision = rollback_revision
@@ -59,7 +61,7 @@ class DeployedArtifact(object):
         self.message = None
 
     def amend_revision_info(self, deployed_revision, updating=True):
-        logging.getLogger().debug("Amending revision info for '{}': deployed_revision={}".format(self.name, deployed_revision))
+        logging.getLogger().debug("Amending revision info for '%s': deployed_revision=%s", self.name, deployed_revision)
         if updating:
             self.rollback_revision = self.deployed_revision
             self.deployed_revision = deployed_revision
@@ -68,7 +70,7 @@ class DeployedArtifact(object):
             self.rollback_revision = None
 
     def amend_lifecycle_info(self, lifecycle_state=None, status=True, message=None):
-        logging.getLogger().debug("Amending lifecycle info for '{}': lifecycle_state={}, status={}, message={}".format(self.name, lifecycle_state, status, message))
+        logging.getLogger().debug("Amending lifecycle info for '%s': lifecycle_state=%s, status=%s, message=%s", self.name, lifecycle_state, status, message)
         # Keep/store latest non-empty message reported during current lifecycle, reinitialize it otherwise 
         # !! Important Note !! Evaluate current lifecycle state *before* amending it
         if message or (self.lifecycle_state is not None and self.lifecycle_state.initiates_new_lifecycle(lifecycle_state)):
@@ -80,6 +82,8 @@ class DeployedArtifact(object):
         self.status = status
 
 class DeployedArtifacts(object):
+    __slots__ = ('deployed_artifacts',)
+
     def __init__(self, deployed_artifacts=None):
         self.deployed_artifacts = deployed_artifacts if deployed_artifacts is not None else []
 
@@ -97,47 +101,58 @@ class DeployedArtifacts(object):
     def save_deployed_artifacts(deployed_artifacts, path):
         logging.getLogger().debug("Saving in-memory deployed artifact infos to '{}'".format(path))
 
-        parent = os.path.dirname(path)
-        if not os.path.isdir(parent):
-            os.makedirs(parent, exist_ok=True)
-
-        with open(path, 'w+', encoding='utf-8') as file:
-            json.dump(deployed_artifacts, file, ensure_ascii=False, indent=4, cls=PascalCaseJSONEncoder)
+        write_file_atomically(path, json.dumps(deployed_artifacts, ensure_ascii=False, indent=4, cls=PascalCaseJSONEncoder))
 
 class DeployedArtifactsJSONDecoder(PascalCasedObjectArrayJSONDecoder):
     def __init__(self):
         super().__init__(DeployedArtifacts, DeployedArtifact, [ArtifactKind, LifecycleState])
 
 class UpdateStatus(object):
-    def __init__(self, artifact_name, artifact_kind, revision, timestamp=None, completion_state=UpdateCompletionState.initiated, status=True, message=None):
-        logging.getLogger().debug("Initializing update status: artifact_name={}, artifact_kind={}, revision={}, completion_state={}, status={}, message={}".format(artifact_name, artifact_kind, revision, completion_state, status, message))
+    __slots__ = ('artifact_name', 'artifact_kind', 'revision', 'timestamp', 'completion_state', 'status', 'message', 'download_duration', 'download_size', 'download_rate', 'verification_duration', 'self_test_duration', 'rollback_duration')
+    # Fields that are left out of serialized update statuses rather than showing up as empty strings when not set
+    optional_fields = ('download_duration', 'download_size', 'download_rate', 'verification_duration', 'self_test_duration', 'rollback_duration')
+
+    def __init__(self, artifact_name, artifact_kind, revision, timestamp=None, completion_state=UpdateCompletionState.initiated, status=True, message=None, download_duration=None, download_size=None, download_rate=None, verification_duration=None, self_test_duration=None, rollback_duration=None):
+        logging.getLogger().debug("Initializing update status: artifact_name=%s, artifact_kind=%s, revision=%s, completion_state=%s, status=%s, message=%s, download_duration=%s, download_size=%s, download_rate=%s, verification_duration=%s, self_test_duration=%s, rollback_duration=%s", artifact_name, artifact_kind, revision, completion_state, status, message, download_duration, download_size, download_rate, verification_duration, self_test_duration, rollback_duration)
         self.artifact_name = artifact_name
         self.artifact_kind = artifact_kind
         self.revision = revision
         self.timestamp = timestamp if timestamp is not None else self.__get_utc_timestamp()
-        logging.getLogger().debug("Initializing timestamp of update status for '{}': {}".format(self.artifact_name, self.timestamp))
+        logging.getLogger().debug("Initializing timestamp of update status for '%s': %s", self.artifact_name, self.timestamp)
         self.completion_state = completion_state
         self.status = status
         self.message = message
+        self.download_duration = download_duration
+        self.download_size = download_size
+        self.download_rate = download_rate
+        self.verification_duration = verification_duration
+        self.self_test_duration = self_test_duration
+        self.rollback_duration = rollback_duration
 
     def reinit(self, revision, completion_state=UpdateCompletionState.initiated, status=True, message=None):
-        logging.getLogger().debug("Reinitializing update status for '{}': revision={}, completion_state={}, status={}, message={}".format(self.artifact_name, revision, completion_state, status, message))
+        logging.getLogger().debug("Reinitializing update status for '%s': revision=%s, completion_state=%s, status=%s, message=%s", self.artifact_name, revision, completion_state, status, message)
         self.revision = revision
         self.timestamp = self.__get_utc_timestamp()
-        logging.getLogger().debug("Reinitializing timestamp of update status for '{}': {}".format(self.artifact_name, self.timestamp))
+        logging.getLogger().debug("Reinitializing timestamp of update status for '%s': %s", self.artifact_name, self.timestamp)
         self.completion_state = completion_state
         self.status = status
         self.message = message
+        self.download_duration = None
+        self.download_size = None
+        self.download_rate = None
+        self.verification_duration = None
+        self.self_test_duration = None
+        self.rollback_duration = None
 
     def amend(self, revision, completion_state, status=True, message=None):
-        logging.getLogger().debug("Amending update status for '{}': revision={}, completion_state={}, status={}, message={}".format(self.artifact_name, revision, completion_state, status, message))
+        logging.getLogger().debug("Amending update status for '%s': revision=%s, completion_state=%s, status=%s, message=%s", self.artifact_name, revision, completion_state, status, message)
         # Keep first revision reported during current update/rollback cycle 
         if not self.revision:
             self.revision = revision
         # Renew timestamp when rollback starts, keep existing timestamp otherwise
         if self.initiates_rollback_cycle(completion_state):
             self.timestamp = self.__get_utc_timestamp()
-            logging.getLogger().debug("Updating timestamp of update status for '{}': {}".format(self.artifact_name, self.timestamp))
+            logging.getLogger().debug("Updating timestamp of update status for '%s': %s", self.artifact_name, self.timestamp)
         # Keep first non-empty message reported during current update/rollback cycle, reinitialize/reassign it otherwise 
         # !! Important Note !! Evaluate current completion state *before* amending it
         if not self.message or self.initiates_rollback_cycle(completion_state):
@@ -148,6 +163,21 @@ class UpdateStatus(object):
         # Store latest status
         self.status = status
 
+    def amend_download_info(self, download_duration, download_size, download_rate):
+        logging.getLogger().debug("Amending download info for '%s': download_duration=%s, download_size=%s, download_rate=%s", self.artifact_name, download_duration, download_size, download_rate)
+        self.download_duration = download_duration
+        self.download_size = download_size
+        self.download_rate = download_rate
+
+    def amend_verification_info(self, verification_duration):
+        logging.getLogger().debug("Amending verification info for '%s': verification_duration=%s", self.artifact_name, verification_duration)
+        self.verification_duration = verification_duration
+
+    def amend_self_test_info(self, self_test_duration, rollback_duration=None):
+        logging.getLogger().debug("Amending self test info for '%s': self_test_duration=%s, rollback_duration=%s", self.artifact_name, self_test_duration, rollback_duration)
+        self.self_test_duration = self_test_duration
+        self.rollback_duration = rollback_duration
+
     def __get_utc_timestamp(self):
         return int(time.time())
 
@@ -158,6 +188,9 @@ class UpdateStatus(object):
         if type(self.completion_state) is not UpdateCompletionState:
             return True
 
+        # Every update (or prefetch) starts over, including those following a prefetch that has left its revision downloaded or verified
+        if next_state == UpdateCompletionState.initiated:
+            return True
         if self.completion_state == UpdateCompletionState.confirmed and next_state != UpdateCompletionState.invalidated:
             return True
         if self.completion_state == UpdateCompletionState.rolled_back:
@@ -167,6 +200,8 @@ class UpdateStatus(object):
         return False
 
 class UpdateStatuses(object):
+    __slots__ = ('update_statuses',)
+
     def __init__(self, update_statuses=None):
         self.update_statuses = update_statuses if update_statuses is not None else []
 
@@ -181,23 +216,35 @@ class UpdateStatuses(object):
             return json.load(file, cls=UpdateStatusesJSONDecoder)
 
     @staticmethod
-    def save_update_statuses(update_statuses, path, flush_instantly=False):
+    def save_update_statuses(update_statuses, path):
         logging.getLogger().debug("Saving in-memory update statuses to '{}'".format(path))
 
-        parent = os.path.dirname(path)
-        if not os.path.isdir(parent):
-            os.makedirs(parent, exist_ok=True)
-
-        with open(path, 'w+', encoding='utf-8') as file:
-            json.dump(update_statuses, file, ensure_ascii=False, indent=4, cls=PascalCaseJSONEncoder)
-            
-            if flush_instantly:
-                # Flush the Python runtime's internal buffers
-                file.flush()
-
-                # Synchronize the operating system's buffers with file content on disk
-                os.fsync(file.fileno())
+        write_file_atomically(path, json.dumps(update_statuses, ensure_ascii=False, indent=4, cls=PascalCaseJSONEncoder))
 
 class UpdateStatusesJSONDecoder(PascalCasedObjectArrayJSONDecoder):
     def __init__(self):
-        super().__init__(UpdateStatuses, UpdateStatus, [ArtifactKind, UpdateCompletionState])
\ No newline at end of file
+        super().__init__(UpdateStatuses, UpdateStatus, [ArtifactKind, UpdateCompletionState])
+
+class GarbageCollectionResult(object):
+    __slots__ = ('artifact_kind', 'objects_total', 'objects_pruned', 'reclaimed_bytes', 'duration', 'completed', 'message')
+
+    def __init__(self, artifact_kind, objects_total=0, objects_pruned=0, reclaimed_bytes=0, duration=0.0, completed=False, message=None):
+        self.artifact_kind = artifact_kind
+        self.objects_total = objects_total
+        self.objects_pruned = objects_pruned
+        self.reclaimed_bytes = reclaimed_bytes
+        self.duration = duration
+        self.completed = completed
+        self.message = message
+
+class GarbageCollectionResults(object):
+    __slots__ = ('garbage_collection_results',)
+
+    def __init__(self, garbage_collection_results=None):
+        self.garbage_collection_results = garbage_collection_results if garbage_collection_results is not None else []
+
+    def get_reclaimed_bytes(self):
+        return sum(result.reclaimed_bytes for result in self.garbage_collection_results)
+
+    def serialize(self):
+        return json.dumps(self, indent=4, cls=PascalCaseJSONEncoder)
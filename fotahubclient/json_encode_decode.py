@@ -1,47 +1,132 @@
 from enum import Enum
 from json import JSONEncoder, JSONDecoder
+import inspect
 import stringcase
 import logging
 
+# Key and enum literal mappings are computed only once per class/key and reused for all subsequent objects
+pascalcase_key_mappings = {}
+snakecase_key_mappings = {}
+serialized_field_mappings = {}
+
+def to_pascalcase_key(key):
+    pascalcase_key = pascalcase_key_mappings.get(key)
+    if pascalcase_key is None:
+        pascalcase_key = pascalcase_key_mappings[key] = stringcase.pascalcase(key)
+    return pascalcase_key
+
+def to_snakecase_key(key):
+    snakecase_key = snakecase_key_mappings.get(key)
+    if snakecase_key is None:
+        snakecase_key = snakecase_key_mappings[key] = stringcase.snakecase(key)
+    return snakecase_key
+
 def none_to_empty_string_valued_dict(dict):
     return { k: '' if v is None else v for k, v in dict.items() }
 
 def to_pascalcase_keyed_dict(dict):
-    return { stringcase.pascalcase(k): v for k, v in dict.items() }
+    return { to_pascalcase_key(k): v for k, v in dict.items() }
 
 def from_pascalcase_keyed_dict(dict, enum_types=[]):
-    return { stringcase.snakecase(k): to_enum_literal(k, v, enum_types) for k, v in dict.items() }
+    return PascalCaseKeyedObjectMapping.get(tuple(enum_types)).from_pascalcase_keyed_dict(dict)
 
 def to_enum_literal(name, value, enum_types):
-    if isinstance(value, str):
-        for enum_type in enum_types:
-            if enum_type.__name__.endswith(name):
-                if value == '':
-                    return None
-                else:
-                    for _, member in enum_type.__members__.items():
-                        if member.value == value:
-                            return member
-    return value
+    return PascalCaseKeyedObjectMapping.get(tuple(enum_types)).to_enum_literal(name, value)
+
+class PascalCaseKeyedObjectMapping(object):
+    mappings = {}
+
+    @classmethod
+    def get(cls, enum_types, object_type=None):
+        mapping = cls.mappings.get((enum_types, object_type))
+        if mapping is None:
+            mapping = cls.mappings[(enum_types, object_type)] = cls(enum_types, object_type)
+        return mapping
+
+    def __init__(self, enum_types, object_type=None):
+        self.enum_types = enum_types
+
+        # Maps PascalCase keys to snake_case field names and, for enum-typed fields, enum values to enum members
+        self.field_names = {}
+        self.enum_literals = {}
+        if object_type is not None:
+            for name in inspect.signature(object_type.__init__).parameters:
+                if name != 'self':
+                    self.__map_key(to_pascalcase_key(name))
+
+    def __map_key(self, key):
+        self.field_names[key] = to_snakecase_key(key)
+
+        enum_literals = None
+        for enum_type in self.enum_types:
+            if enum_type.__name__.endswith(key):
+                if enum_literals is None:
+                    enum_literals = {}
+                for member in enum_type.__members__.values():
+                    enum_literals.setdefault(member.value, member)
+        self.enum_literals[key] = enum_literals
+
+    def to_enum_literal(self, key, value):
+        if key not in self.field_names:
+            self.__map_key(key)
+
+        enum_literals = self.enum_literals[key]
+        if enum_literals is not None and isinstance(value, str):
+            if value == '':
+                return None
+            return enum_literals.get(value, value)
+        return value
+
+    def from_pascalcase_keyed_dict(self, dict):
+        result = {}
+        for k, v in dict.items():
+            if k not in self.field_names:
+                self.__map_key(k)
+            enum_literals = self.enum_literals[k]
+            if enum_literals is not None and isinstance(v, str):
+                v = enum_literals.get(v, v) if v != '' else None
+            result[self.field_names[k]] = v
+        return result
+
+def get_serialized_fields(object_type):
+    serialized_fields = serialized_field_mappings.get(object_type)
+    if serialized_fields is None:
+        # Serialize fields declared through __slots__ in declaration order, optional fields are omitted when not set
+        optional_fields = getattr(object_type, 'optional_fields', ())
+        serialized_fields = serialized_field_mappings[object_type] = [(name, to_pascalcase_key(name), name in optional_fields) for name in object_type.__slots__]
+    return serialized_fields
 
 class PascalCaseJSONEncoder(JSONEncoder):
 
     def default(self, obj):
         if isinstance(obj, Enum):
             return str(obj)
+        elif hasattr(type(obj), '__slots__'):
+            result = {}
+            for name, key, optional in get_serialized_fields(type(obj)):
+                value = getattr(obj, name)
+                if value is None:
+                    if optional:
+                        continue
+                    value = ''
+                result[key] = value
+            return result
         else:
-            return to_pascalcase_keyed_dict(none_to_empty_string_valued_dict(obj.__dict__))
+            return { to_pascalcase_key(k): '' if v is None else v for k, v in obj.__dict__.items() }
 
 class PascalCasedObjectArrayJSONDecoder(JSONDecoder):
-    
+
     def __init__(self, array_type, object_type, enum_types=None):
         super().__init__(object_hook=self.object_hook)
         self.array_type = array_type
         self.object_type = object_type
         self.enum_types = enum_types if enum_types is not None else []
 
+        self.array_mapping = PascalCaseKeyedObjectMapping.get((), array_type)
+        self.object_mapping = PascalCaseKeyedObjectMapping.get(tuple(self.enum_types), object_type)
+
     def object_hook(self, data):
-        if len(data) == 1 and isinstance(list(data.values())[0], list):
-            return self.array_type(**from_pascalcase_keyed_dict(data))
+        if len(data) == 1 and isinstance(next(iter(data.values())), list):
+            return self.array_type(**self.array_mapping.from_pascalcase_keyed_dict(data))
         else:
-            return self.object_type(**from_pascalcase_keyed_dict(data, self.enum_types))
\ No newline at end of file
+            return self.object_type(**self.object_mapping.from_pascalcase_keyed_dict(data))
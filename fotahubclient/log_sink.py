@@ -0,0 +1,169 @@
+import io
+import os
+import sys
+import gzip
+import shutil
+import select
+import argparse
+import threading
+import contextlib
+
+from fotahubclient.system_helper import read_last_lines_of_files
+
+LOG_SINK_READ_SIZE = 65536
+LOG_BACKUP_COMPRESSED_SUFFIX = '.gz'
+
+def to_log_backup_path(path, index, compressed=False):
+    return '{}.{}{}'.format(path, index, LOG_BACKUP_COMPRESSED_SUFFIX if compressed else '')
+
+def list_log_backups(path):
+    # Rotated log segments, newest first
+    backups = []
+    index = 1
+    while True:
+        if os.path.isfile(to_log_backup_path(path, index)):
+            backups.append(to_log_backup_path(path, index))
+        elif os.path.isfile(to_log_backup_path(path, index, True)):
+            backups.append(to_log_backup_path(path, index, True))
+        else:
+            return backups
+        index += 1
+
+def read_log_segment(path):
+    opener = gzip.open if path.endswith(LOG_BACKUP_COMPRESSED_SUFFIX) else open
+    try:
+        with opener(path, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        # Segment may have been rotated away meanwhile
+        return b''
+
+def open_log_segments(path):
+    # Current log and rotated segments, newest first; compressed segments cannot be scanned backward efficiently 
+    # and get decompressed as a whole (which is bounded by the maximum log size) but only once they are needed
+    for segment_path in [path] + list_log_backups(path):
+        if segment_path.endswith(LOG_BACKUP_COMPRESSED_SUFFIX):
+            yield io.BytesIO(read_log_segment(segment_path))
+            continue
+
+        try:
+            file = open(segment_path, 'rb')
+        except FileNotFoundError:
+            # Segment may have been rotated away meanwhile
+            continue
+        with file:
+            yield file
+
+def read_last_log_lines(path, max_lines):
+    # Read the tail of the current log and open rotated segments only as long as more lines are needed
+    with contextlib.closing(open_log_segments(path)) as segments:
+        return read_last_lines_of_files(segments, max_lines)
+
+def remove_log_backups(path):
+    for backup in list_log_backups(path):
+        os.remove(backup)
+
+class RotatingLogSink(object):
+
+    def __init__(self, path, max_size=0, max_backups=0, compress=False):
+        self.path = path
+        self.max_size = max_size
+        self.max_backups = max_backups
+        self.compress = compress
+        self.compression = None
+
+        # Start over with an empty log as done when writing logs directly
+        remove_log_backups(self.path)
+        self.file = open(self.path, 'wb')
+        self.size = 0
+
+    def write(self, data):
+        while self.max_size > 0 and self.size + len(data) > self.max_size:
+            # Fill current log up to the last line break that still fits in, cut lines only when they exceed the size limit on their own
+            room = self.max_size - self.size
+            cut = data.rfind(b'\n', 0, room) + 1
+            if cut == 0 and self.size == 0:
+                cut = room
+            self.__write(data[:cut])
+            data = data[cut:]
+            self.rotate()
+        self.__write(data)
+
+    def __write(self, data):
+        if data:
+            self.file.write(data)
+            self.file.flush()
+            self.size += len(data)
+
+    def rotate(self):
+        self.file.close()
+
+        if self.max_backups > 0:
+            # Shift rotated segments only once the previous one has been compressed
+            self.__wait_for_compression()
+
+            for index in range(self.max_backups, 0, -1):
+                for compressed in [False, True]:
+                    backup = to_log_backup_path(self.path, index, compressed)
+                    if os.path.isfile(backup):
+                        if index == self.max_backups:
+                            os.remove(backup)
+                        else:
+                            os.replace(backup, to_log_backup_path(self.path, index + 1, compressed))
+
+            # Readers who have the current log file open keep on reading from it after it has been rotated
+            os.replace(self.path, to_log_backup_path(self.path, 1))
+            if self.compress:
+                # Compress rotated segment in the background so that draining the pipes the container writes its output 
+                # to doesn't stall meanwhile (unless the next rotation is due before the compression has completed)
+                self.compression = threading.Thread(target=self.__compress, args=(to_log_backup_path(self.path, 1),), daemon=True)
+                self.compression.start()
+
+        self.file = open(self.path, 'wb')
+        self.size = 0
+
+    def __compress(self, path):
+        compressed_path = path + LOG_BACKUP_COMPRESSED_SUFFIX
+        with open(path, 'rb') as file:
+            with gzip.open(compressed_path + '.tmp', 'wb') as compressed_file:
+                shutil.copyfileobj(file, compressed_file)
+        os.replace(compressed_path + '.tmp', compressed_path)
+        os.remove(path)
+
+    def __wait_for_compression(self):
+        if self.compression is not None:
+            self.compression.join()
+            self.compression = None
+
+    def close(self):
+        self.file.close()
+        self.__wait_for_compression()
+
+def run_log_sinks(sinks):
+    # Copy everything written to the given pipes into the corresponding logs until all writers have closed them
+    while sinks:
+        [readable, _, _] = select.select(list(sinks.keys()), [], [])
+        for fd in readable:
+            data = os.read(fd, LOG_SINK_READ_SIZE)
+            if data:
+                sinks[fd].write(data)
+            else:
+                sinks.pop(fd).close()
+                os.close(fd)
+
+def main():
+    parser = argparse.ArgumentParser(description='Write container output received through pipes into size-bounded, rotating log files')
+    parser.add_argument('--max-size', type=int, default=0, help='maximum size of log files in bytes before they get rotated (0 for unlimited)')
+    parser.add_argument('--max-backups', type=int, default=0, help='number of rotated log files to keep')
+    parser.add_argument('--compress', action='store_true', default=False, help='compress rotated log files')
+    parser.add_argument('sinks', metavar='FD:PATH', nargs='+', help='pipe file descriptor to read from and log file to write to')
+    args = parser.parse_args()
+
+    sinks = {}
+    for sink in args.sinks:
+        [fd, path] = sink.split(':', 1)
+        sinks[int(fd)] = RotatingLogSink(path, args.max_size, args.max_backups, args.compress)
+    run_log_sinks(sinks)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import os
+import json
+import logging
+
+from fotahubclient.system_helper import write_file_atomically
+
+# OSTree creates and deletes deployment checkouts in the deploy directory of the OS (which bumps its modification
+# time) whenever it writes new deployments, and changes the boot loader symlink whenever it swaps the boot version;
+# a reboot changes the booted deployment
+OSTREE_DEPLOY_PATH = 'ostree/deploy/{}/deploy'
+BOOT_LOADER_LINK_PATH = 'boot/loader'
+BOOT_ID_PATH = 'proc/sys/kernel/random/boot_id'
+
+SNAPSHOT_STATE_KEY = 'DeploymentState'
+SNAPSHOT_DEPLOYED_REVISION_KEY = 'DeployedRevision'
+SNAPSHOT_ROLLBACK_REVISION_KEY = 'RollbackRevision'
+
+def _read_os_revisions():
+    # Imported only when the snapshot is outdated so that reading an up-to-date snapshot doesn't
+    # load GObject introspection and the OSTree typelib
+    from fotahubclient.os_updater import read_os_revisions
+    return read_os_revisions()
+
+class OSStatusSnapshot(object):
+
+    # Caches the deployed and rollback OS revisions in a small file (preferably located on a tmpfs) and
+    # reads them from the sysroot (without changing anything there) only when its deployments have changed;
+    # reads them from the sysroot every time when no snapshot path is given
+    def __init__(self, snapshot_path, os_distro_name, root_path='/'):
+        self.logger = logging.getLogger()
+        self.snapshot_path = snapshot_path
+        self.os_distro_name = os_distro_name
+        self.root_path = root_path
+
+    def get_os_revisions(self):
+        if not self.snapshot_path:
+            return _read_os_revisions()
+
+        state = self.__get_deployment_state()
+
+        snapshot = self.__load()
+        if snapshot is not None and snapshot.get(SNAPSHOT_STATE_KEY) == state:
+            self.logger.debug("Using OS status snapshot '{}'".format(self.snapshot_path))
+            return [snapshot.get(SNAPSHOT_DEPLOYED_REVISION_KEY), snapshot.get(SNAPSHOT_ROLLBACK_REVISION_KEY)]
+
+        [deployed_revision, rollback_revision] = _read_os_revisions()
+        self.__save({
+            SNAPSHOT_STATE_KEY: state,
+            SNAPSHOT_DEPLOYED_REVISION_KEY: deployed_revision,
+            SNAPSHOT_ROLLBACK_REVISION_KEY: rollback_revision
+        })
+        return [deployed_revision, rollback_revision]
+
+    def __get_deployment_state(self):
+        return [
+            self.__read_file(BOOT_ID_PATH),
+            self.__read_link(BOOT_LOADER_LINK_PATH),
+            self.__get_mtime(OSTREE_DEPLOY_PATH.format(self.os_distro_name))
+        ]
+
+    def __read_file(self, path):
+        try:
+            with open(os.path.join(self.root_path, path)) as file:
+                return file.read().strip()
+        except OSError:
+            return None
+
+    def __read_link(self, path):
+        try:
+            return os.readlink(os.path.join(self.root_path, path))
+        except OSError:
+            return None
+
+    def __get_mtime(self, path):
+        try:
+            return os.stat(os.path.join(self.root_path, path)).st_mtime_ns
+        except OSError:
+            return None
+
+    def __load(self):
+        try:
+            with open(self.snapshot_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def __save(self, snapshot):
+        try:
+            write_file_atomically(self.snapshot_path, json.dumps(snapshot, indent=4))
+        except OSError as err:
+            # Snapshot is a mere cache, describing the OS must not fail because of it
+            self.logger.warning("Failed to write OS status snapshot '{}': {}".format(self.snapshot_path, err))
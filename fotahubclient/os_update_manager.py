@@ -5,6 +5,7 @@ from fotahubclient.system_helper import run_command
 from fotahubclient.update_status_tracker import UpdateStatusTracker
 from fotahubclient.json_document_models import UpdateCompletionState
 from fotahubclient.system_helper import reboot_system
+from fotahubclient.pull_progress import create_pull_progress
 
 class OSUpdateError(Exception):
     pass
@@ -17,13 +18,13 @@ class OSUpdateManager(object):
         
         self.updater = OSUpdater(self.config.os_distro_name, self.config.ostree_gpg_verify)
 
-    def initiate_os_update(self, revision, max_reboot_failures):
+    def initiate_os_update(self, revision, max_reboot_failures, source=None):
         with UpdateStatusTracker(self.config) as tracker:
             try:
                 tracker.record_os_update_status(revision=revision, completion_state=UpdateCompletionState.initiated)
 
-                self.updater.pull_os_update(revision)
-                tracker.record_os_update_status(completion_state=UpdateCompletionState.downloaded)
+                pull_progress = self.updater.pull_os_update(revision, create_pull_progress(self.config, self.config.os_distro_name), source)
+                tracker.record_os_update_status(completion_state=UpdateCompletionState.downloaded, pull_progress=pull_progress)
 
                 [success, message] = run_command('OS update verification', self.config.os_update_verification_command, revision)
                 if success:
@@ -37,6 +38,20 @@ class OSUpdateManager(object):
                 tracker.record_os_update_status(status=False, message=str(err))
                 raise err
 
+    def prefetch_os_update(self, revision, source=None):
+        if self.updater.is_applying_os_update() or self.updater.is_rolling_back_os_update():
+            raise OSUpdateError("Cannot prefetch any new OS update when some other OS update is still about to be applied or rolled back")
+
+        with UpdateStatusTracker(self.config) as tracker:
+            try:
+                tracker.record_os_update_status(revision=revision, completion_state=UpdateCompletionState.initiated)
+
+                pull_progress = self.updater.prefetch_os_update(revision, create_pull_progress(self.config, self.config.os_distro_name), source)
+                tracker.record_os_update_status(completion_state=UpdateCompletionState.downloaded, pull_progress=pull_progress)
+            except Exception as err:
+                tracker.record_os_update_status(status=False, message=str(err))
+                raise err
+
     def roll_back_os_update(self):
         with UpdateStatusTracker(self.config) as tracker:
             try:
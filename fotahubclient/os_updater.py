@@ -15,7 +15,22 @@ UBOOT_FLAG_APPLYING_OS_UPDATE = 'applying_os_update'
 UBOOT_FLAG_ROLLING_BACK_OS_UPDATE = 'rolling_back_os_update'
 UBOOT_VAR_OS_UPDATE_REBOOT_FAILURE_CREDIT = 'os_update_reboot_failure_credit'
 
-MAX_REBOOT_FAILURES_DEFAULT = 3
+MAX_REBOOT_FAILURES_DEFAULT = constants.MAX_REBOOT_FAILURES_DEFAULT
+
+def read_os_revisions():
+    # Read-only counterpart of OSUpdater which neither cleans up the sysroot nor adds any remotes to its repo
+    try:
+        sysroot = OSTree.Sysroot.new_default()
+        sysroot.load(None)
+
+        booted_deployment = sysroot.get_booted_deployment()
+        [_, rollback_deployment] = sysroot.query_deployments_for(None)
+        return [
+            booted_deployment.get_csum() if booted_deployment is not None else None,
+            rollback_deployment.get_csum() if rollback_deployment is not None else None
+        ]
+    except GLib.Error as err:
+        raise OSTreeError('Failed to read OS deployments') from err
 
 class OSUpdater(object):
 
@@ -40,13 +55,48 @@ class OSUpdater(object):
             
             self.logger.debug("Opening OS OSTree repo located at '{}'".format(OSTREE_SYSTEM_REPOSITORY_PATH))
             sysroot.load(None)
-            sysroot.cleanup(None)
             [_, repo] = sysroot.get_repo()
 
             return [sysroot, repo]
         except GLib.Error as err:
             raise OSTreeError('Failed to open OS OSTree repo') from err
 
+    def collect_garbage(self, retained_revisions, cancellable=None):
+        self.logger.info('Collecting garbage in OS OSTree repo')
+        try:
+            [_, acquired] = self.sysroot.try_lock()
+            if not acquired:
+                raise OSTreeError('Cannot collect garbage in OS OSTree repo while the same is being used by another process')
+        except GLib.Error as err:
+            raise OSTreeError('Failed to lock OS OSTree sysroot') from err
+
+        try:
+            # Remove leftovers of former deployments and boot versions but prune repo separately so as to learn
+            # how much space has been reclaimed
+            if hasattr(self.sysroot, 'prepare_cleanup'):
+                self.sysroot.prepare_cleanup(cancellable)
+            else:
+                self.sysroot.cleanup(cancellable)
+        except GLib.Error as err:
+            self.sysroot.unlock()
+            raise OSTreeError('Failed to clean up OS OSTree sysroot') from err
+
+        try:
+            # Deployments are referenced by refs which OSTree maintains on its own, prefetched revisions which have 
+            # not been deployed yet get dedicated refs
+            self.ostree_repo.retain_ostree_revisions(constants.OS_RETAINED_REF_PREFIX, retained_revisions)
+            return self.ostree_repo.prune_ostree_repo(0, cancellable)
+        finally:
+            self.sysroot.unlock()
+
+    def reload_sysroot_if_changed(self):
+        try:
+            [_, changed] = self.sysroot.load_if_changed(None)
+            if changed:
+                self.logger.debug('Reloaded OS OSTree sysroot after it has been changed')
+        except GLib.Error as err:
+            raise OSTreeError('Failed to reload OS OSTree sysroot') from err
+
     def get_deployed_os_revision(self):
         deploy = self.sysroot.get_booted_deployment()
         return deploy.get_csum() if deploy is not None else None
@@ -65,10 +115,25 @@ class OSUpdater(object):
         [_, rollback] = self.sysroot.query_deployments_for(None)
         return rollback.get_csum() if rollback is not None else None
 
-    def pull_os_update(self, revision):
+    def prefetch_os_update(self, revision, pull_progress=None, source=None):
+        self.logger.info("Prefetching OS revision '{}'".format(revision))
+
+        if self.ostree_repo.has_ostree_revision(revision):
+            self.logger.info("Skipping download of OS revision '{}' as the same is already available locally".format(revision))
+            return None
+
+        return self.ostree_repo.pull_ostree_revision(self.remote_name, self.os_distro_name, revision, constants.OSTREE_PULL_DEPTH, pull_progress, update_ref=False, source=source)
+
+    def pull_os_update(self, revision, pull_progress=None, source=None):
         self.logger.info("Pulling OS revision '{}'".format(revision))
+
+        if self.ostree_repo.has_ostree_revision(revision):
+            # Revision has been prefetched before, only the OS ref needs to be advanced
+            self.logger.info("Skipping download of OS revision '{}' as the same is already available locally".format(revision))
+            self.ostree_repo.set_ostree_ref(self.remote_name, self.os_distro_name, revision)
+            return None
         
-        self.ostree_repo.pull_ostree_revision(self.remote_name, self.os_distro_name, revision, constants.OSTREE_PULL_DEPTH)
+        return self.ostree_repo.pull_ostree_revision(self.remote_name, self.os_distro_name, revision, constants.OSTREE_PULL_DEPTH, pull_progress, source=source)
 
     def __deploy_os_update(self, revision):
         self.logger.info("Deploying OS revision '{}'".format(revision))
@@ -1,9 +1,26 @@
 import os
+import shutil
 import logging
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import gi
 gi.require_version("OSTree", "1.0")
-from gi.repository import OSTree, GLib
+from gi.repository import OSTree, GLib, Gio
+
+from fotahubclient.system_helper import get_process_text_outcome
+from fotahubclient.pull_progress import PullProgress
+
+# Same file attributes as those queried by OSTree itself when checking out files
+OSTREE_FILE_INFO_ATTRIBUTES = 'standard::name,standard::type,standard::size,standard::is-symlink,standard::symlink-target,unix::device,unix::inode,unix::mode,unix::uid,unix::gid,unix::rdev'
+
+OSTREE_DIFF_MODIFIED = 'M'
+OSTREE_DIFF_REMOVED = 'D'
+OSTREE_DIFF_ADDED = 'A'
+
+# Number of objects verified in one go by each worker thread, keeps thread pool overhead low for revisions with many small files
+OSTREE_VERIFY_CHUNK_SIZE = 64
 
 class OSTreeError(Exception):
     pass
@@ -15,6 +32,9 @@ class OSTreeRepo(object):
         
         self.ostree_repo = repo
 
+    def get_repo_path(self):
+        return self.ostree_repo.get_path().get_path()
+
     def guess_remote_name(self, default_name):
         [_, refs] = self.ostree_repo.list_refs(None, None)
         remote_names = [ref.split(':')[0] for ref in refs.keys() if ':' in ref]
@@ -42,34 +62,182 @@ class OSTreeRepo(object):
         [_, refs] = self.ostree_repo.list_refs(None, None)
         return refs
 
+    def prune_ostree_repo(self, depth, cancellable=None):
+        # Removes all objects that are not reachable from any ref within the given number of parent commits
+        self.logger.debug("Pruning local OSTree repo located at '{}' (depth {})".format(self.get_repo_path(), depth))
+        try:
+            [_, objects_total, objects_pruned, pruned_object_size_total] = self.ostree_repo.prune(OSTree.RepoPruneFlags.REFS_ONLY, depth, cancellable)
+            return [objects_total, objects_pruned, pruned_object_size_total]
+        except GLib.Error as err:
+            raise OSTreeError("Failed to prune local OSTree repo located at '{}'".format(self.get_repo_path())) from err
+
     def resolve_ostree_revision(self, remote_name, ref):
         [_, revision] = self.ostree_repo.resolve_rev(remote_name + ':' + ref if remote_name else ref, False)
         return revision
 
-    def pull_ostree_revision(self, remote_name, branch_name, revision, depth):
-        self.logger.debug("Pulling revision '{}' from '{}' branch at OSTree remote '{}'".format(revision, branch_name, remote_name))
+    def has_ostree_revision(self, revision):
+        try:
+            [_, _, state] = self.ostree_repo.load_commit(revision)
+            return not (state & OSTree.RepoCommitState.PARTIAL)
+        except GLib.Error:
+            return False
+
+    def set_ostree_ref(self, remote_name, ref, revision):
+        try:
+            self.ostree_repo.set_ref_immediate(remote_name, ref, revision, None)
+        except GLib.Error as err:
+            raise OSTreeError("Failed to set '{}' ref to revision '{}' in local OSTree repo".format(ref, revision)) from err
+
+    def retain_ostree_revisions(self, ref_prefix, revisions):
+        # Pruning removes everything that is not reachable from any ref, so revisions that are not referenced 
+        # otherwise but must be kept nonetheless get dedicated refs starting with given prefix
+        wanted_refs = set(ref_prefix + revision for revision in revisions if revision and self.has_ostree_revision(revision))
+        existing_refs = set(ref for ref in self.list_ostree_refs().keys() if ref.startswith(ref_prefix))
+        for ref in existing_refs - wanted_refs:
+            self.set_ostree_ref(None, ref, None)
+        for ref in wanted_refs - existing_refs:
+            self.set_ostree_ref(None, ref, ref[len(ref_prefix):])
+
+    def pull_ostree_revision(self, remote_name, branch_name, revision, depth, pull_progress=None, update_ref=True, source=None):
+        return self.pull_ostree_revisions(remote_name, { branch_name: revision }, depth, pull_progress, update_ref, source)
 
+    def pull_ostree_revisions(self, remote_name, revisions, depth, pull_progress=None, update_ref=True, source=None):
+        # Pulls the given revisions (keyed by branch name) in a single pull operation so that they share the same
+        # connections and objects they have in common get fetched only once; the revisions can also be pulled 
+        # from a local OSTree repo or a static delta file (e.g., on a USB stick) in place of the remote
+        if source is not None and not os.path.exists(source):
+            raise OSTreeError("Update source '{}' does not exist".format(source))
+        if source is not None and os.path.isfile(source):
+            return self.__import_static_delta_file(remote_name, revisions, source, pull_progress, update_ref)
+
+        description = ', '.join("revision '{}' from '{}' branch".format(revision, branch_name) for branch_name, revision in revisions.items())
+        self.logger.debug("Pulling {} at OSTree remote '{}'".format(description, remote_name))
+
+        if update_ref:
+            pull_opts = {
+                'refs': GLib.Variant('as', tuple(revisions.keys())),
+                'override-commit-ids': GLib.Variant('as', tuple(revisions.values()))
+            }
+        else:
+            # Fetch commits by their checksums which leaves all refs (and therefore what gets deployed) untouched
+            pull_opts = {
+                'refs': GLib.Variant('as', tuple(revisions.values()))
+            }
+        if source is not None:
+            # Keep pulling through the remote so that its GPG verification settings and keys still apply
+            self.logger.debug("Pulling from local OSTree repo located at '{}'".format(source))
+            pull_opts['override-url'] = GLib.Variant('s', Gio.File.new_for_path(os.path.abspath(source)).get_uri())
+
+        pull_progress = pull_progress if pull_progress is not None else PullProgress()
+        pull_progress.start()
         try:
             progress = OSTree.AsyncProgress.new()
             progress.connect(
-                'changed', OSTree.Repo.pull_default_console_progress_changed, None)
+                'changed', self.__on_pull_progress_changed, pull_progress)
 
             opts = GLib.Variant(
                 'a{sv}', 
-                {
+                dict(pull_opts, **{
                     'flags': GLib.Variant('i', OSTree.RepoPullFlags.NONE),
-                    'refs': GLib.Variant('as', (branch_name,)),
-                    'override-commit-ids': GLib.Variant('as', (revision,)),
                     'depth': GLib.Variant('i', depth)
-                }
+                })
             )
             result = self.ostree_repo.pull_with_options(remote_name, opts, progress, None)
 
             progress.finish()
+            pull_progress.update(progress)
             if not result:
-                raise OSTreeError("Unable to pull revision '{}' from '{}' branch at OSTree remote '{}'".format(revision, branch_name, remote_name))
+                raise OSTreeError("Unable to pull {} at OSTree remote '{}'".format(description, remote_name))
+        except GLib.Error as err:
+            raise OSTreeError("Unable to pull {} at OSTree remote '{}'".format(description, remote_name)) from err
+        finally:
+            pull_progress.finish()
+
+        self.logger.info("Pulled {}: {} bytes in {:.3f} seconds ({} bytes/s)".format(description, pull_progress.bytes_transferred, pull_progress.get_duration(), pull_progress.get_rate()))
+        return pull_progress
+
+    def __import_static_delta_file(self, remote_name, revisions, path, pull_progress, update_ref):
+        self.logger.debug("Importing static delta file '{}'".format(path))
+
+        pull_progress = pull_progress if pull_progress is not None else PullProgress()
+        pull_progress.start()
+        try:
+            self.ostree_repo.prepare_transaction(None)
+            try:
+                self.ostree_repo.static_delta_execute_offline(Gio.File.new_for_path(path), False, None)
+                self.ostree_repo.commit_transaction(None)
+            except GLib.Error:
+                self.ostree_repo.abort_transaction(None)
+                raise
+            pull_progress.bytes_transferred = os.path.getsize(path)
+        except GLib.Error as err:
+            raise OSTreeError("Failed to import static delta file '{}'".format(path)) from err
+        finally:
+            pull_progress.finish()
+
+        for branch_name, revision in revisions.items():
+            if not self.has_ostree_revision(revision):
+                raise OSTreeError("Static delta file '{}' does not provide revision '{}' of '{}' branch".format(path, revision, branch_name))
+
+            # Static deltas applied offline are not checked against the remote's GPG keys by OSTree itself
+            try:
+                if self.ostree_repo.remote_get_gpg_verify(remote_name):
+                    self.ostree_repo.verify_commit_for_remote(revision, remote_name, None)
+            except GLib.Error as err:
+                raise OSTreeError("Failed to verify signature of revision '{}' imported from static delta file '{}'".format(revision, path)) from err
+
+            if update_ref:
+                self.set_ostree_ref(remote_name, branch_name, revision)
+
+        self.logger.info("Imported static delta file '{}': {} bytes in {:.3f} seconds".format(path, pull_progress.bytes_transferred, pull_progress.get_duration()))
+        return pull_progress
+
+    def __on_pull_progress_changed(self, progress, pull_progress):
+        OSTree.Repo.pull_default_console_progress_changed(progress, None)
+        pull_progress.update(progress)
+
+    def verify_ostree_revision(self, remote_name, revision, max_workers=1):
+        self.logger.debug("Verifying revision '{}' in local OSTree repo".format(revision))
+
+        try:
+            if remote_name is not None and self.ostree_repo.remote_get_gpg_verify(remote_name):
+                self.ostree_repo.verify_commit_for_remote(revision, remote_name, None)
         except GLib.Error as err:
-            raise OSTreeError("Unable to pull revision '{}' from '{}' branch at OSTree remote '{}'".format(revision, branch_name, remote_name)) from err
+            raise OSTreeError("Failed to verify signature of revision '{}'".format(revision)) from err
+
+        try:
+            [_, reachable] = self.ostree_repo.traverse_commit(revision, 0, None)
+            objects = [OSTree.object_name_deserialize(name) for name in reachable.keys()]
+        except GLib.Error as err:
+            raise OSTreeError("Failed to enumerate objects of revision '{}'".format(revision)) from err
+
+        # Hashing is done by OSTree and GLib which release the GIL, so objects can be verified in parallel
+        chunks = [objects[index:index + OSTREE_VERIFY_CHUNK_SIZE] for index in range(0, len(objects), OSTREE_VERIFY_CHUNK_SIZE)]
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            corrupted_checksums = [checksum for checksums in executor.map(self.__verify_ostree_objects, chunks) for checksum in checksums]
+        if corrupted_checksums:
+            raise OSTreeError("Revision '{}' is corrupted ({} of {} object(s) damaged or missing, e.g., '{}')".format(revision, len(corrupted_checksums), len(objects), corrupted_checksums[0]))
+
+        self.logger.debug("Verified {} object(s) of revision '{}'".format(len(objects), revision))
+        return len(objects)
+
+    def __verify_ostree_objects(self, objects):
+        return [checksum for [checksum, object_type] in objects if not self.__verify_ostree_object(checksum, object_type)]
+
+    def __verify_ostree_object(self, checksum, object_type):
+        try:
+            if object_type == OSTree.ObjectType.FILE:
+                # File checksums cover content as well as ownership, permissions and extended attributes
+                [_, content, file_info, xattrs] = self.ostree_repo.load_file(checksum, None)
+                [_, raw_checksum] = OSTree.checksum_file_from_input(file_info, xattrs, content, object_type, None)
+                actual_checksum = OSTree.checksum_from_bytes(raw_checksum)
+            else:
+                [_, metadata] = self.ostree_repo.load_variant(object_type, checksum)
+                actual_checksum = GLib.compute_checksum_for_bytes(GLib.ChecksumType.SHA256, metadata.get_data_as_bytes())
+        except GLib.Error as err:
+            self.logger.debug("Failed to load object '{}': {}".format(checksum, err))
+            return False
+        return actual_checksum == checksum
 
     def checkout_at(self, revision, checkout_path):
         self.logger.debug("Checking out revision '{}' from local OSTree repo".format(revision))
@@ -91,3 +259,117 @@ class OSTreeRepo(object):
         finally:
             if checkout_dir is not None:
                 os.close(checkout_dir)
+
+    def checkout_path_at(self, revision, path, checkout_path):
+        self.logger.debug("Checking out '{}' from revision '{}' in local OSTree repo".format(path, revision))
+
+        try:
+            [_, root, _] = self.ostree_repo.read_commit(revision, None)
+            source = root.resolve_relative_path(path.lstrip('/'))
+            source_info = source.query_info(OSTREE_FILE_INFO_ATTRIBUTES, Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS, None)
+
+            if source_info.get_file_type() == Gio.FileType.DIRECTORY:
+                if not self.ostree_repo.checkout_tree(OSTree.RepoCheckoutMode.USER, OSTree.RepoCheckoutOverwriteMode.NONE, Gio.File.new_for_path(checkout_path), source, source_info, None):
+                    raise OSTreeError("Unable to check out '{}' from revision '{}' in local OSTree repo".format(path, revision))
+            else:
+                self.__checkout_file_at(revision, path, checkout_path)
+        except GLib.Error as err:
+            raise OSTreeError("Unable to check out '{}' from revision '{}' in local OSTree repo".format(path, revision)) from err
+
+    def __checkout_file_at(self, revision, path, checkout_path):
+        # Checking out a single file always yields a file named after the same in the destination directory, so check it
+        # out into a scratch directory beside the destination (i.e., on the same file system) and move it from there
+        scratch_path = tempfile.mkdtemp(dir=os.path.dirname(checkout_path), prefix='.checkout-')
+        scratch_dir = None
+        try:
+            options = OSTree.RepoCheckoutAtOptions()
+            options.overwrite_mode = OSTree.RepoCheckoutOverwriteMode.NONE
+            options.bareuseronly_dirs = True
+            options.no_copy_fallback = True
+            options.mode = OSTree.RepoCheckoutMode.USER
+            options.subpath = path
+
+            scratch_dir = os.open(scratch_path, os.O_DIRECTORY)
+            if not self.ostree_repo.checkout_at(options, scratch_dir, scratch_path, revision):
+                raise OSTreeError("Unable to check out '{}' from revision '{}' in local OSTree repo".format(path, revision))
+            os.replace(os.path.join(scratch_path, os.path.basename(path)), checkout_path)
+        finally:
+            if scratch_dir is not None:
+                os.close(scratch_dir)
+            shutil.rmtree(scratch_path, ignore_errors=True)
+
+    def diff_ostree_revisions(self, from_revision, to_revision):
+        self.logger.debug("Comparing revision '{}' against revision '{}' in local OSTree repo".format(from_revision, to_revision))
+
+        try:
+            [_, from_root, _] = self.ostree_repo.read_commit(from_revision, None)
+            [_, to_root, _] = self.ostree_repo.read_commit(to_revision, None)
+
+            diff = [[], [], []]
+            self.__diff_dirs(from_root, to_root, '/', diff)
+            return diff
+        except GLib.Error as err:
+            raise OSTreeError("Unable to compare revision '{}' against revision '{}' in local OSTree repo".format(from_revision, to_revision)) from err
+
+    def __diff_dirs(self, from_dir, to_dir, path, diff):
+        # Compares two directories of committed trees the same way as OSTree.diff_dirs() (whose results are returned 
+        # through caller-allocated arrays that cannot be handed back by GObject introspection), i.e., by their checksums
+        # and without descending into subdirectories whose contents are the same
+        [modified, removed, added] = diff
+        from_children = self.__list_children(from_dir)
+        to_children = self.__list_children(to_dir)
+
+        for name, [from_child, from_type] in from_children.items():
+            child_path = path + name
+            if name not in to_children:
+                removed.append(child_path)
+                continue
+
+            [to_child, to_type] = to_children[name]
+            if from_type != to_type:
+                modified.append(child_path)
+            elif from_type == Gio.FileType.DIRECTORY:
+                from_child.ensure_resolved()
+                to_child.ensure_resolved()
+                if from_child.tree_get_metadata_checksum() != to_child.tree_get_metadata_checksum():
+                    modified.append(child_path)
+                if from_child.tree_get_contents_checksum() != to_child.tree_get_contents_checksum():
+                    self.__diff_dirs(from_child, to_child, child_path + '/', diff)
+            elif from_child.get_checksum() != to_child.get_checksum():
+                modified.append(child_path)
+
+        for name, [to_child, to_type] in to_children.items():
+            if name not in from_children:
+                self.__add_tree(to_child, to_type, path + name, added)
+
+    def __add_tree(self, file, file_type, path, added):
+        # Added directories are listed along with everything they contain
+        added.append(path)
+        if file_type == Gio.FileType.DIRECTORY:
+            for name, [child, child_type] in self.__list_children(file).items():
+                self.__add_tree(child, child_type, path + '/' + name, added)
+
+    def __list_children(self, dir):
+        children = {}
+        enumerator = dir.enumerate_children(OSTREE_FILE_INFO_ATTRIBUTES, Gio.FileQueryInfoFlags.NOFOLLOW_SYMLINKS, None)
+        while True:
+            info = enumerator.next_file(None)
+            if info is None:
+                return children
+            children[info.get_name()] = [dir.get_child(info.get_name()), info.get_file_type()]
+
+    def diff_ostree_revision_against_path(self, revision, path, owner_uid, owner_gid):
+        self.logger.debug("Comparing revision '{}' in local OSTree repo against '{}'".format(revision, path))
+
+        # Files in a checkout are not accompanied by checksums, leave it to the ostree command to compute and compare them
+        args = ['--no-xattrs', '--owner-uid=' + str(owner_uid), '--owner-gid=' + str(owner_gid), revision, path]
+        process = subprocess.run(['ostree', 'diff', '--repo=' + self.get_repo_path()] + args, universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        if process.returncode != 0:
+            raise OSTreeError("Unable to compare revision '{}' in local OSTree repo against '{}': {}".format(revision, path, get_process_text_outcome(process)))
+
+        diff = { OSTREE_DIFF_MODIFIED: [], OSTREE_DIFF_REMOVED: [], OSTREE_DIFF_ADDED: [] }
+        for line in process.stdout.splitlines():
+            if line.strip():
+                [kind, path] = line.split(None, 1)
+                diff[kind].append(path)
+        return [diff[OSTREE_DIFF_MODIFIED], diff[OSTREE_DIFF_REMOVED], diff[OSTREE_DIFF_ADDED]]
@@ -0,0 +1,101 @@
+import json
+import time
+import logging
+
+from fotahubclient.json_encode_decode import to_pascalcase_keyed_dict
+from fotahubclient.system_helper import write_file_atomically
+
+PULL_PROGRESS_REPORT_INTERVAL_DEFAULT = 1.0
+
+class PullProgress(object):
+
+    # Collects the counters reported by OSTree.AsyncProgress while pulling a revision
+    # (see https://github.com/ostreedev/ostree/blob/main/src/libostree/ostree-repo-pull.c for details)
+    def __init__(self, callback=None, report_interval=PULL_PROGRESS_REPORT_INTERVAL_DEFAULT):
+        self.callback = callback
+        self.report_interval = report_interval
+        self.last_report_time = None
+
+        self.start_time = None
+        self.end_time = None
+        self.status = None
+        self.bytes_transferred = 0
+        self.fetched_objects = 0
+        self.requested_objects = 0
+        self.fetched_metadata_objects = 0
+        self.outstanding_fetches = 0
+        self.fetched_delta_parts = 0
+        self.total_delta_parts = 0
+        self.total_delta_part_size = 0
+
+    def start(self):
+        self.start_time = time.monotonic()
+        self.end_time = None
+
+    def update(self, async_progress):
+        self.status = async_progress.get_status()
+        self.bytes_transferred = async_progress.get_uint64('bytes-transferred')
+        self.fetched_objects = async_progress.get_uint('fetched')
+        self.requested_objects = async_progress.get_uint('requested')
+        self.fetched_metadata_objects = async_progress.get_uint('metadata-fetched')
+        self.outstanding_fetches = async_progress.get_uint('outstanding-fetches')
+        self.fetched_delta_parts = async_progress.get_uint('fetched-delta-parts')
+        self.total_delta_parts = async_progress.get_uint('total-delta-parts')
+        self.total_delta_part_size = async_progress.get_uint64('total-delta-part-size')
+
+        now = time.monotonic()
+        if self.callback is not None and (self.last_report_time is None or now - self.last_report_time >= self.report_interval):
+            self.last_report_time = now
+            self.callback(self)
+
+    def finish(self):
+        self.end_time = time.monotonic()
+        if self.callback is not None:
+            self.callback(self)
+
+    def is_finished(self):
+        return self.end_time is not None
+
+    def get_duration(self):
+        if self.start_time is None:
+            return 0.0
+        return (self.end_time if self.end_time is not None else time.monotonic()) - self.start_time
+
+    def get_rate(self):
+        duration = self.get_duration()
+        return int(self.bytes_transferred / duration) if duration > 0 else 0
+
+    def get_statistics(self):
+        return {
+            'status': self.status,
+            'finished': self.is_finished(),
+            'duration': round(self.get_duration(), 3),
+            'bytes_transferred': self.bytes_transferred,
+            'rate': self.get_rate(),
+            'fetched_objects': self.fetched_objects,
+            'requested_objects': self.requested_objects,
+            'fetched_metadata_objects': self.fetched_metadata_objects,
+            'outstanding_fetches': self.outstanding_fetches,
+            'fetched_delta_parts': self.fetched_delta_parts,
+            'total_delta_parts': self.total_delta_parts,
+            'total_delta_part_size': self.total_delta_part_size
+        }
+
+def create_pull_progress(config, artifact_name):
+    callback = PullProgressFileWriter(config.pull_progress_path, artifact_name) if config.pull_progress_path else None
+    return PullProgress(callback, config.pull_progress_interval)
+
+class PullProgressFileWriter(object):
+
+    # Periodically persists pull progress of an artifact in a JSON file (e.g., for being picked up by fleet management agents)
+    def __init__(self, path, artifact_name):
+        self.path = path
+        self.artifact_name = artifact_name
+
+    def __call__(self, pull_progress):
+        statistics = { 'artifact_name': self.artifact_name }
+        statistics.update(pull_progress.get_statistics())
+        try:
+            write_file_atomically(self.path, json.dumps(to_pascalcase_keyed_dict(statistics), ensure_ascii=False, indent=4))
+        except OSError as err:
+            logging.getLogger().warning("Failed to write pull progress to '{}': {}".format(self.path, err))
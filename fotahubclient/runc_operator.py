@@ -1,16 +1,35 @@
 import os
+import sys
 import logging
 import subprocess
 import json
+import time
+import select
 from enum import Enum
 
-from fotahubclient.system_helper import get_process_text_outcome, read_last_lines
+from fotahubclient.system_helper import get_process_text_outcome
+from fotahubclient.log_sink import read_last_log_lines, read_log_segment, remove_log_backups
+from fotahubclient.file_watcher import FileWatcher, FileTail
 
 CONTAINER_LOG_OUT_FILE_NAME = 'log.out'
 CONTAINER_LOG_ERR_FILE_NAME = 'log.err'
 
 MAX_LOG_LINES_DEFAULT = 10
 
+CONTAINER_LOG_MAX_SIZE_DEFAULT = 0
+CONTAINER_LOG_MAX_BACKUPS_DEFAULT = 0
+CONTAINER_LOG_SINK_EXIT_TIMEOUT = 5
+
+CONTAINER_LOG_FOLLOW_STATE_CHECK_INTERVAL = 1.0
+
+CONTAINER_STATES_SNAPSHOT_MAX_AGE_DEFAULT = 1.0
+
+CONTAINER_STOP_GRACE_PERIOD_DEFAULT = 5
+CONTAINER_STOP_TIMEOUT_DEFAULT = 10
+
+CONTAINER_EXIT_POLL_INTERVAL_MIN = 0.01
+CONTAINER_EXIT_POLL_INTERVAL_MAX = 0.5
+
 class RunCError(Exception):
     pass
 
@@ -29,14 +48,57 @@ class ContainerState(Enum):
 # See https://medium.com/@Mark.io/https-medium-com-mark-io-managing-runc-containers-e40a9b3c58bd for details
 class RunCOperator(object):
     
-    def __init__(self):
+    def __init__(self, snapshot_max_age=CONTAINER_STATES_SNAPSHOT_MAX_AGE_DEFAULT, stop_grace_period=CONTAINER_STOP_GRACE_PERIOD_DEFAULT, stop_timeout=CONTAINER_STOP_TIMEOUT_DEFAULT, 
+            log_max_size=CONTAINER_LOG_MAX_SIZE_DEFAULT, log_max_backups=CONTAINER_LOG_MAX_BACKUPS_DEFAULT, log_compress=False):
         self.logger = logging.getLogger()
 
-    def get_container_state(self, container_id):
+        self.stop_grace_period = stop_grace_period
+        self.stop_timeout = stop_timeout
+
+        self.log_max_size = log_max_size
+        self.log_max_backups = log_max_backups
+        self.log_compress = log_compress
+
+        self.snapshot_max_age = snapshot_max_age
+        self.container_states_snapshot = None
+        self.container_states_snapshot_time = None
+
+    def __query_container(self, container_id):
         process = subprocess.run(["runc", "state", container_id], universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
         if process.returncode != 0:
             return None
-        return ContainerState.from_string(json.loads(process.stdout)['status'])
+        return json.loads(process.stdout)
+
+    def get_container_state(self, container_id, from_snapshot=False):
+        if from_snapshot:
+            return self.get_container_states_snapshot().get(container_id)
+
+        container = self.__query_container(container_id)
+        return ContainerState.from_string(container['status']) if container is not None else None
+
+    def get_container_pid(self, container_id):
+        container = self.__query_container(container_id)
+        return container.get('pid') if container is not None else None
+
+    def list_container_states(self):
+        process = subprocess.run(["runc", "list", "--format", "json"], universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        if process.returncode != 0:
+            raise RunCError("Failed to list containers: {}".format(get_process_text_outcome(process)))
+        
+        # runc yields 'null' rather than an empty array when there are no containers at all
+        containers = json.loads(process.stdout) if process.stdout.strip() else None
+        return { container['id']: ContainerState.from_string(container['status']) for container in (containers or []) }
+
+    def get_container_states_snapshot(self):
+        now = time.monotonic()
+        if self.container_states_snapshot is None or now - self.container_states_snapshot_time > self.snapshot_max_age:
+            self.container_states_snapshot = self.list_container_states()
+            self.container_states_snapshot_time = now
+        return self.container_states_snapshot
+
+    def invalidate_container_states_snapshot(self):
+        self.container_states_snapshot = None
+        self.container_states_snapshot_time = None
 
     def read_container_logs(self, bundle_path, max_lines=MAX_LOG_LINES_DEFAULT):
         if max_lines < 0:
@@ -50,58 +112,222 @@ class RunCOperator(object):
         logs = ''
 
         if has_out:
-            logs += read_last_lines(out_path, max_lines if not has_err else max_lines - 1)
+            logs += read_last_log_lines(out_path, max_lines if not has_err else max_lines - 1)
 
         if logs and not logs.endswith('\n') and max_lines > 1:
             logs += '\n'
         
         if has_err:
-            logs += read_last_lines(err_path, 1)
+            logs += read_last_log_lines(err_path, 1)
 
         return logs
 
+    def follow_container_logs(self, container_id, bundle_path, state_check_interval=CONTAINER_LOG_FOLLOW_STATE_CHECK_INTERVAL):
+        out_path = '{}/{}'.format(bundle_path, CONTAINER_LOG_OUT_FILE_NAME)
+        err_path = '{}/{}'.format(bundle_path, CONTAINER_LOG_ERR_FILE_NAME)
+
+        # Remember where logs end right away rather than only once caller starts iterating over what gets logged from now on
+        self.logger.debug("Following logs of '{}' container".format(container_id))
+        return self.__follow_log_files(container_id, [FileTail(out_path), FileTail(err_path)], state_check_interval)
+
+    def __follow_log_files(self, container_id, tails, state_check_interval):
+        try:
+            with FileWatcher([tail.path for tail in tails]) as watcher:
+                while True:
+                    # Stop following once container has exited and yield whatever it has logged until then
+                    running = self.get_container_state(container_id) == ContainerState.running
+                    check_deadline = time.monotonic() + state_check_interval
+                    if not running:
+                        for tail in tails:
+                            text = tail.read_remainder()
+                            if text:
+                                yield text
+                        return
+
+                    while True:
+                        for tail in tails:
+                            text = tail.read_lines()
+                            if text:
+                                yield text
+
+                        remaining = check_deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        watcher.wait(remaining)
+        finally:
+            for tail in tails:
+                tail.close()
+
+    def create_container(self, container_id, bundle_path):
+        container_state = self.get_container_state(container_id)
+        if container_state == ContainerState.created or container_state == ContainerState.running:
+            self.logger.debug("Ignoring request to create '{}' container as it has already been created".format(container_id))
+            return container_state
+
+        if container_state == ContainerState.stopped:
+            self.__delete_container(container_id, container_state)
+
+        self.logger.debug("Creating '{}' container as per '{}' bundle".format(container_id, bundle_path))
+        [success, message] = self.__launch_container(["create"], container_id, bundle_path)
+        if not success:
+            raise RunCError("Failed to create '{}' container: {}".format(container_id, message))
+        return self.get_container_state(container_id)
+
     def run_container(self, container_id, bundle_path):
         container_state = self.get_container_state(container_id)
         if container_state == ContainerState.created:
-            raise RunCError("Cannot create and run '{}' container that has already been created - consider to delete it before")
+            return self.__start_container(container_id, bundle_path)
         if container_state == ContainerState.running:
             self.logger.debug("Ignoring request to run '{}' container as it is already running".format(container_id))
             return [container_state, '']
 
         if container_state == ContainerState.stopped:
-            self.delete_container(container_id)
+            self.__delete_container(container_id, container_state)
 
         self.logger.debug("Creating and running '{}' container as per '{}' bundle".format(container_id, bundle_path))
-        with open('{}/{}'.format(bundle_path, CONTAINER_LOG_OUT_FILE_NAME), "w") as out_file:
-            with open('{}/{}'.format(bundle_path, CONTAINER_LOG_ERR_FILE_NAME), "w") as err_file:
-                process = subprocess.run(["runc", "run", "--detach", "-b", bundle_path, container_id], universal_newlines=True, stdout=out_file, stderr=err_file, check=False)
-                if process.returncode == 0:
-                    return [self.get_container_state(container_id), self.read_container_logs(bundle_path, 1)]
-                else:
-                    raise RunCError("Failed to create and run '{}' container: {}".format(container_id, err_file.read()))
+        [success, message] = self.__launch_container(["run", "--detach"], container_id, bundle_path)
+        if not success:
+            raise RunCError("Failed to create and run '{}' container: {}".format(container_id, message))
+        return [self.get_container_state(container_id), self.read_container_logs(bundle_path, 1)]
+
+    def __start_container(self, container_id, bundle_path):
+        self.logger.debug("Starting previously created '{}' container".format(container_id))
+        self.invalidate_container_states_snapshot()
+        process = subprocess.run(["runc", "start", container_id], universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        if process.returncode != 0:
+            raise RunCError("Failed to start '{}' container: {}".format(container_id, get_process_text_outcome(process)))
+        return [self.get_container_state(container_id), self.read_container_logs(bundle_path, 1)]
+
+    def __launch_container(self, runc_command, container_id, bundle_path):
+        # Containers inherit the standard output and error streams of the runc command that creates them
+        self.invalidate_container_states_snapshot()
+        if self.log_max_size > 0:
+            return self.__launch_container_with_log_sink(runc_command, container_id, bundle_path)
+
+        out_path = '{}/{}'.format(bundle_path, CONTAINER_LOG_OUT_FILE_NAME)
+        err_path = '{}/{}'.format(bundle_path, CONTAINER_LOG_ERR_FILE_NAME)
+        remove_log_backups(out_path)
+        remove_log_backups(err_path)
+        with open(out_path, "w") as out_file:
+            with open(err_path, "w+") as err_file:
+                process = subprocess.run(["runc"] + runc_command + ["-b", bundle_path, container_id], universal_newlines=True, stdout=out_file, stderr=err_file, check=False)
+                if process.returncode != 0:
+                    err_file.seek(0)
+                    return [False, err_file.read().strip() or "Exit code {}".format(process.returncode)]
+                return [True, None]
+
+    def __launch_container_with_log_sink(self, runc_command, container_id, bundle_path):
+        out_path = '{}/{}'.format(bundle_path, CONTAINER_LOG_OUT_FILE_NAME)
+        err_path = '{}/{}'.format(bundle_path, CONTAINER_LOG_ERR_FILE_NAME)
+
+        # Let container write its output into pipes drained by a log sink process that outlives this process 
+        # and keeps container logs within configured size limits by rotating them (sink must not inherit any 
+        # standard streams of this process as it would keep those who capture them waiting until container exits)
+        [out_read_fd, out_write_fd] = os.pipe()
+        [err_read_fd, err_write_fd] = os.pipe()
+        try:
+            sink = subprocess.Popen(
+                [sys.executable, '-m', 'fotahubclient.log_sink', '--max-size', str(self.log_max_size), '--max-backups', str(self.log_max_backups)] + 
+                    (['--compress'] if self.log_compress else []) + 
+                    ['{}:{}'.format(out_read_fd, out_path), '{}:{}'.format(err_read_fd, err_path)],
+                stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, pass_fds=(out_read_fd, err_read_fd), start_new_session=True
+            )
+        except Exception:
+            os.close(out_write_fd)
+            os.close(err_write_fd)
+            raise
+        finally:
+            os.close(out_read_fd)
+            os.close(err_read_fd)
+
+        try:
+            process = subprocess.run(["runc"] + runc_command + ["-b", bundle_path, container_id], universal_newlines=True, stdout=out_write_fd, stderr=err_write_fd, check=False)
+        finally:
+            os.close(out_write_fd)
+            os.close(err_write_fd)
+
+        if process.returncode != 0:
+            # Log sink exits as soon as it has written everything runc has reported
+            try:
+                sink.wait(CONTAINER_LOG_SINK_EXIT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.logger.warning("Log sink of '{}' container has not exited after container could not be launched".format(container_id))
+            return [False, read_log_segment(err_path).decode(errors='replace').strip() or "Exit code {}".format(process.returncode)]
+        return [True, None]
 
     def stop_container(self, container_id):
-        if self.get_container_state(container_id) != ContainerState.running:
+        self.__stop_container(container_id, self.get_container_state(container_id))
+
+    def __stop_container(self, container_id, container_state):
+        if container_state != ContainerState.running:
             self.logger.debug("Ignoring request to stop '{}' container as no such is running".format(container_id))
             return
 
         self.logger.debug("Stopping '{}' container".format(container_id))
-        process = subprocess.run(["runc", "kill", container_id, "KILL"], universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
-        if process.returncode != 0:
+        self.invalidate_container_states_snapshot()
+        pid = self.get_container_pid(container_id)
+
+        # Give container a chance to terminate gracefully before killing it
+        if self.stop_grace_period > 0:
+            self.__kill_container(container_id, 'TERM')
+            if self.__wait_for_container_exit(container_id, pid, self.stop_grace_period):
+                return
+            self.logger.debug("Killing '{}' container as it has not terminated within {} seconds".format(container_id, self.stop_grace_period))
+
+        self.__kill_container(container_id, 'KILL')
+        if not self.__wait_for_container_exit(container_id, pid, self.stop_timeout):
+            raise RunCError("Failed to stop '{}' container: Container still running {} seconds after having been killed".format(container_id, self.stop_timeout))
+
+    def __kill_container(self, container_id, signal):
+        process = subprocess.run(["runc", "kill", container_id, signal], universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        if process.returncode != 0 and self.get_container_state(container_id) == ContainerState.running:
             raise RunCError("Failed to stop '{}' container: {}".format(container_id, get_process_text_outcome(process)))
 
+    def __wait_for_container_exit(self, container_id, pid, timeout):
+        deadline = time.monotonic() + timeout
+        if pid:
+            self.__wait_for_process_exit(pid, timeout)
+
+        # Confirm that runc has noticed the container's exit as well, polling with exponential backoff
+        # in case the exit of the container's init process could not be awaited directly
+        poll_interval = CONTAINER_EXIT_POLL_INTERVAL_MIN
         while self.get_container_state(container_id) == ContainerState.running:
-            # Wait until container has been effectively stopped
-            pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(poll_interval, remaining))
+            poll_interval = min(poll_interval * 2, CONTAINER_EXIT_POLL_INTERVAL_MAX)
+        return True
+
+    def __wait_for_process_exit(self, pid, timeout):
+        try:
+            pidfd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            # Process has already gone
+            return
+        except (AttributeError, OSError):
+            # Process file descriptors not supported by Python runtime or kernel
+            return
+
+        try:
+            poller = select.poll()
+            poller.register(pidfd, select.POLLIN)
+            poller.poll(timeout * 1000)
+        finally:
+            os.close(pidfd)
 
     def delete_container(self, container_id):
-        if self.get_container_state(container_id) is None:
+        self.__delete_container(container_id, self.get_container_state(container_id))
+
+    def __delete_container(self, container_id, container_state):
+        if container_state is None:
             self.logger.debug("Ignoring request to delete '{}' container as no such exists yet or anymore".format(container_id))
             return
 
-        self.stop_container(container_id)
+        self.__stop_container(container_id, container_state)
 
         self.logger.debug("Deleting '{}' container".format(container_id))
+        self.invalidate_container_states_snapshot()
         process = subprocess.run(["runc", "delete", container_id], universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
         if process.returncode != 0:
             raise RunCError("Failed to delete '{}' container: {}".format(container_id, get_process_text_outcome(process)))
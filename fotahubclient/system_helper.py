@@ -1,7 +1,18 @@
+import io
 import os
 import logging
 import subprocess
 import shlex
+import traceback
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+CHOWNTREE_WORKERS_DEFAULT = min(4, os.cpu_count() or 1)
+CHOWNTREE_SUBTREES_PER_WORKER = 4
+
+DIR_OPEN_FLAGS = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW
+
+READ_LAST_LINES_BLOCK_SIZE = 8192
 
 def join_exception_messages(err, message=''):
     if err is not None:
@@ -10,7 +21,13 @@ def join_exception_messages(err, message=''):
     else:
         return message
 
-def run_command(title, command, args=[]):
+def format_exception_report(err, stacktrace=False):
+    if stacktrace:
+        return ''.join(traceback.format_exception(type(err), err, err.__traceback__))
+    else:
+        return 'ERROR: ' + join_exception_messages(err)
+
+def run_command(title, command, args=[], timeout=None):
     if command:
         logging.getLogger().info("Running {}".format(title))
 
@@ -23,7 +40,12 @@ def run_command(title, command, args=[]):
             args = [command[0]] + args
 
         logging.getLogger().debug("Launching subprocess: {}".format(' '.join(command + args)))
-        process = subprocess.run(command + args, universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+        try:
+            process = subprocess.run(command + args, universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            message = "{} timed out after {} seconds".format(title, timeout)
+            logging.getLogger().error(message)
+            return [False, message]
         outcome = get_process_text_outcome(process)
         message = "{} {}".format(title, 'succeeded' if process.returncode == 0 else 'failed')
         if outcome:
@@ -45,36 +67,54 @@ def get_process_text_outcome(process):
     else:
         return "Exit code {}".format(process.returncode) if process.returncode != 0 else ''
 
-def read_last_lines(path, max_lines):
+def read_last_lines(path, max_lines, block_size=READ_LAST_LINES_BLOCK_SIZE):
     if not os.path.isfile(path) or os.path.getsize(path) == 0:
         return ''
-    
+
     with open(path, "rb") as file:
-        # Go to the end of the file (ignore trailing whitespace if any)
-        file.seek(-1, os.SEEK_END) 
-        while file.read(1).isspace():
-            if file.tell() >= 2:
-                file.seek(-2, os.SEEK_CUR)
-            else:
-                break
-
-        # Move back specified number of lines
-        for _ in range(max_lines):
-            # Keep moving backward until the next break-line
-            file.seek(-1, os.SEEK_CUR)
-            while file.read(1) != b'\n':
-                if file.tell() >= 2:
-                    file.seek(-2, os.SEEK_CUR)
-                else:
+        return read_last_lines_of_files([file], max_lines, block_size)
+
+def read_last_lines_of_bytes(data, max_lines, block_size=READ_LAST_LINES_BLOCK_SIZE):
+    return read_last_lines_of_files([io.BytesIO(data)], max_lines, block_size)
+
+def read_last_lines_of_files(files, max_lines, block_size=READ_LAST_LINES_BLOCK_SIZE):
+    # Scan the given seekable files (whose contents add up to a text when joined in reverse order, e.g., a log and 
+    # its rotated predecessors) backward block by block, skip trailing whitespace if any and then look for the line 
+    # break preceding the specified number of lines (or the beginning of the text if there are not as many lines);
+    # files are taken from the given iterable only as long as more lines are needed
+    blocks = []
+    content_found = False
+    remaining_lines = max_lines
+    start = None
+    for file in files:
+        block_end = file.seek(0, os.SEEK_END)
+        while block_end > 0 and start is None:
+            block_start = max(0, block_end - block_size)
+            file.seek(block_start)
+            block = file.read(block_end - block_start)
+            blocks.append(block)
+            block_end = block_start
+
+            index = len(block)
+            if not content_found:
+                index = len(block.rstrip())
+                if index == 0:
+                    continue
+                content_found = True
+
+            while remaining_lines > 0:
+                index = block.rfind(b'\n', 0, index)
+                if index < 0:
                     break
-            file.seek(-1, os.SEEK_CUR)
-            
-            # Stop moving when having reached the beginning of the file again
-            if file.tell() == 0:
-                break
+                remaining_lines -= 1
+            if index >= 0 and remaining_lines <= 0:
+                start = index
+        if start is not None:
+            break
 
-        # Read file content from current position on and convert result into text
-        return file.read().decode().strip()
+    # Convert content from line break on to end into text
+    blocks.reverse()
+    return b''.join(blocks)[start or 0:].decode().strip()
 
 def reboot_system(args=[]):
     logging.getLogger().info("Rebooting system {}".format('(using ' + ' '.join(args) + ')' if args else ''))
@@ -84,15 +124,105 @@ def reboot_system(args=[]):
     except subprocess.CalledProcessError as err:
         raise OSError("Failed to reboot system") from err
 
-def chowntree(path, uid, gid):
+def chowntree(path, uid, gid, max_workers=CHOWNTREE_WORKERS_DEFAULT):
     logging.getLogger().debug("Changing user/group ownership of each file in {} to {}/{}".format(path, str(uid), str(gid)))
 
-    os.chown(path, uid, gid)
-    for dir_path, dir_names, file_names in os.walk(path):
-        for dir_name in dir_names:
-            os.lchown(os.path.join(dir_path, dir_name), uid, gid)
-        for file_name in file_names:
-            os.lchown(os.path.join(dir_path, file_name), uid, gid)
+    os.lchown(path, uid, gid)
+    if os.path.islink(path) or not os.path.isdir(path):
+        return
+
+    # Walk the tree breadth-first until there are enough subtrees to keep all workers busy
+    subtree_paths = [path]
+    while subtree_paths and len(subtree_paths) < max_workers * CHOWNTREE_SUBTREES_PER_WORKER:
+        dir_path = subtree_paths.pop(0)
+        dir_fd = os.open(dir_path, DIR_OPEN_FLAGS)
+        try:
+            subtree_paths.extend(os.path.join(dir_path, name) for name in _chown_dir_entries(dir_fd, uid, gid))
+        finally:
+            os.close(dir_fd)
+
+    if max_workers > 1 and len(subtree_paths) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for _ in executor.map(lambda subtree_path: _chown_subtree(subtree_path, uid, gid), subtree_paths):
+                pass
+    else:
+        for subtree_path in subtree_paths:
+            _chown_subtree(subtree_path, uid, gid)
+
+def _chown_subtree(path, uid, gid):
+    # Walk the subtree depth-first and open subdirectories only when descending into them so that no more 
+    # file descriptors than directories on the path from the subtree's root to the current directory are open
+    dir_stack = [[os.open(path, DIR_OPEN_FLAGS), None]]
+    try:
+        while dir_stack:
+            current_dir = dir_stack[-1]
+            [dir_fd, subdir_names] = current_dir
+            if subdir_names is None:
+                subdir_names = current_dir[1] = iter(_chown_dir_entries(dir_fd, uid, gid))
+
+            subdir_name = next(subdir_names, None)
+            if subdir_name is not None:
+                dir_stack.append([os.open(subdir_name, DIR_OPEN_FLAGS, dir_fd=dir_fd), None])
+            else:
+                dir_stack.pop()
+                os.close(dir_fd)
+    finally:
+        for [dir_fd, _] in dir_stack:
+            os.close(dir_fd)
+
+# Changes the ownership of all entries in given directory and returns the names of the subdirectories among them
+def _chown_dir_entries(dir_fd, uid, gid):
+    subdir_names = []
+    with os.scandir(dir_fd) as entries:
+        for entry in entries:
+            os.chown(entry.name, uid, gid, dir_fd=dir_fd, follow_symlinks=False)
+            if entry.is_dir(follow_symlinks=False):
+                subdir_names.append(entry.name)
+    return subdir_names
+
+def write_file_atomically(path, text):
+    data = text.encode('utf-8')
+
+    # Leave file alone when its content doesn't change to avoid needless writes to flash
+    try:
+        with open(path, 'rb') as file:
+            if file.read() == data:
+                logging.getLogger().debug("Skipping write of unchanged file {}".format(path))
+                return False
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+
+    parent = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(parent):
+        os.makedirs(parent, exist_ok=True)
+
+    # Write new content to temporary file next to target file and rename the former to the latter 
+    # so that the target file's content is either entirely the old or entirely the new one at any point in time
+    fd, temp_path = tempfile.mkstemp(dir=parent, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fchmod(file.fileno(), mode)
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    finally:
+        # Temporary file is gone unless something went wrong
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    # Make sure that rename itself is persisted as well
+    fsync_dir(parent)
+    return True
+
+def fsync_dir(path):
+    # Persists creations, renames and removals of directory entries
+    dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
 
 def touch(path):
     open(path, 'a').close()
@@ -0,0 +1,91 @@
+import os
+import json
+import logging
+
+from fotahubclient.json_document_models import UpdateStatusesJSONDecoder
+from fotahubclient.json_encode_decode import PascalCaseJSONEncoder
+from fotahubclient.system_helper import fsync_dir
+
+UPDATE_STATUS_JOURNAL_FILE_SUFFIX = '.journal'
+
+class UpdateStatusJournal(object):
+
+    def __init__(self, update_status_path):
+        self.logger = logging.getLogger()
+
+        self.path = update_status_path + UPDATE_STATUS_JOURNAL_FILE_SUFFIX
+        self.entry_count = 0
+
+    def replay(self, repair=False):
+        entries = []
+        if os.path.isfile(self.path):
+            self.logger.debug("Replaying update status journal '{}'".format(self.path))
+
+            valid_size = 0
+            with open(self.path, 'rb') as file:
+                for line in file:
+                    # Last entry may have been written only partially when power got lost
+                    if not self.__replay_entry(line, entries):
+                        self.logger.warning("Ignoring incomplete entry in update status journal '{}'".format(self.path))
+                        break
+                    valid_size += len(line)
+
+            # Cut off incomplete entry as any entries appended subsequently would end up on the same line and get ignored along with it 
+            # (left to those who append entries as others might come across entries that are just being written)
+            if repair and valid_size < os.path.getsize(self.path):
+                self.__cut_off(valid_size)
+
+        self.entry_count = len(entries)
+        return entries
+
+    def __replay_entry(self, line, entries):
+        if not line.endswith(b'\n'):
+            return False
+        if not line.strip():
+            return True
+        try:
+            entries.append(json.loads(line.decode('utf-8'), cls=UpdateStatusesJSONDecoder))
+            return True
+        except ValueError:
+            return False
+
+    def __cut_off(self, size):
+        self.logger.debug("Cutting off incomplete entry from update status journal '{}'".format(self.path))
+
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            os.ftruncate(fd, size)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def append(self, update_status):
+        parent = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(parent):
+            os.makedirs(parent, exist_ok=True)
+
+        entry = json.dumps(update_status, ensure_ascii=False, cls=PascalCaseJSONEncoder) + '\n'
+        created = not os.path.exists(self.path)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, entry.encode('utf-8'))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+        # Entries of a newly created journal are lost along with the journal itself unless its directory entry is persisted as well
+        if created:
+            fsync_dir(parent)
+
+        self.entry_count += 1
+
+    def truncate(self):
+        if os.path.isfile(self.path):
+            self.logger.debug("Truncating update status journal '{}'".format(self.path))
+
+            # Entries are complete update status records, so replaying them again after the removal 
+            # of the journal having been lost due to a power loss does no harm
+            os.remove(self.path)
+            fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+
+        self.entry_count = 0
@@ -1,30 +1,49 @@
 import os
 
 from fotahubclient.json_document_models import ArtifactKind, UpdateStatuses, UpdateStatus
+from fotahubclient.update_status_journal import UpdateStatusJournal
 
 class UpdateStatusTracker(object):
 
     def __init__(self, config):
         self.config = config
         self.update_statuses = UpdateStatuses()
+        self.update_status_index = {}
+        self.journal = UpdateStatusJournal(self.config.update_status_path)
 
     def __enter__(self):
+        self.load(repair_journal=True)
+        return self 
+
+    def load(self, repair_journal=False):
         if os.path.isfile(self.config.update_status_path) and os.path.getsize(self.config.update_status_path) > 0:
             self.update_statuses = UpdateStatuses.load_update_statuses(self.config.update_status_path)
-        return self 
+        else:
+            self.update_statuses = UpdateStatuses()
+        self.__index_update_statuses()
 
-    def record_os_update_status(self, revision=None, completion_state=None, status=True, message=None, save_instantly=False):
-        self.__record_update_status(self.config.os_distro_name, ArtifactKind.operating_system, revision, completion_state, status, message)
+        # Recover update status changes that have not yet made it into the snapshot (e.g., due to a power loss)
+        for update_status in self.journal.replay(repair_journal):
+            self.__merge_update_status(update_status)
+        return self.update_statuses
+
+    def __index_update_statuses(self):
+        self.update_status_index = {}
+        for position, update_status in enumerate(self.update_statuses.update_statuses):
+            self.update_status_index.setdefault((update_status.artifact_name, update_status.artifact_kind), position)
+
+    def record_os_update_status(self, revision=None, completion_state=None, status=True, message=None, pull_progress=None, save_instantly=False):
+        self.__record_update_status(self.config.os_distro_name, ArtifactKind.operating_system, revision, completion_state, status, message, pull_progress)
         if save_instantly:
-            UpdateStatuses.save_update_statuses(self.update_statuses, self.config.update_status_path, True)
+            self.__compact()
 
-    def record_app_update_status(self, name, revision=None, completion_state=None, status=True, message=None):
-        self.__record_update_status(name, ArtifactKind.application, revision, completion_state, status, message)
+    def record_app_update_status(self, name, revision=None, completion_state=None, status=True, message=None, pull_progress=None, verification_duration=None, self_test_duration=None, rollback_duration=None):
+        self.__record_update_status(name, ArtifactKind.application, revision, completion_state, status, message, pull_progress, verification_duration, self_test_duration, rollback_duration)
 
     def record_fw_update_status(self, name, revision=None, completion_state=None, status=True, message=None):
         self.__record_update_status(name, ArtifactKind.firmware, revision, completion_state, status, message)
 
-    def __record_update_status(self, artifact_name, artifact_kind, revision, completion_state, status, message):
+    def __record_update_status(self, artifact_name, artifact_kind, revision, completion_state, status, message, pull_progress=None, verification_duration=None, self_test_duration=None, rollback_duration=None):
         update_status = self.__lookup_update_status(artifact_name, artifact_kind)
         if update_status is not None:
             if not update_status.initiates_new_update_cycle(completion_state):
@@ -40,30 +59,52 @@ class UpdateStatusTracker(object):
                     status,
                     message)
         else:
-            self.__append_update_status(
-                UpdateStatus(
-                    artifact_name, 
-                    artifact_kind, 
-                    revision,
-                    None,
-                    completion_state,
-                    status,
-                    message
-                )
+            update_status = UpdateStatus(
+                artifact_name, 
+                artifact_kind, 
+                revision,
+                None,
+                completion_state,
+                status,
+                message
             )
+            self.__append_update_status(update_status)
+
+        if pull_progress is not None:
+            update_status.amend_download_info(round(pull_progress.get_duration(), 3), pull_progress.bytes_transferred, pull_progress.get_rate())
+        if verification_duration is not None:
+            update_status.amend_verification_info(round(verification_duration, 3))
+        if self_test_duration is not None:
+            update_status.amend_self_test_info(round(self_test_duration, 3), round(rollback_duration, 3) if rollback_duration is not None else None)
+
+        # Persist every update status change right away and fold the journal into the snapshot from time to time
+        self.journal.append(update_status)
+        if self.journal.entry_count >= self.config.update_status_journal_max_entries:
+            self.__compact()
 
     def get_os_update_revision(self):
         update_status = self.__lookup_update_status(self.config.os_distro_name, ArtifactKind.operating_system)
         return update_status.revision if update_status is not None else None
     
     def __lookup_update_status(self, artifact_name, artifact_kind):
-        for update_status in self.update_statuses.update_statuses:
-            if update_status.artifact_name == artifact_name and update_status.artifact_kind == artifact_kind:
-                return update_status
-        return None
+        position = self.update_status_index.get((artifact_name, artifact_kind))
+        return self.update_statuses.update_statuses[position] if position is not None else None
 
     def __append_update_status(self, update_status):
+        self.update_status_index[(update_status.artifact_name, update_status.artifact_kind)] = len(self.update_statuses.update_statuses)
         self.update_statuses.update_statuses.append(update_status)
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    def __merge_update_status(self, update_status):
+        position = self.update_status_index.get((update_status.artifact_name, update_status.artifact_kind))
+        if position is not None:
+            self.update_statuses.update_statuses[position] = update_status
+        else:
+            self.__append_update_status(update_status)
+
+    def __compact(self):
         UpdateStatuses.save_update_statuses(self.update_statuses, self.config.update_status_path)
+        self.journal.truncate()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.config.update_status_journal_compact_on_exit or self.journal.entry_count >= self.config.update_status_journal_max_entries:
+            self.__compact()
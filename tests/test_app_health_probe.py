@@ -0,0 +1,70 @@
+import time
+import threading
+import http.server
+
+from fotahubclient.app_health_probe import AppHealthProbe
+from fotahubclient.runc_operator import ContainerState
+
+class FakeRunCOperator(object):
+
+    def __init__(self, container_states):
+        self.container_states = list(container_states)
+
+    def get_container_state(self, name):
+        # Keep reporting the last state once all others have been consumed
+        return self.container_states.pop(0) if len(self.container_states) > 1 else self.container_states[0]
+
+class HealthRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.send_response(200 if self.path == '/health' else 503)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def test_command_health_probe():
+    [healthy, message] = AppHealthProbe('command', command='true', timeout=5, interval=0.1).probe('my-app', None)
+    assert healthy
+    assert 'succeeded' in message
+
+def test_command_health_probe_gives_up_at_deadline():
+    start_time = time.monotonic()
+    [healthy, message] = AppHealthProbe('command', command='false', timeout=0.5, interval=0.1).probe('my-app', None)
+    assert not healthy
+    assert 'did not succeed within' in message
+    assert time.monotonic() - start_time < 2
+
+def test_hanging_command_health_probe_gets_interrupted():
+    start_time = time.monotonic()
+    [healthy, message] = AppHealthProbe('command', command='sleep 10', timeout=0.5, interval=0.1).probe('my-app', None)
+    assert not healthy
+    assert 'timed out' in message
+    assert time.monotonic() - start_time < 2
+
+def test_http_health_probe():
+    server = http.server.HTTPServer(('127.0.0.1', 0), HealthRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        base_url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+        [healthy, _] = AppHealthProbe('http', url=base_url + '/health', timeout=2, interval=0.1).probe('my-app', None)
+        assert healthy
+
+        [healthy, message] = AppHealthProbe('http', url=base_url + '/broken', timeout=0.5, interval=0.1).probe('my-app', None)
+        assert not healthy
+        assert '503' in message
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_running_health_probe():
+    runc = FakeRunCOperator([ContainerState.running])
+    [healthy, _] = AppHealthProbe('running', running_period=0.3, timeout=5, interval=0.1).probe('my-app', runc)
+    assert healthy
+
+    runc = FakeRunCOperator([ContainerState.running, ContainerState.running, ContainerState.stopped])
+    [healthy, message] = AppHealthProbe('running', running_period=5, timeout=5, interval=0.1).probe('my-app', runc)
+    assert not healthy
+    assert 'stopped running' in message
@@ -0,0 +1,98 @@
+import os
+import json
+import stat
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+
+gi = pytest.importorskip('gi')
+try:
+    gi.require_version('OSTree', '1.0')
+except ValueError:
+    pytest.skip('OSTree typelib not available', allow_module_level=True)
+if shutil.which('ostree') is None:
+    pytest.skip('ostree command not available', allow_module_level=True)
+
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.app_manager import AppManager, AppUpdateError
+import fotahubclient.common_constants as constants
+
+APP_NAME = 'my-app'
+
+def ostree(*args):
+    return subprocess.run(['ostree'] + list(args), check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+
+def commit_app(source_repo_path, tree_path, content):
+    shutil.rmtree(tree_path, ignore_errors=True)
+    os.makedirs(os.path.join(tree_path, 'rootfs'))
+    with open(os.path.join(tree_path, 'rootfs', 'hello.txt'), 'w') as file:
+        file.write(content)
+    return ostree('commit', '--repo=' + source_repo_path, '--branch=' + APP_NAME, '--subject=' + content, tree_path)
+
+def install_fake_runc(bin_dir):
+    # No containers exist, nor get any created as the application is not run automatically
+    os.makedirs(bin_dir)
+    runc_path = os.path.join(bin_dir, 'runc')
+    with open(runc_path, 'w') as file:
+        file.write("#!/bin/bash\necho '[]'\n")
+    os.chmod(runc_path, os.stat(runc_path).st_mode | stat.S_IEXEC)
+
+def create_config(temp_dir):
+    config = ConfigLoader()
+    config.deployed_artifacts_path = os.path.join(temp_dir, 'deployed-artifacts.json')
+    config.update_status_path = os.path.join(temp_dir, 'update-status.json')
+    config.update_status_journal_compact_on_exit = True
+    config.app_ostree_repo_path = os.path.join(temp_dir, 'apps-repo')
+    config.app_deploy_root = os.path.join(temp_dir, 'apps')
+    config.ostree_gpg_verify = False
+    ostree('init', '--repo=' + config.app_ostree_repo_path, '--mode=bare-user')
+    os.makedirs(config.app_deploy_root)
+    return config
+
+def test_update_apps_records_download_info(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        install_fake_runc(os.path.join(temp_dir, 'bin'))
+        monkeypatch.setenv('PATH', os.path.join(temp_dir, 'bin') + os.pathsep + os.environ['PATH'])
+
+        source_repo_path = os.path.join(temp_dir, 'source-repo')
+        ostree('init', '--repo=' + source_repo_path, '--mode=archive')
+        revision_1 = commit_app(source_repo_path, os.path.join(temp_dir, 'tree'), 'Hello World!\n')
+
+        config = create_config(temp_dir)
+        app_manager = AppManager(config)
+        app_manager.updater.pull_app_updates({ APP_NAME: revision_1 }, source=source_repo_path)
+        app_manager.deploy_and_run_apps()
+
+        revision_2 = commit_app(source_repo_path, os.path.join(temp_dir, 'tree'), 'Hello again!\n')
+        app_manager.update_apps({ APP_NAME: revision_2 }, source=source_repo_path)
+
+        with open(config.update_status_path) as file:
+            update_status_data = json.load(file)['UpdateStatuses'][0]
+        assert update_status_data['Revision'] == revision_2
+        assert update_status_data['CompletionState'] == 'Confirmed'
+        assert type(update_status_data['DownloadDuration']) == float
+        assert type(update_status_data['DownloadSize']) == int
+        assert type(update_status_data['DownloadRate']) == int
+
+def test_run_app_refuses_incomplete_checkout(monkeypatch):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        install_fake_runc(os.path.join(temp_dir, 'bin'))
+        monkeypatch.setenv('PATH', os.path.join(temp_dir, 'bin') + os.pathsep + os.environ['PATH'])
+
+        source_repo_path = os.path.join(temp_dir, 'source-repo')
+        ostree('init', '--repo=' + source_repo_path, '--mode=archive')
+        revision = commit_app(source_repo_path, os.path.join(temp_dir, 'tree'), 'Hello World!\n')
+
+        config = create_config(temp_dir)
+        app_manager = AppManager(config)
+        app_manager.updater.pull_app_updates({ APP_NAME: revision }, source=source_repo_path)
+        app_manager.deploy_and_run_apps()
+
+        # Delta checkout interrupted midway
+        os.remove(os.path.join(config.app_deploy_root, APP_NAME, constants.APP_REVISION_STAMP_FILE_NAME))
+
+        with pytest.raises(AppUpdateError) as excinfo:
+            app_manager.run_app(APP_NAME)
+        assert 'incomplete' in str(excinfo.value.__cause__)
@@ -10,6 +10,7 @@ def test_app_update_status__consecutive_updates():
     with tempfile.NamedTemporaryFile() as temp:
         config = ConfigLoader()
         config.update_status_path = temp.name
+        config.update_status_journal_compact_on_exit = True
         
         app_name = 'my-app'
         
@@ -22,8 +23,8 @@ def test_app_update_status__consecutive_updates():
             tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.applied)
             tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.confirmed, message='Application update successfully completed')
 
-        temp.seek(0)
-        json_data = json.load(temp)
+        with open(temp.name) as file:
+            json_data = json.load(file)
         assert 'UpdateStatuses' in json_data
         assert len(json_data['UpdateStatuses']) == 1
         update_status_data = json_data['UpdateStatuses'][0]
@@ -46,8 +47,8 @@ def test_app_update_status__consecutive_updates():
             tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.applied)
             tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.confirmed, message='Application update successfully completed')
 
-        temp.seek(0)
-        json_data = json.load(temp)
+        with open(temp.name) as file:
+            json_data = json.load(file)
         assert 'UpdateStatuses' in json_data
         assert len(json_data['UpdateStatuses']) == 1
         update_status_data = json_data['UpdateStatuses'][0]
@@ -65,6 +66,7 @@ def test_app_update_status__update_rollback():
     with tempfile.NamedTemporaryFile() as temp:
         config = ConfigLoader()
         config.update_status_path = temp.name
+        config.update_status_journal_compact_on_exit = True
         
         app_name = 'my-app'
 
@@ -77,8 +79,8 @@ def test_app_update_status__update_rollback():
             tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.applied)
             tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.confirmed, message='Application update successfully completed')
 
-        temp.seek(0)
-        json_data = json.load(temp)
+        with open(temp.name) as file:
+            json_data = json.load(file)
         assert 'UpdateStatuses' in json_data
         assert len(json_data['UpdateStatuses']) == 1
         update_status_data = json_data['UpdateStatuses'][0]
@@ -98,8 +100,8 @@ def test_app_update_status__update_rollback():
             tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.invalidated)
             tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.rolled_back, message='Update rolled back due to application-level or external request')
 
-        temp.seek(0)
-        json_data = json.load(temp)
+        with open(temp.name) as file:
+            json_data = json.load(file)
         assert 'UpdateStatuses' in json_data
         assert len(json_data['UpdateStatuses']) == 1
         update_status_data = json_data['UpdateStatuses'][0]
@@ -111,4 +113,32 @@ def test_app_update_status__update_rollback():
         assert update_status_data['CompletionState'] == 'RolledBack'
         assert type(update_status_data['Status']) == bool
         assert update_status_data['Status'] == True
-        assert update_status_data['Message'] == 'Update rolled back due to application-level or external request'
\ No newline at end of file
+        assert update_status_data['Message'] == 'Update rolled back due to application-level or external request'
+def test_app_update_status__prefetch_followed_by_update_to_other_revision():
+    with tempfile.NamedTemporaryFile() as temp:
+        config = ConfigLoader()
+        config.update_status_path = temp.name
+        config.update_status_journal_compact_on_exit = True
+
+        app_name = 'my-app'
+
+        # App update prefetch
+
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status(app_name, revision='3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8', completion_state=UpdateCompletionState.initiated)
+            tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.downloaded, message='Application update prefetched')
+
+        # App update to other revision
+
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status(app_name, revision='46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd', completion_state=UpdateCompletionState.initiated)
+            tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.downloaded)
+
+        with open(temp.name) as file:
+            json_data = json.load(file)
+        assert len(json_data['UpdateStatuses']) == 1
+        update_status_data = json_data['UpdateStatuses'][0]
+        assert update_status_data['Revision'] == '46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd'
+        assert update_status_data['CompletionState'] == 'Downloaded'
+        assert update_status_data['Status'] == True
+        assert update_status_data['Message'] == ''
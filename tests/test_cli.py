@@ -0,0 +1,29 @@
+import pytest
+
+from fotahubclient.cli.cli import CLI
+from fotahubclient.cli.main import is_long_running_command
+import fotahubclient.cli.command_interpreter as commands
+
+def test_prefetch_commands_run_outside_daemon():
+    args = CLI().parse_args([commands.PREFETCH_APPLICATION_CMD, '-n', 'my-app', '-r', '46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd'])
+    assert args.name == 'my-app'
+    assert is_long_running_command(args)
+
+    args = CLI().parse_args([commands.PREFETCH_OPERATING_SYSTEM_CMD, '-r', '9a6d8c1cbbdfc9e6fef0b0c8ad9f9dd9b29e64e2dbbe2dc5b7b4b6b18e6a8c7a'])
+    assert is_long_running_command(args)
+
+def test_short_running_commands_run_in_daemon():
+    assert not is_long_running_command(CLI().parse_args([commands.READ_APPLICATION_LOGS_CMD, '-n', 'my-app']))
+    assert is_long_running_command(CLI().parse_args([commands.READ_APPLICATION_LOGS_CMD, '-n', 'my-app', '-f']))
+    assert not is_long_running_command(CLI().parse_args([commands.UPDATE_APPLICATION_CMD, '-n', 'my-app', '-r', '46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd']))
+
+def test_update_applications_manifest():
+    args = CLI().parse_args([commands.UPDATE_APPLICATIONS_CMD, '-m', 'my-app=46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd', 'other-app=3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8'])
+    assert dict(args.manifest) == {
+        'my-app': '46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd',
+        'other-app': '3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8'
+    }
+
+def test_update_applications_malformed_manifest():
+    with pytest.raises(SystemExit):
+        CLI().parse_args([commands.UPDATE_APPLICATIONS_CMD, '-m', 'my-app'])
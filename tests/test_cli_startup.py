@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import subprocess
+
+# Modules that are expensive to import and must only be loaded by commands that actually need them
+HEAVY_MODULE_PREFIXES = ('gi', 'pydbus')
+
+# Generous upper bound for cumulative import time of the CLI when running a command that reads JSON documents only
+CLI_IMPORT_TIME_BUDGET_US = 500000
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_cli_with_importtime(temp_dir, *args):
+    config_path = os.path.join(temp_dir, 'fotahub.conf')
+    with open(config_path, 'w') as file:
+        file.write('[General]\n')
+        file.write('DeployedArtifactsPath = {}\n'.format(os.path.join(temp_dir, 'deployed-artifacts.json')))
+        file.write('UpdateStatusPath = {}\n'.format(os.path.join(temp_dir, 'update-status.json')))
+        file.write('[App]\n')
+        file.write('AppOSTreeRepoPath = {}\n'.format(os.path.join(temp_dir, 'apps.ostree')))
+        file.write('AppDeployRoot = {}\n'.format(os.path.join(temp_dir, 'apps')))
+
+    # Point HOME to an empty directory so that no user configuration file gets in the way
+    env = dict(os.environ, HOME=temp_dir)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(PROJECT_ROOT, 'fotahub.py'), '-c', config_path] + list(args),
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    assert process.returncode == 0, process.stderr
+
+    # Lines look like 'import time: <self [us]> | <cumulative [us]> | <indented module name>'
+    imports = {}
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('imported package'):
+            fields = line[len('import time:'):].split('|')
+            if len(fields) == 3 and fields[1].strip().isdigit():
+                imports[fields[2].strip()] = int(fields[1].strip())
+    return [process.stdout, imports]
+
+def test_describe_update_status_does_not_import_heavy_modules():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [output, imports] = run_cli_with_importtime(temp_dir, 'describe-update-status')
+        assert '"UpdateStatuses": []' in output
+
+        heavy_modules = [name for name in imports if name.split('.')[0] in HEAVY_MODULE_PREFIXES]
+        assert not heavy_modules
+
+        for name in ['fotahubclient.os_updater', 'fotahubclient.app_manager', 'fotahubclient.ostree_repo']:
+            assert name not in imports
+
+def test_cli_import_time_within_budget():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [_, imports] = run_cli_with_importtime(temp_dir, 'describe-update-status')
+        assert imports['fotahubclient.cli.main'] < CLI_IMPORT_TIME_BUDGET_US
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import socket
+import tempfile
+import threading
+
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.json_document_models import UpdateCompletionState
+from fotahubclient.update_status_tracker import UpdateStatusTracker
+from fotahubclient.cli.command_interpreter import CommandInterpreter
+from fotahubclient.cli.command_client import CommandClient
+from fotahubclient.daemon.command_server import CommandServer
+
+def create_config(temp_dir):
+    config = ConfigLoader()
+    config.deployed_artifacts_path = os.path.join(temp_dir, 'deployed-artifacts.json')
+    config.update_status_path = os.path.join(temp_dir, 'update-status.json')
+    config.daemon_socket_path = os.path.join(temp_dir, 'run', 'fotahub.sock')
+    return config
+
+def start_server(config):
+    server = CommandServer(config, CommandInterpreter(config, cache_managers=True))
+    thread = threading.Thread(target=server.serve_forever, kwargs={ 'poll_interval': 0.05 })
+    thread.start()
+    return [server, thread]
+
+def stop_server(server, thread):
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+def run_command(config, args):
+    client = CommandClient(config.daemon_socket_path)
+    sock = client.connect()
+    assert sock is not None
+    return client.run(sock, args)
+
+def test_command_server__describe_update_status(capsys):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = create_config(temp_dir)
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status('my-app', revision='3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8', completion_state=UpdateCompletionState.confirmed)
+
+        [server, thread] = start_server(config)
+        try:
+            assert os.stat(config.daemon_socket_path).st_mode & 0o077 == 0
+
+            for _ in range(3):
+                assert run_command(config, ['describe-update-status', '-n', 'my-app']) == 0
+                json_data = json.loads(capsys.readouterr().out)
+                assert len(json_data['UpdateStatuses']) == 1
+                assert json_data['UpdateStatuses'][0]['CompletionState'] == 'Confirmed'
+        finally:
+            stop_server(server, thread)
+
+        assert not os.path.exists(config.daemon_socket_path)
+
+def test_command_server__errors(capsys):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = create_config(temp_dir)
+
+        [server, thread] = start_server(config)
+        try:
+            assert run_command(config, ['describe-update-status', '--no-such-option']) == 2
+            assert 'unrecognized arguments' in capsys.readouterr().err
+
+            assert run_command(config, ['describe-update-status', '-n', 'my-app']) == 0
+            assert json.loads(capsys.readouterr().out) == { 'UpdateStatuses': [] }
+        finally:
+            stop_server(server, thread)
+
+def test_command_client__no_daemon():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = create_config(temp_dir)
+        assert CommandClient(config.daemon_socket_path).connect() is None
+
+        # Leftover socket of a daemon that is no longer running
+        os.makedirs(os.path.dirname(config.daemon_socket_path))
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(config.daemon_socket_path)
+        sock.close()
+        assert CommandClient(config.daemon_socket_path).connect() is None
+
+        [server, thread] = start_server(config)
+        stop_server(server, thread)
+
+def test_command_server__working_dir(capsys):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = create_config(temp_dir)
+        working_dir = os.getcwd()
+
+        server = CommandServer(config, CommandInterpreter(config))
+        try:
+            # Relative paths are resolved against working directory of client while command is being executed
+            assert server.execute_command(['describe-update-status'], None, None, temp_dir) == 0
+            assert os.getcwd() == working_dir
+
+            assert server.execute_command(['describe-update-status'], None, None, os.path.join(temp_dir, 'missing')) == 1
+            assert os.getcwd() == working_dir
+        finally:
+            server.server_close()
+
+def test_command_server__client_config(capsys):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = create_config(temp_dir)
+
+        # Configuration of client refers to another update status file than that of the daemon
+        client_config_path = os.path.join(temp_dir, 'client.conf')
+        client_update_status_path = os.path.join(temp_dir, 'client-update-status.json')
+        with open(os.path.join(os.path.dirname(__file__), '..', 'fotahub.conf.sample')) as file:
+            sample_config = file.read()
+        with open(client_config_path, 'w') as file:
+            file.write(sample_config.replace('UpdateStatusPath = /var/log/fotahub/update-status.json', 'UpdateStatusPath = ' + client_update_status_path))
+
+        client_config = ConfigLoader(client_config_path)
+        client_config.load()
+        with UpdateStatusTracker(client_config) as tracker:
+            tracker.record_app_update_status('my-app', revision='3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8', completion_state=UpdateCompletionState.confirmed)
+
+        [server, thread] = start_server(config)
+        try:
+            client = CommandClient(config.daemon_socket_path)
+            assert client.run(client.connect(), ['-c', client_config_path, 'describe-update-status'], config_path=client_config_path) == 0
+            assert json.loads(capsys.readouterr().out)['UpdateStatuses'][0]['ArtifactName'] == 'my-app'
+
+            assert run_command(config, ['describe-update-status']) == 0
+            assert json.loads(capsys.readouterr().out) == { 'UpdateStatuses': [] }
+        finally:
+            stop_server(server, thread)
+
+def test_command_server__idle_garbage_collection(capsys):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = create_config(temp_dir)
+        config.gc_idle_delay = 0.2
+        config.gc_interval = 3600
+
+        [server, thread] = start_server(config)
+        gc_times = []
+        server.collect_garbage = lambda: gc_times.append(time.monotonic())
+        try:
+            for _ in range(3):
+                assert run_command(config, ['describe-update-status']) == 0
+                time.sleep(0.05)
+            assert not gc_times
+
+            # Collects garbage once after having been idle, and not again before garbage collection interval has elapsed
+            time.sleep(0.5)
+            assert len(gc_times) == 1
+            time.sleep(0.3)
+            assert len(gc_times) == 1
+        finally:
+            stop_server(server, thread)
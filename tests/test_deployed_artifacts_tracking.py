@@ -0,0 +1,47 @@
+import json
+import tempfile
+
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.json_document_models import LifecycleState
+from fotahubclient.deployed_artifacts_tracker import DeployedArtifactsTracker
+
+def test_deployed_artifacts__erase_and_reregister_apps():
+    with tempfile.NamedTemporaryFile() as temp:
+        config = ConfigLoader()
+        config.deployed_artifacts_path = temp.name
+
+        with DeployedArtifactsTracker(config) as tracker:
+            for app_name in ['app-a', 'app-b', 'app-c']:
+                tracker.register_app(app_name, app_name + '-revision-1')
+            tracker.register_fw('app-b', '1.0.0')
+
+        with DeployedArtifactsTracker(config) as tracker:
+            tracker.erase_app('app-b')
+            tracker.record_app_lifecycle_status_change('app-c', lifecycle_state=LifecycleState.running, message='Up and running')
+            tracker.register_app('app-b', 'app-b-revision-2')
+            tracker.erase_app('app-a')
+
+        with open(temp.name) as file:
+            json_data = json.load(file)
+        assert [[data['Name'], data['Kind'], data['DeployedRevision']] for data in json_data['DeployedArtifacts']] == [
+            ['app-c', 'Application', 'app-c-revision-1'],
+            ['app-b', 'Firmware', '1.0.0'],
+            ['app-b', 'Application', 'app-b-revision-2']
+        ]
+        assert json_data['DeployedArtifacts'][0]['LifecycleState'] == 'Running'
+        assert json_data['DeployedArtifacts'][0]['Message'] == 'Up and running'
+
+def test_deployed_artifacts__deployed_app_revision():
+    with tempfile.NamedTemporaryFile() as temp:
+        config = ConfigLoader()
+        config.deployed_artifacts_path = temp.name
+
+        with DeployedArtifactsTracker(config) as tracker:
+            tracker.register_app('app-a', 'app-a-revision-1')
+            tracker.register_fw('app-b', '1.0.0')
+
+        with DeployedArtifactsTracker(config) as tracker:
+            tracker.record_app_deployed_revision_change('app-a', 'app-a-revision-2')
+            assert tracker.get_app_deployed_revision('app-a') == 'app-a-revision-2'
+            assert tracker.get_app_deployed_revision('app-b') is None
+            assert tracker.get_app_deployed_revision('app-c') is None
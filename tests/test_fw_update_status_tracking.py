@@ -10,6 +10,7 @@ def test_fw_update_status__update_initiation():
     with tempfile.NamedTemporaryFile() as temp:
         config = ConfigLoader()
         config.update_status_path = temp.name
+        config.update_status_journal_compact_on_exit = True
         
         fw_name = 'my-firmware'
         fw_version = '1.0.0'
@@ -17,8 +18,8 @@ def test_fw_update_status__update_initiation():
         with UpdateStatusTracker(config) as tracker:
             tracker.record_fw_update_status(fw_name, revision=fw_version, completion_state=UpdateCompletionState.initiated)
 
-        temp.seek(0)
-        json_data = json.load(temp)
+        with open(temp.name) as file:
+            json_data = json.load(file)
         assert 'UpdateStatuses' in json_data
         assert len(json_data['UpdateStatuses']) == 1
         update_status_data = json_data['UpdateStatuses'][0]
@@ -0,0 +1,89 @@
+import json
+
+from fotahubclient.json_document_models import ArtifactKind, LifecycleState, UpdateCompletionState, DeployedArtifacts, DeployedArtifactsJSONDecoder, UpdateStatuses, UpdateStatusesJSONDecoder
+
+DEPLOYED_ARTIFACTS_DOCUMENT = '''{
+    "DeployedArtifacts": [
+        {
+            "Name": "fotahub-os-raspberrypi3",
+            "Kind": "OperatingSystem",
+            "DeployedRevision": "9a6d8c1cbbdfc9e6fef0b0c8ad9f9dd9b29e64e2dbbe2dc5b7b4b6b18e6a8c7a",
+            "RollbackRevision": "",
+            "LifecycleState": "Running",
+            "Status": true,
+            "Message": ""
+        },
+        {
+            "Name": "hello-world",
+            "Kind": "Application",
+            "DeployedRevision": "46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd",
+            "RollbackRevision": "3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8",
+            "LifecycleState": "Ready",
+            "Status": false,
+            "Message": "Failed to run 'hello-world' application: \\u00e4\\u00f6\\u00fc"
+        }
+    ]
+}'''
+
+UPDATE_STATUSES_DOCUMENT = '''{
+    "UpdateStatuses": [
+        {
+            "ArtifactName": "hello-world",
+            "ArtifactKind": "Application",
+            "Revision": "46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd",
+            "Timestamp": 1634477563,
+            "CompletionState": "RolledBack",
+            "Status": true,
+            "Message": "Update rolled back due to application-level or external request",
+            "DownloadDuration": 2.417,
+            "DownloadSize": 1843200,
+            "DownloadRate": 762597,
+            "VerificationDuration": 0.814,
+            "SelfTestDuration": 3.026
+        }
+    ]
+}'''
+
+LEGACY_UPDATE_STATUSES_DOCUMENT = '''{
+    "UpdateStatuses": [
+        {
+            "ArtifactName": "hello-world",
+            "ArtifactKind": "Application",
+            "Revision": "46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd",
+            "Timestamp": 1634477563,
+            "CompletionState": "Applied",
+            "Status": true,
+            "Message": ""
+        }
+    ]
+}'''
+
+def test_deployed_artifacts_round_trip():
+    deployed_artifacts = json.loads(DEPLOYED_ARTIFACTS_DOCUMENT, cls=DeployedArtifactsJSONDecoder)
+
+    assert type(deployed_artifacts) is DeployedArtifacts
+    assert deployed_artifacts.deployed_artifacts[0].kind is ArtifactKind.operating_system
+    assert deployed_artifacts.deployed_artifacts[0].rollback_revision == ''
+    assert deployed_artifacts.deployed_artifacts[1].lifecycle_state is LifecycleState.ready
+    assert deployed_artifacts.deployed_artifacts[1].status is False
+    assert deployed_artifacts.serialize() == DEPLOYED_ARTIFACTS_DOCUMENT
+
+def test_update_statuses_round_trip():
+    update_statuses = json.loads(UPDATE_STATUSES_DOCUMENT, cls=UpdateStatusesJSONDecoder)
+
+    assert type(update_statuses) is UpdateStatuses
+    assert update_statuses.update_statuses[0].artifact_kind is ArtifactKind.application
+    assert update_statuses.update_statuses[0].completion_state is UpdateCompletionState.rolled_back
+    assert update_statuses.serialize() == UPDATE_STATUSES_DOCUMENT
+    assert update_statuses.update_statuses[0].download_size == 1843200
+
+def test_update_statuses_without_download_info():
+    update_statuses = json.loads(LEGACY_UPDATE_STATUSES_DOCUMENT, cls=UpdateStatusesJSONDecoder)
+
+    assert update_statuses.update_statuses[0].download_duration is None
+    assert update_statuses.update_statuses[0].download_size is None
+    assert update_statuses.update_statuses[0].download_rate is None
+    assert update_statuses.update_statuses[0].verification_duration is None
+    assert update_statuses.update_statuses[0].self_test_duration is None
+    assert update_statuses.update_statuses[0].rollback_duration is None
+    assert update_statuses.serialize() == LEGACY_UPDATE_STATUSES_DOCUMENT
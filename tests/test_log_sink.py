@@ -0,0 +1,86 @@
+import os
+import gzip
+
+import pytest
+
+from fotahubclient.log_sink import RotatingLogSink, list_log_backups, read_last_log_lines
+from fotahubclient.system_helper import read_last_lines_of_bytes
+from fotahubclient.file_watcher import FileTail
+
+def write_lines(sink, count, width=20):
+    data = b''
+    for i in range(count):
+        line = '{:04d} {}\n'.format(i, 'x' * (width - 6)).encode()
+        sink.write(line)
+        data += line
+    return data
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_rotating_log_sink__caps_size_and_number_of_logs(tmp_path, compress):
+    path = str(tmp_path / 'log.out')
+    sink = RotatingLogSink(path, max_size=100, max_backups=2, compress=compress)
+    write_lines(sink, 50)
+    sink.close()
+
+    backups = list_log_backups(path)
+    assert backups == [path + '.1' + ('.gz' if compress else ''), path + '.2' + ('.gz' if compress else '')]
+    assert os.path.getsize(path) <= 100
+    if compress:
+        with gzip.open(backups[0], 'rb') as file:
+            assert len(file.read()) == 100
+    else:
+        assert os.path.getsize(backups[0]) == 100
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_read_last_log_lines__across_rotated_logs(tmp_path, compress):
+    path = str(tmp_path / 'log.out')
+
+    # Lines exceeding the size limit on their own get split across rotated logs
+    sink = RotatingLogSink(path, max_size=100, max_backups=10, compress=compress)
+    data = write_lines(sink, 5, width=30)
+    data += write_lines(sink, 1, width=250)
+    data += write_lines(sink, 5, width=30)
+    sink.close()
+    assert len(list_log_backups(path)) > 2
+
+    for max_lines in range(0, 25):
+        assert read_last_log_lines(path, max_lines) == read_last_lines_of_bytes(data, max_lines)
+
+def test_read_last_log_lines__reads_rotated_logs_only_when_needed(tmp_path):
+    path = str(tmp_path / 'log.out')
+    sink = RotatingLogSink(path, max_size=100, max_backups=2, compress=True)
+    data = write_lines(sink, 8)
+    sink.close()
+
+    # Last lines are all in the current log, corrupting the rotated ones must not matter
+    for backup in list_log_backups(path):
+        with open(backup, 'wb') as file:
+            file.write(b'not gzip')
+    assert read_last_log_lines(path, 2) == read_last_lines_of_bytes(data, 2)
+
+def test_rotating_log_sink__starts_over_with_empty_logs(tmp_path):
+    path = str(tmp_path / 'log.out')
+    sink = RotatingLogSink(path, max_size=100, max_backups=2)
+    write_lines(sink, 50)
+    sink.close()
+
+    RotatingLogSink(path, max_size=100, max_backups=2).close()
+    assert list_log_backups(path) == []
+    assert os.path.getsize(path) == 0
+
+def test_file_tail__reads_across_rotated_logs(tmp_path):
+    path = str(tmp_path / 'log.out')
+    sink = RotatingLogSink(path, max_size=100, max_backups=2)
+    tail = FileTail(path)
+    try:
+        text = ''
+        data = b''
+        for _ in range(5):
+            # Log gets rotated while tail has not yet read all of it
+            data += write_lines(sink, 3)
+            text += tail.read_lines()
+        assert len(list_log_backups(path)) == 2
+        assert text == data.decode()
+    finally:
+        tail.close()
+        sink.close()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+import fotahubclient.os_status_snapshot as os_status_snapshot
+from fotahubclient.os_status_snapshot import OSStatusSnapshot
+
+DEPLOYED_REVISION = '9a6d8c1cbbdfc9e6fef0b0c8ad9f9dd9b29e64e2dbbe2dc5b7b4b6b18e6a8c7a'
+ROLLBACK_REVISION = '3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8'
+OS_DISTRO_NAME = 'fotahub-os-raspberrypi3'
+
+def create_sysroot(root_path):
+    os.makedirs(os.path.join(root_path, 'ostree', 'deploy', OS_DISTRO_NAME, 'deploy'))
+    os.makedirs(os.path.join(root_path, 'boot'))
+    os.symlink('loader.0', os.path.join(root_path, 'boot', 'loader'))
+    os.makedirs(os.path.join(root_path, 'proc', 'sys', 'kernel', 'random'))
+    with open(os.path.join(root_path, 'proc', 'sys', 'kernel', 'random', 'boot_id'), 'w') as file:
+        file.write('6c5a2f3e-7f1a-4b9e-9d6a-2b8e0f4c1d7a\n')
+
+def test_os_status_snapshot(monkeypatch):
+    reads = []
+    def read_os_revisions():
+        reads.append(True)
+        return [DEPLOYED_REVISION, ROLLBACK_REVISION]
+    monkeypatch.setattr(os_status_snapshot, '_read_os_revisions', read_os_revisions)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        create_sysroot(temp_dir)
+        snapshot = OSStatusSnapshot(os.path.join(temp_dir, 'run', 'os-status.json'), OS_DISTRO_NAME, temp_dir)
+
+        assert snapshot.get_os_revisions() == [DEPLOYED_REVISION, ROLLBACK_REVISION]
+        assert snapshot.get_os_revisions() == [DEPLOYED_REVISION, ROLLBACK_REVISION]
+        assert len(reads) == 1
+
+        # Unrelated change in the OSTree deploy directory
+        os.makedirs(os.path.join(temp_dir, 'ostree', 'deploy', 'other-os'))
+        snapshot.get_os_revisions()
+        assert len(reads) == 1
+
+        # New deployment written
+        deploy_path = os.path.join(temp_dir, 'ostree', 'deploy', OS_DISTRO_NAME, 'deploy')
+        os.makedirs(os.path.join(deploy_path, DEPLOYED_REVISION + '.0'))
+        stat = os.stat(deploy_path)
+        os.utime(deploy_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        snapshot.get_os_revisions()
+        assert len(reads) == 2
+
+        # Boot version swapped
+        os.remove(os.path.join(temp_dir, 'boot', 'loader'))
+        os.symlink('loader.1', os.path.join(temp_dir, 'boot', 'loader'))
+        snapshot.get_os_revisions()
+        assert len(reads) == 3
+
+        # System rebooted
+        with open(os.path.join(temp_dir, 'proc', 'sys', 'kernel', 'random', 'boot_id'), 'w') as file:
+            file.write('0e4b7c1d-2a3f-4e5d-8c9b-7a6f5e4d3c2b\n')
+        snapshot.get_os_revisions()
+        snapshot.get_os_revisions()
+        assert len(reads) == 4
+
+def test_os_status_snapshot_disabled(monkeypatch):
+    reads = []
+    def read_os_revisions():
+        reads.append(True)
+        return [DEPLOYED_REVISION, None]
+    monkeypatch.setattr(os_status_snapshot, '_read_os_revisions', read_os_revisions)
+
+    snapshot = OSStatusSnapshot(None, OS_DISTRO_NAME)
+    assert snapshot.get_os_revisions() == [DEPLOYED_REVISION, None]
+    assert snapshot.get_os_revisions() == [DEPLOYED_REVISION, None]
+    assert len(reads) == 2
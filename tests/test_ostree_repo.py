@@ -0,0 +1,249 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+
+gi = pytest.importorskip('gi')
+try:
+    gi.require_version('OSTree', '1.0')
+except ValueError:
+    pytest.skip('OSTree typelib not available', allow_module_level=True)
+if shutil.which('ostree') is None:
+    pytest.skip('ostree command not available', allow_module_level=True)
+
+from gi.repository import OSTree, Gio
+
+from fotahubclient.ostree_repo import OSTreeRepo, OSTreeError
+from fotahubclient.app_updater import AppUpdater
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.garbage_collector import GarbageCollector
+from fotahubclient.json_document_models import UpdateCompletionState
+from fotahubclient.update_status_tracker import UpdateStatusTracker
+import fotahubclient.common_constants as constants
+
+REMOTE_NAME = 'fotahub'
+BRANCH_NAME = 'my-app'
+
+def ostree(*args):
+    return subprocess.run(['ostree'] + list(args), check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+
+def create_source_repo(temp_dir):
+    source_repo_path = os.path.join(temp_dir, 'source-repo')
+    ostree('init', '--repo=' + source_repo_path, '--mode=archive')
+
+    tree_path = os.path.join(temp_dir, 'tree')
+    os.makedirs(tree_path)
+    with open(os.path.join(tree_path, 'hello.txt'), 'w') as file:
+        file.write('Hello World!\n')
+    revision = ostree('commit', '--repo=' + source_repo_path, '--branch=' + BRANCH_NAME, '--subject=Hello World', tree_path)
+    return [source_repo_path, revision]
+
+def commit_tree(source_repo_path, tree_path, files):
+    shutil.rmtree(tree_path, ignore_errors=True)
+    for path, content in files.items():
+        os.makedirs(os.path.dirname(os.path.join(tree_path, path)), exist_ok=True)
+        with open(os.path.join(tree_path, path), 'w') as file:
+            file.write(content)
+    return ostree('commit', '--repo=' + source_repo_path, '--branch=' + BRANCH_NAME, '--subject=Update', tree_path)
+
+def read_tree(root_path):
+    files = {}
+    for dir_path, _, file_names in os.walk(root_path):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            with open(path) as file:
+                files[os.path.relpath(path, root_path)] = file.read()
+    return files
+
+def open_target_repo(temp_dir):
+    target_repo_path = os.path.join(temp_dir, 'target-repo')
+    ostree('init', '--repo=' + target_repo_path, '--mode=bare-user')
+
+    repo = OSTree.Repo.new(Gio.File.new_for_path(target_repo_path))
+    repo.open(None)
+    ostree_repo = OSTreeRepo(repo)
+    # Remote is never contacted, updates are taken from local sources only
+    ostree_repo.add_ostree_remote(REMOTE_NAME, 'https://localhost.invalid', False)
+    return ostree_repo
+
+def test_pull_from_local_repo():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, revision] = create_source_repo(temp_dir)
+        ostree_repo = open_target_repo(temp_dir)
+
+        pull_progress = ostree_repo.pull_ostree_revision(REMOTE_NAME, BRANCH_NAME, revision, 0, source=source_repo_path)
+
+        assert pull_progress.is_finished()
+        assert ostree_repo.has_ostree_revision(revision)
+        assert ostree_repo.resolve_ostree_revision(REMOTE_NAME, BRANCH_NAME) == revision
+
+def test_prefetch_from_local_repo_leaves_ref_untouched():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, revision] = create_source_repo(temp_dir)
+        ostree_repo = open_target_repo(temp_dir)
+
+        ostree_repo.pull_ostree_revision(REMOTE_NAME, BRANCH_NAME, revision, 0, update_ref=False, source=source_repo_path)
+
+        assert ostree_repo.has_ostree_revision(revision)
+        assert BRANCH_NAME not in [ref.split(':')[-1] for ref in ostree_repo.list_ostree_refs().keys()]
+
+def test_import_static_delta_file():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, revision] = create_source_repo(temp_dir)
+        delta_path = os.path.join(temp_dir, 'update.delta')
+        ostree('static-delta', 'generate', '--repo=' + source_repo_path, '--empty', '--inline', '--min-fallback-size=0', '--filename=' + delta_path, revision)
+        ostree_repo = open_target_repo(temp_dir)
+
+        pull_progress = ostree_repo.pull_ostree_revision(REMOTE_NAME, BRANCH_NAME, revision, 0, source=delta_path)
+
+        assert pull_progress.bytes_transferred == os.path.getsize(delta_path)
+        assert ostree_repo.has_ostree_revision(revision)
+        assert ostree_repo.resolve_ostree_revision(REMOTE_NAME, BRANCH_NAME) == revision
+
+def test_missing_source():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        ostree_repo = open_target_repo(temp_dir)
+
+        with pytest.raises(OSTreeError):
+            ostree_repo.pull_ostree_revision(REMOTE_NAME, BRANCH_NAME, '0' * 64, 0, source=os.path.join(temp_dir, 'missing'))
+
+def test_prune_unreferenced_revisions():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, revision] = create_source_repo(temp_dir)
+        ostree_repo = open_target_repo(temp_dir)
+        ostree_repo.pull_ostree_revision(REMOTE_NAME, BRANCH_NAME, revision, 0, update_ref=False, source=source_repo_path)
+
+        # Retained through dedicated ref
+        ostree_repo.set_ostree_ref(None, 'fotahub/retained/' + revision, revision)
+        [_, objects_pruned, _] = ostree_repo.prune_ostree_repo(0)
+        assert objects_pruned == 0
+        assert ostree_repo.has_ostree_revision(revision)
+
+        ostree_repo.set_ostree_ref(None, 'fotahub/retained/' + revision, None)
+        [_, objects_pruned, reclaimed_bytes] = ostree_repo.prune_ostree_repo(0)
+        assert objects_pruned > 0
+        assert reclaimed_bytes > 0
+        assert not ostree_repo.has_ostree_revision(revision)
+
+def test_retain_prefetched_os_revision():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, revision] = create_source_repo(temp_dir)
+        ostree_repo = open_target_repo(temp_dir)
+        ostree_repo.pull_ostree_revision(REMOTE_NAME, BRANCH_NAME, revision, 0, update_ref=False, source=source_repo_path)
+
+        config = ConfigLoader()
+        config.update_status_path = os.path.join(temp_dir, 'update-status.json')
+        collector = GarbageCollector(config)
+
+        # Prefetched but not yet applied
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_os_update_status(revision=revision, completion_state=UpdateCompletionState.initiated)
+            tracker.record_os_update_status(completion_state=UpdateCompletionState.downloaded)
+        assert collector.get_retained_os_revisions() == set([revision])
+        ostree_repo.retain_ostree_revisions(constants.OS_RETAINED_REF_PREFIX, collector.get_retained_os_revisions())
+        [_, objects_pruned, _] = ostree_repo.prune_ostree_repo(0)
+        assert objects_pruned == 0
+        assert ostree_repo.has_ostree_revision(revision)
+
+        # Applied and discarded later on
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_os_update_status(completion_state=UpdateCompletionState.applied)
+        assert collector.get_retained_os_revisions() == set()
+        ostree_repo.retain_ostree_revisions(constants.OS_RETAINED_REF_PREFIX, collector.get_retained_os_revisions())
+        assert constants.OS_RETAINED_REF_PREFIX + revision not in ostree_repo.list_ostree_refs()
+        [_, objects_pruned, _] = ostree_repo.prune_ostree_repo(0)
+        assert objects_pruned > 0
+        assert not ostree_repo.has_ostree_revision(revision)
+
+def test_verify_revision():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, revision] = create_source_repo(temp_dir)
+        ostree_repo = open_target_repo(temp_dir)
+        ostree_repo.pull_ostree_revision(REMOTE_NAME, BRANCH_NAME, revision, 0, source=source_repo_path)
+
+        assert ostree_repo.verify_ostree_revision(REMOTE_NAME, revision, 4) > 0
+
+        # Damage content of file object
+        objects_path = os.path.join(temp_dir, 'target-repo', 'objects')
+        for dir_path, _, file_names in os.walk(objects_path):
+            for file_name in file_names:
+                if file_name.endswith('.file'):
+                    path = os.path.join(dir_path, file_name)
+                    os.chmod(path, 0o644)
+                    with open(path, 'w') as file:
+                        file.write('Hello Mars!\n')
+
+        with pytest.raises(OSTreeError):
+            ostree_repo.verify_ostree_revision(REMOTE_NAME, revision, 4)
+
+def test_checkout_single_paths():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, _] = create_source_repo(temp_dir)
+        revision = commit_tree(source_repo_path, os.path.join(temp_dir, 'tree'), { 'hello.txt': 'Hello World!\n', 'dir/sub/file.txt': 'Nested\n' })
+        ostree_repo = open_target_repo(temp_dir)
+        ostree_repo.pull_ostree_revision(REMOTE_NAME, BRANCH_NAME, revision, 0, source=source_repo_path)
+
+        checkout_path = os.path.join(temp_dir, 'checkout')
+        os.mkdir(checkout_path)
+        ostree_repo.checkout_path_at(revision, '/hello.txt', os.path.join(checkout_path, 'hello.txt'))
+        ostree_repo.checkout_path_at(revision, '/dir', os.path.join(checkout_path, 'dir'))
+
+        assert os.path.isfile(os.path.join(checkout_path, 'hello.txt'))
+        assert read_tree(checkout_path) == { 'hello.txt': 'Hello World!\n', 'dir/sub/file.txt': 'Nested\n' }
+
+def test_delta_checkout():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, _] = create_source_repo(temp_dir)
+        tree_path = os.path.join(temp_dir, 'tree')
+        files_v1 = {
+            'hello.txt': 'Hello World!\n',
+            'unchanged.txt': 'Unchanged\n',
+            'removed.txt': 'Removed\n',
+            'removed-dir/file.txt': 'Removed\n',
+            'dir/file.txt': 'Unchanged\n'
+        }
+        files_v2 = {
+            'hello.txt': 'Hello Mars!\n',
+            'unchanged.txt': 'Unchanged\n',
+            'added.txt': 'Added\n',
+            'added-dir/sub/file.txt': 'Added\n',
+            'added-dir/file.txt': 'Added\n',
+            'dir/file.txt': 'Unchanged\n',
+            'dir/added.txt': 'Added\n'
+        }
+        revision_v1 = commit_tree(source_repo_path, tree_path, files_v1)
+        revision_v2 = commit_tree(source_repo_path, tree_path, files_v2)
+        open_target_repo(temp_dir)
+
+        updater = AppUpdater(os.path.join(temp_dir, 'target-repo'), False, delta_checkout=True)
+        checkout_path = os.path.join(temp_dir, 'my-app')
+        updater.ostree_repo.pull_ostree_revision(updater.remote_name, BRANCH_NAME, revision_v1, 0, source=source_repo_path)
+        updater.checkout_app_revision(BRANCH_NAME, revision_v1, checkout_path)
+        unchanged_inode = os.stat(os.path.join(checkout_path, 'unchanged.txt')).st_ino
+
+        updater.ostree_repo.pull_ostree_revision(updater.remote_name, BRANCH_NAME, revision_v2, 0, source=source_repo_path)
+        updater.checkout_app_revision(BRANCH_NAME, revision_v2, checkout_path)
+
+        assert updater.get_deployed_app_revision(checkout_path) == revision_v2
+        files = read_tree(checkout_path)
+        del files[constants.APP_REVISION_STAMP_FILE_NAME]
+        assert files == files_v2
+
+        # Unchanged files are left in place rather than falling back to a full checkout
+        assert os.stat(os.path.join(checkout_path, 'unchanged.txt')).st_ino == unchanged_inode
+
+def test_diff_revisions():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        [source_repo_path, _] = create_source_repo(temp_dir)
+        tree_path = os.path.join(temp_dir, 'tree')
+        revision_v1 = commit_tree(source_repo_path, tree_path, { 'hello.txt': 'Hello World!\n', 'removed.txt': 'Removed\n', 'dir/file.txt': 'Unchanged\n' })
+        revision_v2 = commit_tree(source_repo_path, tree_path, { 'hello.txt': 'Hello Mars!\n', 'added-dir/file.txt': 'Added\n', 'dir/file.txt': 'Unchanged\n' })
+        ostree_repo = open_target_repo(temp_dir)
+        ostree_repo.pull_ostree_revisions(REMOTE_NAME, { BRANCH_NAME: revision_v1, BRANCH_NAME + '-v2': revision_v2 }, 0, source=source_repo_path)
+
+        [modified, removed, added] = ostree_repo.diff_ostree_revisions(revision_v1, revision_v2)
+        assert modified == ['/hello.txt']
+        assert removed == ['/removed.txt']
+        assert sorted(added) == ['/added-dir', '/added-dir/file.txt']
@@ -0,0 +1,97 @@
+import json
+import tempfile
+import os
+
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.json_document_models import UpdateCompletionState
+from fotahubclient.pull_progress import PullProgress, PullProgressFileWriter
+from fotahubclient.update_status_tracker import UpdateStatusTracker
+
+class FakeAsyncProgress(object):
+
+    def __init__(self, status='Receiving objects', bytes_transferred=0, fetched=0, requested=0):
+        self.status = status
+        self.values = {
+            'bytes-transferred': bytes_transferred,
+            'fetched': fetched,
+            'requested': requested,
+            'metadata-fetched': 1,
+            'outstanding-fetches': requested - fetched,
+            'fetched-delta-parts': 0,
+            'total-delta-parts': 0,
+            'total-delta-part-size': 0
+        }
+
+    def get_status(self):
+        return self.status
+
+    def get_uint(self, key):
+        return self.values[key]
+
+    def get_uint64(self, key):
+        return self.values[key]
+
+def test_pull_progress_statistics():
+    pull_progress = PullProgress()
+    pull_progress.start()
+    pull_progress.update(FakeAsyncProgress(bytes_transferred=1024, fetched=3, requested=10))
+    pull_progress.update(FakeAsyncProgress(bytes_transferred=4096, fetched=10, requested=10))
+    pull_progress.finish()
+
+    statistics = pull_progress.get_statistics()
+    assert pull_progress.is_finished()
+    assert statistics['bytes_transferred'] == 4096
+    assert statistics['fetched_objects'] == 10
+    assert statistics['outstanding_fetches'] == 0
+    assert statistics['duration'] >= 0
+    assert pull_progress.get_rate() >= 0
+
+def test_pull_progress_reports_are_throttled():
+    reports = []
+    pull_progress = PullProgress(lambda progress: reports.append(progress.bytes_transferred), report_interval=3600)
+    pull_progress.start()
+    for index in range(1, 11):
+        pull_progress.update(FakeAsyncProgress(bytes_transferred=index * 100))
+    pull_progress.finish()
+
+    # First update and completion get reported, everything in between falls into the report interval
+    assert reports == [100, 1000]
+
+def test_pull_progress_file_writer():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'pull-progress.json')
+        pull_progress = PullProgress(PullProgressFileWriter(path, 'my-app'))
+        pull_progress.start()
+        pull_progress.update(FakeAsyncProgress(bytes_transferred=2048, fetched=5, requested=5))
+        pull_progress.finish()
+
+        with open(path) as file:
+            json_data = json.load(file)
+        assert json_data['ArtifactName'] == 'my-app'
+        assert json_data['BytesTransferred'] == 2048
+        assert json_data['FetchedObjects'] == 5
+        assert json_data['Finished'] == True
+
+def test_download_info_recorded_in_update_status():
+    with tempfile.NamedTemporaryFile() as temp:
+        config = ConfigLoader()
+        config.update_status_path = temp.name
+        config.update_status_journal_compact_on_exit = True
+
+        pull_progress = PullProgress()
+        pull_progress.start()
+        pull_progress.update(FakeAsyncProgress(bytes_transferred=8192))
+        pull_progress.finish()
+
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status('my-app', revision='46a89ce4ecbcd0c8f53f34e53c6fd4736ec21019487ee9525933596d2be72fbd', completion_state=UpdateCompletionState.initiated)
+            tracker.record_app_update_status('my-app', completion_state=UpdateCompletionState.downloaded, pull_progress=pull_progress)
+            tracker.record_app_update_status('my-app', completion_state=UpdateCompletionState.applied)
+
+        with open(temp.name) as file:
+            json_data = json.load(file)
+        update_status_data = json_data['UpdateStatuses'][0]
+        assert update_status_data['CompletionState'] == 'Applied'
+        assert update_status_data['DownloadSize'] == 8192
+        assert type(update_status_data['DownloadDuration']) == float
+        assert type(update_status_data['DownloadRate']) == int
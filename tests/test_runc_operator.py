@@ -0,0 +1,218 @@
+import os
+import stat
+import time
+import threading
+
+import pytest
+
+from fotahubclient.runc_operator import RunCOperator, RunCError, ContainerState
+
+def install_fake_runc(bin_dir, list_output, invocations_path):
+    runc_path = os.path.join(bin_dir, 'runc')
+    with open(runc_path, 'w') as file:
+        file.write("#!/bin/bash\necho \"$@\" >> '{}'\necho '{}'\n".format(invocations_path, list_output))
+    os.chmod(runc_path, os.stat(runc_path).st_mode | stat.S_IEXEC)
+
+def count_lines(path):
+    with open(path) as file:
+        return len(file.readlines())
+
+def test_list_container_states(tmp_path, monkeypatch):
+    install_fake_runc(str(tmp_path), '[{"id": "app-a", "status": "running"}, {"id": "app-b", "status": "created"}]', str(tmp_path / 'invocations'))
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    assert RunCOperator().list_container_states() == { 'app-a': ContainerState.running, 'app-b': ContainerState.created }
+
+def test_list_container_states__no_containers(tmp_path, monkeypatch):
+    install_fake_runc(str(tmp_path), 'null', str(tmp_path / 'invocations'))
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    assert RunCOperator().list_container_states() == {}
+
+def test_container_states_snapshot_is_reused(tmp_path, monkeypatch):
+    invocations_path = str(tmp_path / 'invocations')
+    install_fake_runc(str(tmp_path), '[{"id": "app-a", "status": "running"}]', invocations_path)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    runc = RunCOperator(snapshot_max_age=60)
+    for _ in range(10):
+        assert runc.get_container_state('app-a', from_snapshot=True) == ContainerState.running
+        assert runc.get_container_state('app-b', from_snapshot=True) is None
+    assert count_lines(invocations_path) == 1
+
+    runc.invalidate_container_states_snapshot()
+    runc.get_container_state('app-a', from_snapshot=True)
+    assert count_lines(invocations_path) == 2
+
+def install_stoppable_fake_runc(bin_dir, exit_signal):
+    runc_path = os.path.join(bin_dir, 'runc')
+    with open(runc_path, 'w') as file:
+        file.write('''#!/bin/bash
+state_dir='{0}'
+case "$1" in
+    state)
+        if [ -f "$state_dir/stopped" ]; then
+            echo '{{"id": "'$2'", "status": "stopped", "pid": 0}}'
+        else
+            echo '{{"id": "'$2'", "status": "running", "pid": 0}}'
+        fi
+        ;;
+    kill)
+        echo "$3" >> "$state_dir/signals"
+        if [ "$3" == "{1}" ]; then
+            touch "$state_dir/stopped"
+        fi
+        ;;
+esac
+'''.format(bin_dir, exit_signal))
+    os.chmod(runc_path, os.stat(runc_path).st_mode | stat.S_IEXEC)
+
+def read_signals(bin_dir):
+    with open(os.path.join(bin_dir, 'signals')) as file:
+        return file.read().split()
+
+def test_stop_container__terminates_gracefully(tmp_path, monkeypatch):
+    install_stoppable_fake_runc(str(tmp_path), 'TERM')
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    RunCOperator(stop_grace_period=5, stop_timeout=5).stop_container('app-a')
+    assert read_signals(str(tmp_path)) == ['TERM']
+
+def test_stop_container__killed_after_grace_period(tmp_path, monkeypatch):
+    install_stoppable_fake_runc(str(tmp_path), 'KILL')
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    RunCOperator(stop_grace_period=0.1, stop_timeout=5).stop_container('app-a')
+    assert read_signals(str(tmp_path)) == ['TERM', 'KILL']
+
+def test_stop_container__times_out(tmp_path, monkeypatch):
+    install_stoppable_fake_runc(str(tmp_path), 'NONE')
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    with pytest.raises(RunCError):
+        RunCOperator(stop_grace_period=0, stop_timeout=0.2).stop_container('app-a')
+    assert read_signals(str(tmp_path)) == ['KILL']
+
+def test_run_container__starts_created_container(tmp_path, monkeypatch):
+    invocations_path = str(tmp_path / 'invocations')
+    runc_path = str(tmp_path / 'runc')
+    with open(runc_path, 'w') as file:
+        file.write('''#!/bin/bash
+echo "$@" >> '{0}'
+case "$1" in
+    state)
+        if grep -q '^start' '{0}'; then
+            echo '{{"id": "'$2'", "status": "running", "pid": 0}}'
+        else
+            echo '{{"id": "'$2'", "status": "created", "pid": 0}}'
+        fi
+        ;;
+esac
+'''.format(invocations_path))
+    os.chmod(runc_path, os.stat(runc_path).st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    bundle_path = tmp_path / 'bundle'
+    bundle_path.mkdir()
+    assert RunCOperator().run_container('app-a', str(bundle_path)) == [ContainerState.running, '']
+    with open(invocations_path) as file:
+        assert [line.split()[0] for line in file] == ['state', 'start', 'state']
+
+def test_follow_container_logs(tmp_path, monkeypatch):
+    install_stoppable_fake_runc(str(tmp_path), 'TERM')
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    bundle_path = tmp_path / 'app-a'
+    bundle_path.mkdir()
+    with open(str(bundle_path / 'log.out'), 'w') as file:
+        file.write('Logged before\n')
+
+    def write_logs():
+        with open(str(bundle_path / 'log.out'), 'a') as file:
+            for i in range(3):
+                file.write('Line {}\n'.format(i))
+                file.flush()
+                time.sleep(0.05)
+            file.write('Last line without line break')
+        with open(str(bundle_path / 'log.err'), 'w') as file:
+            file.write('Some error\n')
+        (tmp_path / 'stopped').touch()
+
+    follower = RunCOperator().follow_container_logs('app-a', str(bundle_path), state_check_interval=0.1)
+    writer = threading.Thread(target=write_logs)
+    writer.start()
+    try:
+        logs = list(follower)
+    finally:
+        writer.join()
+
+    # Standard output and error are followed separately, only complete lines get yielded until container has exited
+    assert 'Some error\n' in logs
+    logs.remove('Some error\n')
+    assert ''.join(logs) == 'Line 0\nLine 1\nLine 2\nLast line without line break'
+    assert all(text.endswith('\n') for text in logs[:-1])
+
+def test_follow_container_logs__from_where_following_has_been_requested(tmp_path, monkeypatch):
+    install_stoppable_fake_runc(str(tmp_path), 'TERM')
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    bundle_path = tmp_path / 'app-a'
+    bundle_path.mkdir()
+    with open(str(bundle_path / 'log.out'), 'w') as file:
+        file.write('Logged before\n')
+
+    # Lines logged while the last lines are being read are followed even though iterating starts only afterwards
+    runc = RunCOperator()
+    follower = runc.follow_container_logs('app-a', str(bundle_path), state_check_interval=0.1)
+    with open(str(bundle_path / 'log.out'), 'a') as file:
+        file.write('Logged in between\n')
+    assert runc.read_container_logs(str(bundle_path), 1) == 'Logged in between'
+    (tmp_path / 'stopped').touch()
+
+    assert ''.join(follower) == 'Logged in between\n'
+
+def install_logging_fake_runc(bin_dir, line_count, fail=False):
+    runc_path = os.path.join(bin_dir, 'runc')
+    with open(runc_path, 'w') as file:
+        file.write('''#!/bin/bash
+case "$1" in
+    state)
+        exit 1
+        ;;
+    run)
+        if [ "{1}" == "True" ]; then
+            echo "Container cannot be run" >&2
+            exit 1
+        fi
+        # Container keeps writing to inherited output streams after runc has returned
+        (for i in $(seq 1 {0}); do echo "Line $i"; done; echo "Done" >&2) &
+        ;;
+esac
+'''.format(line_count, fail))
+    os.chmod(runc_path, os.stat(runc_path).st_mode | stat.S_IEXEC)
+
+def test_run_container__with_rotating_logs(tmp_path, monkeypatch):
+    install_logging_fake_runc(str(tmp_path), 500)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    bundle_path = tmp_path / 'bundle'
+    bundle_path.mkdir()
+    runc = RunCOperator(log_max_size=1000, log_max_backups=2)
+    runc.run_container('app-a', str(bundle_path))
+
+    deadline = time.monotonic() + 10
+    while runc.read_container_logs(str(bundle_path), 3) != 'Line 499\nLine 500\nDone' and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert runc.read_container_logs(str(bundle_path), 3) == 'Line 499\nLine 500\nDone'
+
+    assert os.path.getsize(str(bundle_path / 'log.out')) <= 1000
+    assert sorted(os.listdir(str(bundle_path))) == ['log.err', 'log.out', 'log.out.1', 'log.out.2']
+
+def test_run_container__with_rotating_logs_fails(tmp_path, monkeypatch):
+    install_logging_fake_runc(str(tmp_path), 0, fail=True)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ['PATH'])
+
+    bundle_path = tmp_path / 'bundle'
+    bundle_path.mkdir()
+    with pytest.raises(RunCError, match='Container cannot be run'):
+        RunCOperator(log_max_size=1000, log_max_backups=2).run_container('app-a', str(bundle_path))
@@ -1,4 +1,10 @@
-from fotahubclient.system_helper import run_command
+import os
+import random
+import resource
+
+import pytest
+
+from fotahubclient.system_helper import run_command, chowntree, write_file_atomically, read_last_lines
 
 def test_run_simple_bash_command():
     assert run_command('Hello command', "bash -c 'echo \"Hello\"'") == [True, 'Hello command succeeded: Hello']
@@ -7,4 +13,124 @@ def test_run_bash_command_with_arg():
     assert run_command('OS update verification', "bash -c 'echo \"The downloaded OS update (revision $1) looks good!\"'", '123456789') == [True, 'OS update verification succeeded: The downloaded OS update (revision 123456789) looks good!'] 
 
 def test_run_failing_bash_command():
-    assert run_command('Failing command', "bash -c 'echo \"You have screwed it up!\"; false'") == [False, 'Failing command failed: You have screwed it up!']
\ No newline at end of file
+    assert run_command('Failing command', "bash -c 'echo \"You have screwed it up!\"; false'") == [False, 'Failing command failed: You have screwed it up!']
+
+def create_tree(root, breadth, depth):
+    os.makedirs(root, exist_ok=True)
+    for i in range(breadth):
+        with open(os.path.join(root, 'file-{}'.format(i)), 'w') as file:
+            file.write(str(i))
+        if depth > 0:
+            create_tree(os.path.join(root, 'dir-{}'.format(i)), breadth, depth - 1)
+
+def list_tree(root):
+    paths = [root]
+    for dir_path, dir_names, file_names in os.walk(root):
+        paths += [os.path.join(dir_path, name) for name in dir_names + file_names]
+    return paths
+
+def count_open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+def test_chowntree_keeps_no_file_descriptors_open(tmp_path):
+    root = str(tmp_path / 'tree')
+    create_tree(root, 4, 3)
+    
+    open_fds = count_open_fds()
+    chowntree(root, os.getuid(), os.getgid(), max_workers=4)
+    assert count_open_fds() == open_fds
+
+def test_chowntree_open_file_descriptors_bounded_by_tree_depth(tmp_path):
+    root = str(tmp_path / 'tree')
+    for i in range(300):
+        os.makedirs(os.path.join(root, 'dir-{}'.format(i), 'sub'))
+
+    [soft_limit, hard_limit] = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(count_open_fds() + 64, hard_limit), hard_limit))
+    try:
+        chowntree(root, os.getuid(), os.getgid(), max_workers=4)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft_limit, hard_limit))
+
+@pytest.mark.skipif(os.geteuid() != 0, reason='changing file ownership requires root privileges')
+def test_chowntree_changes_ownership_without_following_symlinks(tmp_path):
+    root = str(tmp_path / 'tree')
+    create_tree(root, 3, 3)
+    outside_path = str(tmp_path / 'outside')
+    with open(outside_path, 'w') as file:
+        file.write('outside')
+    os.symlink(outside_path, os.path.join(root, 'dir-0', 'link'))
+
+    chowntree(root, 1000, 1000, max_workers=4)
+
+    for path in list_tree(root):
+        stat = os.lstat(path)
+        assert (stat.st_uid, stat.st_gid) == (1000, 1000), path
+    assert os.lstat(outside_path).st_uid == 0
+
+def test_write_file_atomically(tmp_path):
+    path = str(tmp_path / 'docs' / 'doc.json')
+
+    assert write_file_atomically(path, '{"Key": "Value"}')
+    with open(path) as file:
+        assert file.read() == '{"Key": "Value"}'
+    inode = os.stat(path).st_ino
+
+    assert not write_file_atomically(path, '{"Key": "Value"}')
+    assert os.stat(path).st_ino == inode
+
+    assert write_file_atomically(path, '{"Key": "Other value"}')
+    with open(path) as file:
+        assert file.read() == '{"Key": "Other value"}'
+    assert os.listdir(str(tmp_path / 'docs')) == ['doc.json']
+
+# Previous byte-wise implementation of read_last_lines() kept for reference
+def read_last_lines_byte_wise(path, max_lines):
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return ''
+    
+    with open(path, "rb") as file:
+        file.seek(-1, os.SEEK_END) 
+        while file.read(1).isspace():
+            if file.tell() >= 2:
+                file.seek(-2, os.SEEK_CUR)
+            else:
+                break
+
+        for _ in range(max_lines):
+            file.seek(-1, os.SEEK_CUR)
+            while file.read(1) != b'\n':
+                if file.tell() >= 2:
+                    file.seek(-2, os.SEEK_CUR)
+                else:
+                    break
+            file.seek(-1, os.SEEK_CUR)
+            
+            if file.tell() == 0:
+                break
+
+        return file.read().decode().strip()
+
+@pytest.mark.parametrize('content', [
+    b'', b'\n', b' \n\t\n', b'x', b'\nx', b'x\n', b'first\nsecond\nthird', b'first\nsecond\nthird\n\n  \n', 
+    b'\n\nfirst\n\n\nsecond\n', b'  indented\n  lines\r\n  with CRLF\r\n', 'Umlaute \u00e4\u00f6\u00fc\nund \u00df\n'.encode()
+])
+def test_read_last_lines_matches_byte_wise_implementation(tmp_path, content):
+    path = str(tmp_path / 'log.out')
+    with open(path, 'wb') as file:
+        file.write(content)
+
+    for max_lines in range(0, 6):
+        for block_size in [1, 2, 3, 7, 8192]:
+            assert read_last_lines(path, max_lines, block_size) == read_last_lines_byte_wise(path, max_lines)
+
+def test_read_last_lines_matches_byte_wise_implementation_on_random_logs(tmp_path):
+    path = str(tmp_path / 'log.out')
+    generator = random.Random(4711)
+    for _ in range(200):
+        with open(path, 'wb') as file:
+            file.write(bytes(generator.choice(b'ab \t\n\n\n') for _ in range(generator.randrange(1, 200))))
+
+        max_lines = generator.randrange(0, 20)
+        block_size = generator.choice([1, 5, 16, 64, 8192])
+        assert read_last_lines(path, max_lines, block_size) == read_last_lines_byte_wise(path, max_lines)
@@ -0,0 +1,98 @@
+import os
+import json
+import tempfile
+
+from fotahubclient.config_loader import ConfigLoader
+from fotahubclient.json_document_models import UpdateCompletionState
+from fotahubclient.update_status_tracker import UpdateStatusTracker
+from fotahubclient.update_status_describer import UpdateStatusDescriber
+import fotahubclient.update_status_journal as update_status_journal
+from fotahubclient.update_status_journal import UPDATE_STATUS_JOURNAL_FILE_SUFFIX
+
+def test_update_status_journal__recovery_after_power_loss():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = ConfigLoader()
+        config.update_status_path = os.path.join(temp_dir, 'update-status.json')
+        
+        app_name = 'my-app'
+
+        # Simulate power loss in the middle of an app update by never leaving the tracker's context
+        tracker = UpdateStatusTracker(config).__enter__()
+        tracker.record_app_update_status(app_name, revision='3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8', completion_state=UpdateCompletionState.initiated)
+        tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.downloaded)
+        assert not os.path.isfile(config.update_status_path)
+        assert os.path.isfile(config.update_status_path + UPDATE_STATUS_JOURNAL_FILE_SUFFIX)
+
+        json_data = json.loads(UpdateStatusDescriber(config).describe_update_status())
+        assert len(json_data['UpdateStatuses']) == 1
+        assert json_data['UpdateStatuses'][0]['CompletionState'] == 'Downloaded'
+
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status(app_name, completion_state=UpdateCompletionState.verified)
+
+        json_data = json.loads(UpdateStatusDescriber(config).describe_update_status())
+        assert len(json_data['UpdateStatuses']) == 1
+        update_status_data = json_data['UpdateStatuses'][0]
+        assert update_status_data['Revision'] == '3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8'
+        assert update_status_data['CompletionState'] == 'Verified'
+
+def test_update_status_journal__deferred_compaction():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = ConfigLoader()
+        config.update_status_path = os.path.join(temp_dir, 'update-status.json')
+        config.update_status_journal_max_entries = 3
+        config.update_status_journal_compact_on_exit = False
+
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status('my-app', revision='1', completion_state=UpdateCompletionState.initiated)
+            tracker.record_app_update_status('my-app', completion_state=UpdateCompletionState.downloaded)
+        assert not os.path.isfile(config.update_status_path)
+
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status('my-app', completion_state=UpdateCompletionState.verified)
+        assert not os.path.isfile(config.update_status_path + UPDATE_STATUS_JOURNAL_FILE_SUFFIX)
+
+        with open(config.update_status_path) as file:
+            json_data = json.load(file)
+        assert json_data['UpdateStatuses'][0]['CompletionState'] == 'Verified'
+
+def test_update_status_journal__torn_entry_does_not_swallow_subsequent_entries():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = ConfigLoader()
+        config.update_status_path = os.path.join(temp_dir, 'update-status.json')
+
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status('my-app', revision='1', completion_state=UpdateCompletionState.initiated)
+
+        # Simulate power loss in the middle of appending an entry
+        with open(config.update_status_path + UPDATE_STATUS_JOURNAL_FILE_SUFFIX, 'a') as file:
+            file.write('{"ArtifactName": "my-app", "Artifact')
+
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status('my-app', completion_state=UpdateCompletionState.downloaded)
+            tracker.record_app_update_status('my-app', completion_state=UpdateCompletionState.verified)
+
+        json_data = json.loads(UpdateStatusDescriber(config).describe_update_status())
+        assert json_data['UpdateStatuses'][0]['CompletionState'] == 'Verified'
+
+def test_update_status_journal__directory_entry_gets_persisted(monkeypatch):
+    synced_dirs = []
+    monkeypatch.setattr(update_status_journal, 'fsync_dir', lambda path: synced_dirs.append(path))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config = ConfigLoader()
+        config.update_status_path = os.path.join(temp_dir, 'update-status.json')
+        config.update_status_journal_compact_on_exit = False
+
+        # Only once when the journal gets created
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status('my-app', revision='3fa209348038674d5e701515d3e26746b18c2cbf555044d4f93f8c424e3642d8', completion_state=UpdateCompletionState.initiated)
+            tracker.record_app_update_status('my-app', completion_state=UpdateCompletionState.downloaded)
+        assert synced_dirs == [temp_dir]
+
+        # And again when the journal gets removed upon compaction
+        config.update_status_journal_compact_on_exit = True
+        with UpdateStatusTracker(config) as tracker:
+            tracker.record_app_update_status('my-app', completion_state=UpdateCompletionState.verified)
+        assert synced_dirs == [temp_dir, temp_dir]
+        assert not os.path.exists(config.update_status_path + UPDATE_STATUS_JOURNAL_FILE_SUFFIX)